@@ -0,0 +1,28 @@
+"""provider rating not null
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keyset pagination compares (rating, id) tuples, which NULL ratings would break.
+    op.execute("UPDATE providers SET rating = 0 WHERE rating IS NULL")
+    op.execute("UPDATE providers SET rating_count = 0 WHERE rating_count IS NULL")
+    op.alter_column("providers", "rating", existing_type=sa.Float(), nullable=False, server_default="0")
+    op.alter_column("providers", "rating_count", existing_type=sa.Integer(), nullable=False, server_default="0")
+
+
+def downgrade() -> None:
+    op.alter_column("providers", "rating_count", existing_type=sa.Integer(), nullable=True, server_default=None)
+    op.alter_column("providers", "rating", existing_type=sa.Float(), nullable=True, server_default=None)
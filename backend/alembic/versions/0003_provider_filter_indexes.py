@@ -0,0 +1,35 @@
+"""provider filter indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_providers_category_ids", "providers", ["category_ids"], postgresql_using="gin")
+    op.create_index("ix_providers_area_ids", "providers", ["area_ids"], postgresql_using="gin")
+    op.create_index("ix_providers_languages", "providers", ["languages"], postgresql_using="gin")
+    op.create_index(
+        "ix_providers_city_verified_rating",
+        "providers",
+        ["city_id", "verified", sa.text("rating DESC"), "id"],
+    )
+    op.create_index("ix_providers_rating", "providers", [sa.text("rating DESC"), "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_providers_rating", table_name="providers")
+    op.drop_index("ix_providers_city_verified_rating", table_name="providers")
+    op.drop_index("ix_providers_languages", table_name="providers")
+    op.drop_index("ix_providers_area_ids", table_name="providers")
+    op.drop_index("ix_providers_category_ids", table_name="providers")
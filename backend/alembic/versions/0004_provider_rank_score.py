@@ -0,0 +1,37 @@
+"""provider rank score
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("providers", sa.Column("rank_score", sa.Float(), nullable=False, server_default="0"))
+    # backend.domain.ranking.DEFAULT_RANKING as of this revision; migrations must
+    # not follow later changes to it (RecomputeRankScoresJob applies those).
+    op.execute(
+        """
+        UPDATE providers SET rank_score =
+            (20.0 + rating * rating_count) / (5.0 + rating_count)
+            + CASE WHEN verified THEN 0.3 ELSE 0 END
+            + 0.1 * ln(1 + rating_count)
+        """
+    )
+    op.create_index("ix_providers_rank_score", "providers", [sa.text("rank_score DESC"), "id"])
+    op.create_index("ix_providers_city_rank_score", "providers", ["city_id", sa.text("rank_score DESC"), "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_providers_city_rank_score", table_name="providers")
+    op.drop_index("ix_providers_rank_score", table_name="providers")
+    op.drop_column("providers", "rank_score")
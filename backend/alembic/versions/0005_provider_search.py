@@ -0,0 +1,77 @@
+"""provider full-text search
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+# Folds spellings that readers treat as the same word: Hebrew niqqud and
+# cantillation, Arabic harakat and tatweel are dropped; alef/hamza variants,
+# alef maqsura, ta marbuta and Hebrew final letters map to their base letter.
+NORMALIZE_FUNCTION = """
+CREATE OR REPLACE FUNCTION menna_normalize(input text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT translate(
+        regexp_replace(lower(input), '[\u0591-\u05c7\u0610-\u061a\u0640\u064b-\u065f\u0670]', '', 'g'),
+        '\u0623\u0625\u0622\u0671\u0649\u0629\u05da\u05dd\u05df\u05e3\u05e5',
+        '\u0627\u0627\u0627\u0627\u064a\u0647\u05db\u05de\u05e0\u05e4\u05e6'
+    )
+$$
+"""
+
+DOCUMENT_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION providers_search_document_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_document :=
+        setweight(to_tsvector('simple', menna_normalize(coalesce(NEW.name, ''))), 'A')
+        || setweight(
+            to_tsvector(
+                'simple',
+                menna_normalize(coalesce(
+                    (SELECT string_agg(value, ' ') FROM jsonb_each_text(coalesce(NEW.bio_i18n, '{}'::jsonb))),
+                    ''
+                ))
+            ),
+            'B'
+        );
+    RETURN NEW;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(NORMALIZE_FUNCTION)
+    op.execute(DOCUMENT_TRIGGER_FUNCTION)
+    op.add_column("providers", sa.Column("search_document", postgresql.TSVECTOR()))
+    op.execute(
+        "CREATE TRIGGER providers_search_document BEFORE INSERT OR UPDATE OF name, bio_i18n ON providers "
+        "FOR EACH ROW EXECUTE FUNCTION providers_search_document_update()"
+    )
+    op.execute("UPDATE providers SET name = name")
+    op.create_index("ix_providers_search_document", "providers", ["search_document"], postgresql_using="gin")
+    op.execute(
+        "CREATE INDEX ix_providers_name_trgm ON providers USING gin (menna_normalize(name) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_providers_name_trgm", table_name="providers")
+    op.drop_index("ix_providers_search_document", table_name="providers")
+    op.execute("DROP TRIGGER providers_search_document ON providers")
+    op.drop_column("providers", "search_document")
+    op.execute("DROP FUNCTION providers_search_document_update()")
+    op.execute("DROP FUNCTION menna_normalize(text)")
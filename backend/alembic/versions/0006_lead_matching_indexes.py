@@ -0,0 +1,55 @@
+"""lead matching indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the earliest delivery of each (lead, provider) pair; reviews of a
+    # dropped duplicate move to the delivery that is kept.
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE duplicate_deliveries ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (PARTITION BY lead_id, provider_id ORDER BY created_at, id) AS kept_id
+        FROM lead_deliveries
+        """
+    )
+    op.execute("DELETE FROM duplicate_deliveries WHERE id = kept_id")
+    op.execute(
+        "UPDATE reviews SET lead_delivery_id = d.kept_id FROM duplicate_deliveries d "
+        "WHERE reviews.lead_delivery_id = d.id"
+    )
+    op.execute("DELETE FROM lead_deliveries USING duplicate_deliveries d WHERE lead_deliveries.id = d.id")
+    # Build without blocking deliveries. A duplicate inserted after the cleanup
+    # fails the unique build and leaves an INVALID index: drop it and rerun.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_subscriptions_provider_chargeable",
+            "subscriptions",
+            ["provider_id"],
+            postgresql_where=sa.text("active AND credits > 0"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ux_lead_deliveries_lead_provider",
+            "lead_deliveries",
+            ["lead_id", "provider_id"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_lead_deliveries_lead_provider", table_name="lead_deliveries")
+    op.drop_index("ix_subscriptions_provider_chargeable", table_name="subscriptions")
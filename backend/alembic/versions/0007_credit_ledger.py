@@ -0,0 +1,73 @@
+"""credit ledger
+
+Balances driven below zero by the old read-then-write decrement are clamped
+to zero before ``ck_subscriptions_credits_non_negative`` is added, and each
+clamp is recorded as an ``overdraft_write_off`` row after the opening
+balance, so the ledger still sums to ``credits``.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+APPEND_ONLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION credit_ledger_append_only() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'credit_ledger is append-only';
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "credit_ledger",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("subscription_id", sa.Integer(), sa.ForeignKey("subscriptions.id"), nullable=False),
+        sa.Column("provider_id", sa.Integer(), sa.ForeignKey("providers.id"), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("balance_after", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("lead_id", sa.Integer(), sa.ForeignKey("leads.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+    )
+    op.create_index("ix_credit_ledger_subscription", "credit_ledger", ["subscription_id", "id"])
+    op.execute(APPEND_ONLY_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER credit_ledger_append_only BEFORE UPDATE OR DELETE ON credit_ledger "
+        "FOR EACH ROW EXECUTE FUNCTION credit_ledger_append_only()"
+    )
+    # Existing balances predate the ledger; record them so sum(delta) reconciles with credits.
+    op.execute(
+        "INSERT INTO credit_ledger (subscription_id, provider_id, delta, balance_after, reason) "
+        "SELECT id, provider_id, credits, credits, 'opening_balance' FROM subscriptions "
+        "WHERE credits IS NOT NULL AND provider_id IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO credit_ledger (subscription_id, provider_id, delta, balance_after, reason) "
+        "SELECT id, provider_id, -credits, 0, 'overdraft_write_off' FROM subscriptions "
+        "WHERE credits < 0 AND provider_id IS NOT NULL"
+    )
+    op.execute("UPDATE subscriptions SET credits = GREATEST(COALESCE(credits, 0), 0)")
+    op.alter_column("subscriptions", "credits", nullable=False, server_default="0")
+    op.create_check_constraint("ck_subscriptions_credits_non_negative", "subscriptions", "credits >= 0")
+
+
+def downgrade() -> None:
+    op.drop_constraint("ck_subscriptions_credits_non_negative", "subscriptions", type_="check")
+    op.alter_column("subscriptions", "credits", nullable=True, server_default=None)
+    op.execute("DROP TRIGGER IF EXISTS credit_ledger_append_only ON credit_ledger")
+    op.execute("DROP FUNCTION IF EXISTS credit_ledger_append_only()")
+    op.drop_index("ix_credit_ledger_subscription", table_name="credit_ledger")
+    op.drop_table("credit_ledger")
@@ -0,0 +1,39 @@
+"""lead delivery inbox indexes
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so lead_deliveries keeps taking writes during the build.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_lead_deliveries_provider_inbox",
+            "lead_deliveries",
+            ["provider_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_include=["lead_id", "status"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_lead_deliveries_provider_status_inbox",
+            "lead_deliveries",
+            ["provider_id", "status", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_include=["lead_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lead_deliveries_provider_status_inbox", table_name="lead_deliveries")
+    op.drop_index("ix_lead_deliveries_provider_inbox", table_name="lead_deliveries")
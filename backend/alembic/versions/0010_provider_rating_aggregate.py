@@ -0,0 +1,111 @@
+"""provider rating aggregate
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("reviews", sa.Column("provider_id", sa.Integer(), sa.ForeignKey("providers.id"), nullable=True))
+    # Until now CreateReview stored the lead id in lead_delivery_id. A review is
+    # attributed, and pointed at its real delivery, only when its lead reached a
+    # single provider; the others keep provider_id NULL.
+    op.execute(
+        """
+        UPDATE reviews SET provider_id = single.provider_id, lead_delivery_id = single.id
+        FROM (
+            SELECT lead_id, min(id) AS id, min(provider_id) AS provider_id
+            FROM lead_deliveries
+            GROUP BY lead_id
+            HAVING count(DISTINCT provider_id) = 1
+        ) AS single
+        WHERE single.lead_id = reviews.lead_delivery_id
+        """
+    )
+    # NOT VALID: enforced for new rows without scanning old ones.
+    op.execute("ALTER TABLE reviews ADD CONSTRAINT ck_reviews_rating CHECK (rating BETWEEN 1 AND 5) NOT VALID")
+    op.add_column("providers", sa.Column("rating_sum", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column(
+        "providers",
+        sa.Column(
+            "rating_histogram", postgresql.ARRAY(sa.Integer()), nullable=False, server_default="{0,0,0,0,0}"
+        ),
+    )
+    op.add_column(
+        "providers", sa.Column("unattributed_rating_sum", sa.BigInteger(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "providers", sa.Column("unattributed_rating_count", sa.Integer(), nullable=False, server_default="0")
+    )
+    # The existing rating and rating_count cover every review, attributed or
+    # not; what the attributed reviews do not explain becomes the provider's
+    # unattributed baseline, so its average survives. Same computation as
+    # SqlAlchemyProviderRepository.recompute_ratings from there on; rank_score
+    # follows on the next RecomputeRankScoresJob.
+    op.execute(
+        """
+        UPDATE providers SET
+            unattributed_rating_count = greatest(providers.rating_count - totals.rating_count, 0),
+            unattributed_rating_sum = CASE WHEN providers.rating_count > totals.rating_count
+                THEN greatest(round(providers.rating * providers.rating_count)::bigint - totals.rating_sum, 0)
+                ELSE 0 END
+        FROM (
+            SELECT providers.id, coalesce(sum(reviews.rating), 0) AS rating_sum, count(reviews.id) AS rating_count
+            FROM providers LEFT JOIN reviews ON reviews.provider_id = providers.id
+            GROUP BY providers.id
+        ) AS totals
+        WHERE providers.id = totals.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE providers SET
+            rating_sum = totals.rating_sum + providers.unattributed_rating_sum,
+            rating_count = totals.rating_count + providers.unattributed_rating_count,
+            rating_histogram = totals.rating_histogram,
+            rating = coalesce(
+                (totals.rating_sum + providers.unattributed_rating_sum)::float
+                / nullif(totals.rating_count + providers.unattributed_rating_count, 0),
+                0
+            )
+        FROM (
+            SELECT providers.id,
+                   coalesce(sum(reviews.rating), 0) AS rating_sum,
+                   count(reviews.id) AS rating_count,
+                   ARRAY[
+                       count(reviews.id) FILTER (WHERE reviews.rating = 1),
+                       count(reviews.id) FILTER (WHERE reviews.rating = 2),
+                       count(reviews.id) FILTER (WHERE reviews.rating = 3),
+                       count(reviews.id) FILTER (WHERE reviews.rating = 4),
+                       count(reviews.id) FILTER (WHERE reviews.rating = 5)
+                   ]::integer[] AS rating_histogram
+            FROM providers LEFT JOIN reviews ON reviews.provider_id = providers.id
+            GROUP BY providers.id
+        ) AS totals
+        WHERE providers.id = totals.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("providers", "unattributed_rating_count")
+    op.drop_column("providers", "unattributed_rating_sum")
+    op.drop_column("providers", "rating_histogram")
+    op.drop_column("providers", "rating_sum")
+    op.drop_constraint("ck_reviews_rating", "reviews", type_="check")
+    op.execute(
+        "UPDATE reviews SET lead_delivery_id = lead_deliveries.lead_id FROM lead_deliveries "
+        "WHERE lead_deliveries.id = reviews.lead_delivery_id AND reviews.provider_id IS NOT NULL"
+    )
+    op.drop_column("reviews", "provider_id")
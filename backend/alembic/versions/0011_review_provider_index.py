@@ -0,0 +1,30 @@
+"""provider reviews index
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so reviews keeps taking writes during the build.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_reviews_provider_created",
+            "reviews",
+            ["provider_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reviews_provider_created", table_name="reviews")
@@ -0,0 +1,28 @@
+"""outbox retry backoff
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "outbox",
+        sa.Column(
+            "next_attempt_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("outbox", "next_attempt_at")
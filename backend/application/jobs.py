@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Dict, Type
+
+
+@dataclass
+class Job:
+    """Post-commit work published by use cases and executed by the worker."""
+
+    priority: ClassVar[str] = "default"
+
+
+@dataclass
+class RecomputeRankScoresJob(Job):
+    priority: ClassVar[str] = "low"
+
+
+@dataclass
+class RecomputeProviderRatingsJob(Job):
+    """Rebuilds every provider's rating aggregate from the reviews to repair drift."""
+
+    priority: ClassVar[str] = "low"
+
+
+@dataclass
+class MatchLeadJob(Job):
+    lead_id: int
+
+
+@dataclass
+class NotifyProviderJob(Job):
+    provider_id: int
+    kind: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    priority: ClassVar[str] = "high"
+
+
+JOB_TYPES: Dict[str, Type[Job]] = {
+    cls.__name__: cls
+    for cls in (
+        RecomputeRankScoresJob,
+        RecomputeProviderRatingsJob,
+        MatchLeadJob,
+        NotifyProviderJob,
+    )
+}
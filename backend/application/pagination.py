@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from backend.domain.entities import InboxItem, Provider, ProviderCard, Review
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def page_size(limit: Optional[int]) -> int:
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def encode_cursor(scope: Any, key: List[Any]) -> str:
+    raw = json.dumps([scope, key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_a(value: Any, kind: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if kind is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, kind)
+
+
+def decode_cursor(cursor: str, scope: Any, types: Optional[Sequence[type]] = None) -> List[Any]:
+    """Return the keyset values stored in ``cursor``; it must have been issued for ``scope``.
+
+    With ``types``, the key must have exactly one value of each type, in order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_scope, key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_scope != scope or not isinstance(key, list):
+        raise InvalidCursor("Cursor does not match this query")
+    if types is not None and (
+        len(key) != len(types) or not all(_is_a(value, kind) for value, kind in zip(key, types))
+    ):
+        raise InvalidCursor("Malformed cursor")
+    return key
+
+
+def provider_keyset(provider: Union[Provider, ProviderCard], sort: Optional[str]) -> List[Any]:
+    if sort == "rating":
+        return [provider.rating, provider.id]
+    if sort == "relevance":
+        return [provider.rank_score, provider.id]
+    return [provider.id]
+
+
+def provider_key_types(sort: Optional[str]) -> Tuple[type, ...]:
+    """Types of the values ``provider_keyset`` stores for ``sort``."""
+    if sort in ("rating", "relevance"):
+        return (float, int)
+    return (int,)
+
+
+def inbox_keyset(item: InboxItem) -> List[Any]:
+    return [item.delivered_at.isoformat(), item.delivery_id]
+
+
+def review_keyset(review: Review) -> List[Any]:
+    return [review.created_at.isoformat(), review.id]
+
+
+def decode_timestamp_cursor(cursor: str, scope: Any) -> List[Any]:
+    """Decode a ``[timestamp, id]`` keyset issued by ``inbox_keyset`` or ``review_keyset``."""
+    try:
+        created_at, row_id = decode_cursor(cursor, scope, (str, int))
+        return [datetime.fromisoformat(created_at), row_id]
+    except (ValueError, TypeError) as exc:
+        if isinstance(exc, InvalidCursor):
+            raise
+        raise InvalidCursor("Malformed cursor")
+
+
+def paginate(rows: List[T], limit: int, scope: Any, key) -> Page[T]:
+    """Build a page from up to ``limit + 1`` rows fetched past the previous cursor."""
+    if len(rows) <= limit:
+        return Page(items=rows)
+    items = rows[:limit]
+    return Page(items=items, next_cursor=encode_cursor(scope, key(items[-1])))
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
 
+from backend.application.jobs import Job
 from backend.domain.entities import (
     Area,
     Category,
     City,
     ContactEvent,
+    InboxItem,
     LeadDelivery,
     LeadRequest,
+    LeadStatus,
     Plan,
     Provider,
+    ProviderCard,
+    ProviderFacets,
     Review,
+    ReviewSummary,
     Subscription,
     User,
 )
@@ -42,17 +48,80 @@ class ProviderRepository(ABC):
         verified: Optional[bool] = None,
         language: Optional[str] = None,
         sort: Optional[str] = None,
-    ) -> List[Provider]:
-        ...
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+        view: str = "full",
+    ) -> List[Union[Provider, ProviderCard]]:
+        """Return providers ordered by ``sort`` then id, starting after the keyset ``after``.
+
+        ``area_match`` is ``"all"`` to require every area in ``area_ids`` or ``"any"``
+        to require at least one of them. ``view="card"`` returns ``ProviderCard``s
+        read from the card columns only.
+        """
+
+    @abstractmethod
+    async def search(
+        self,
+        q: str,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+        view: str = "full",
+    ) -> List[Tuple[Union[Provider, ProviderCard], float]]:
+        """Full-text match on name and bio, best score first, keyset ``after`` = ``[score, id]``."""
+
+    @abstractmethod
+    async def facets(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        area_match: str = "all",
+    ) -> ProviderFacets:
+        """Count matching providers per facet value.
+
+        Each facet is counted under every filter except its own, so the counts
+        say how many providers a screen would show if that value were picked.
+        """
 
     @abstractmethod
     async def get(self, provider_id: int) -> Optional[Provider]:
         ...
 
     @abstractmethod
-    async def update_rating(self, provider_id: int, rating: float, count: int) -> None:
+    async def existing_ids(self, provider_ids: List[int]) -> Set[int]:
         ...
 
+    @abstractmethod
+    async def owners(self, provider_ids: List[int]) -> Dict[int, int]:
+        """The id of the owning user, per known provider id."""
+
+    @abstractmethod
+    async def add_rating(self, provider_id: int, rating: int) -> None:
+        """Fold one 1-5 star review into the provider's rating sum, count, average and histogram."""
+
+    @abstractmethod
+    async def recompute_ratings(self) -> int:
+        """Rebuild every rating aggregate from the reviews; returns the number of rows repaired."""
+
+    @abstractmethod
+    async def recompute_rank_scores(self) -> int:
+        """Recompute every provider's ``rank_score``; returns the number of rows changed."""
+
+
+class ProviderChangeListener(ABC):
+    @abstractmethod
+    async def provider_changed(self, provider: Provider, previous: Optional[Provider] = None) -> None:
+        """``previous`` is the provider before the write, when the write may have moved it."""
+
 
 class GeographyRepository(ABC):
     @abstractmethod
@@ -63,6 +132,10 @@ class GeographyRepository(ABC):
     async def list_areas(self, city_id: int) -> List[Area]:
         ...
 
+    @abstractmethod
+    async def list_all_areas(self) -> List[Area]:
+        ...
+
     @abstractmethod
     async def list_categories(self) -> List[Category]:
         ...
@@ -73,6 +146,34 @@ class LeadRepository(ABC):
     async def create(self, lead: LeadRequest) -> LeadRequest:
         ...
 
+    @abstractmethod
+    async def get(self, lead_id: int) -> Optional[LeadRequest]:
+        ...
+
+    async def lock_for_delivery(self, lead_id: int) -> Optional[LeadRequest]:
+        """``get`` that also holds off other deliveries of the lead until the unit of work ends."""
+        return await self.get(lead_id)
+
+    @abstractmethod
+    async def match_and_deliver(self, lead: LeadRequest) -> List[LeadDelivery]:
+        """Deliver ``lead`` to every eligible provider not yet holding it, charging one credit each.
+
+        Eligible providers serve the lead's category and city, cover at least one
+        of its areas and have an active subscription with credits left. Selection,
+        charging and the delivery rows are written atomically.
+        """
+
+    @abstractmethod
+    async def deliver_to_providers(self, lead_id: int, provider_ids: List[int]) -> List[LeadDelivery]:
+        """Deliver the lead to each listed provider that can be charged a credit and does not hold it yet.
+
+        Providers left out are unknown, out of credits or already hold the lead.
+        """
+
+    @abstractmethod
+    async def delivered_provider_ids(self, lead_id: int, provider_ids: List[int]) -> Set[int]:
+        ...
+
     @abstractmethod
     async def add_delivery(self, delivery: LeadDelivery) -> LeadDelivery:
         ...
@@ -81,6 +182,31 @@ class LeadRepository(ABC):
     async def update_delivery_status(self, delivery_id: int, status: str) -> None:
         ...
 
+    @abstractmethod
+    async def advance_delivery_statuses(self, statuses: Dict[int, LeadStatus]) -> List[LeadDelivery]:
+        """Move each delivery id forward to its status; ones already at or past it are left alone.
+
+        Returns the deliveries that changed.
+        """
+
+    @abstractmethod
+    async def find_delivery(self, lead_id: int, provider_id: int) -> Optional[LeadDelivery]:
+        ...
+
+    @abstractmethod
+    async def delivery_owners(self, delivery_ids: List[int]) -> Dict[int, int]:
+        """The id of the user owning the receiving provider, per known delivery id."""
+
+    @abstractmethod
+    async def inbox(
+        self,
+        provider_id: int,
+        status: Optional[LeadStatus] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+    ) -> List[InboxItem]:
+        """Newest deliveries first, keyset ``after`` = ``[delivered_at, delivery_id]``."""
+
     @abstractmethod
     async def has_contact(self, lead_id: int, provider_id: int, user_id: int) -> bool:
         ...
@@ -91,6 +217,26 @@ class ReviewRepository(ABC):
     async def create(self, review: Review) -> Review:
         ...
 
+    @abstractmethod
+    async def list_for_provider(
+        self, provider_id: int, limit: Optional[int] = None, after: Optional[List[Any]] = None
+    ) -> List[Review]:
+        """A provider's reviews newest first, starting after the keyset ``after`` = ``[created_at, id]``."""
+
+
+class ReviewSummaryCache(ABC):
+    @abstractmethod
+    async def get(self, provider_id: int) -> Optional[ReviewSummary]:
+        ...
+
+    @abstractmethod
+    async def set(self, summary: ReviewSummary) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate(self, provider_id: int) -> None:
+        ...
+
 
 class SubscriptionRepository(ABC):
     @abstractmethod
@@ -98,8 +244,13 @@ class SubscriptionRepository(ABC):
         ...
 
     @abstractmethod
-    async def decrement_credit(self, subscription_id: int) -> None:
-        ...
+    async def reserve_credit(self, provider_id: int, lead_id: Optional[int] = None) -> Optional[int]:
+        """Atomically take one credit and append the debit to the credit ledger.
+
+        Returns the remaining balance, or ``None`` when the provider has no
+        chargeable subscription. Commits like any other write, so a caller
+        that pairs it with the delivery it pays for runs both in one unit of work.
+        """
 
 
 class PlanRepository(ABC):
@@ -114,6 +265,14 @@ class ContactRepository(ABC):
         ...
 
 
+class InvalidToken(ValueError):
+    pass
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
 class TokenService(ABC):
     @abstractmethod
     def create_access_token(self, user_id: int) -> str:
@@ -124,19 +283,32 @@ class TokenService(ABC):
         ...
 
     @abstractmethod
-    def verify_token(self, token: str) -> int:
-        ...
+    def verify_token(self, token: str, kind: str) -> int:
+        """The user id a valid, unexpired ``kind`` token was issued for; raises ``InvalidToken`` otherwise.
+
+        ``kind`` is ``ACCESS_TOKEN`` or ``REFRESH_TOKEN``; a token of the other kind is invalid.
+        """
+
+
+class HasherSaturated(Exception):
+    """The password hasher has no room for another operation; shed the request."""
 
 
 class PasswordHasher(ABC):
+    """Async so hashing can run off the event loop; either method may raise ``HasherSaturated``."""
+
     @abstractmethod
-    def hash(self, password: str) -> str:
+    async def hash(self, password: str) -> str:
         ...
 
     @abstractmethod
-    def verify(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
         ...
 
+    def needs_update(self, hashed_password: str) -> bool:
+        """Whether ``hashed_password`` was made with parameters other than the current ones."""
+        return False
+
 
 class OTPService(ABC):
     @abstractmethod
@@ -154,7 +326,60 @@ class RateLimiter(ABC):
         ...
 
 
+class UnitOfWork(ABC):
+    """The transaction a use case's writes commit in.
+
+    Side effects outside the database, such as cache writes and notifications,
+    are deferred to it so other requests never see state that rolls back.
+    """
+
+    @abstractmethod
+    async def after_commit(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Run ``callback`` once the transaction commits, or now when none is open."""
+
+    @abstractmethod
+    async def after_rollback(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Run ``callback`` if the open transaction rolls back or fails to commit."""
+
+
+class LeadDeduplicator(ABC):
+    """Recent leads per user, category and city, matched on a fingerprint of their description."""
+
+    @abstractmethod
+    async def claim(self, lead: LeadRequest) -> Optional[int]:
+        """Id of a recent near-duplicate of ``lead``.
+
+        Otherwise returns ``None`` and holds the scope until ``remember`` or
+        ``release``, so a concurrent duplicate waits and then finds this lead.
+        """
+        ...
+
+    @abstractmethod
+    async def remember(self, lead: LeadRequest) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, lead: LeadRequest) -> None:
+        ...
+
+
 class AnalyticsClient(ABC):
     @abstractmethod
     async def track(self, event: str, payload: dict) -> None:
         ...
+
+
+class JobQueue(ABC):
+    @abstractmethod
+    async def publish(self, job: Job) -> None:
+        ...
+
+    async def publish_many(self, jobs: Sequence[Job]) -> None:
+        for job in jobs:
+            await self.publish(job)
+
+
+class Notifier(ABC):
+    @abstractmethod
+    async def notify_provider(self, provider_id: int, kind: str, data: dict) -> None:
+        ...
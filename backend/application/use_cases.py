@@ -1,16 +1,36 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from backend.domain.entities import (
+    RATING_STARS,
     ContactEvent,
+    DeliveryOutcome,
+    InboxItem,
     LeadDelivery,
     LeadRequest,
+    LeadStatus,
+    Provider,
+    ProviderCard,
+    ProviderFacets,
     Review,
+    ReviewSummary,
     User,
 )
 from backend.application import ports
+from backend.application.jobs import MatchLeadJob, NotifyProviderJob
+from backend.application.pagination import (
+    Page,
+    decode_cursor,
+    decode_timestamp_cursor,
+    inbox_keyset,
+    page_size,
+    paginate,
+    provider_key_types,
+    provider_keyset,
+    review_keyset,
+)
 
 
 @dataclass
@@ -26,7 +46,7 @@ class RegisterUser:
         self.hasher = hasher
 
     async def execute(self, email: str, password: str, phone: Optional[str]) -> User:
-        hashed = self.hasher.hash(password)
+        hashed = await self.hasher.hash(password)
         user = User(id=None, email=email, password_hash=hashed, phone=phone, phone_verified=False)
         return await self.users.create(user)
 
@@ -48,14 +68,24 @@ class Login:
         if not await self.rate_limiter.is_allowed(f"login:{email}", limit=5, ttl=300):
             raise ValueError("Too many attempts")
         user = await self.users.get_by_email(email)
-        if not user or not self.hasher.verify(password, user.password_hash):
+        if not user or not await self.hasher.verify(password, user.password_hash):
             raise ValueError("Invalid credentials")
+        if self.hasher.needs_update(user.password_hash):
+            await self._rehash(user, password)
         return AuthResult(
             user=user,
             access_token=self.token_service.create_access_token(user.id),
             refresh_token=self.token_service.create_refresh_token(user.id),
         )
 
+    async def _rehash(self, user: User, password: str) -> None:
+        """Upgrade a hash made with outdated Argon2 parameters; a busy hasher just defers it."""
+        try:
+            user.password_hash = await self.hasher.hash(password)
+        except ports.HasherSaturated:
+            return
+        await self.users.create(user)
+
 
 class RefreshToken:
     def __init__(self, token_service: ports.TokenService, users: ports.UserRepository):
@@ -63,7 +93,7 @@ class RefreshToken:
         self.users = users
 
     async def execute(self, refresh_token: str) -> AuthResult:
-        user_id = self.token_service.verify_token(refresh_token)
+        user_id = self.token_service.verify_token(refresh_token, ports.REFRESH_TOKEN)
         user = await self.users.get(user_id)
         if not user:
             raise ValueError("User not found")
@@ -111,7 +141,7 @@ class ResetPassword:
         user = await self.users.get_by_email(email)
         if not user:
             return False
-        user.password_hash = self.hasher.hash(new_password)
+        user.password_hash = await self.hasher.hash(new_password)
         await self.users.create(user)
         return True
 
@@ -129,20 +159,56 @@ class ListProviders:
         verified: Optional[bool] = None,
         language: Optional[str] = None,
         sort: Optional[str] = None,
-    ):
-        providers = await self.providers.list(
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        area_match: str = "all",
+        q: Optional[str] = None,
+        view: str = "full",
+    ) -> Page[Union[Provider, ProviderCard]]:
+        limit = page_size(limit)
+        filters = dict(
             category_id=category_id,
             city_id=city_id,
             area_ids=area_ids,
             verified=verified,
             language=language,
-            sort=sort,
+            area_match=area_match,
+            view=view,
         )
+        if q:
+            scope = ["q", q]
+            after = decode_cursor(cursor, scope, (float, int)) if cursor else None
+            rows = await self.providers.search(q, limit=limit + 1, after=after, **filters)
+            ranked = paginate(rows, limit, scope, lambda row: [row[1], row[0].id])
+            page = Page(items=[provider for provider, _ in ranked.items], next_cursor=ranked.next_cursor)
+        else:
+            after = decode_cursor(cursor, sort, provider_key_types(sort)) if cursor else None
+            providers = await self.providers.list(sort=sort, limit=limit + 1, after=after, **filters)
+            page = paginate(providers, limit, sort, lambda p: provider_keyset(p, sort))
+        await self.viewed(category_id, city_id, len(page.items))
+        return page
+
+    async def viewed(self, category_id: Optional[int], city_id: Optional[int], count: int) -> None:
+        """Record a listing view; also called for pages served from the listing cache."""
         await self.analytics.track(
-            "provider_profile_viewed",
-            {"category_id": category_id, "city_id": city_id, "count": len(providers)},
+            "provider_profile_viewed", {"category_id": category_id, "city_id": city_id, "count": count}
         )
-        return providers
+
+
+class CountProviderFacets:
+    def __init__(self, providers: ports.ProviderRepository):
+        self.providers = providers
+
+    async def execute(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        area_match: str = "all",
+    ) -> ProviderFacets:
+        return await self.providers.facets(category_id, city_id, area_ids, verified, language, area_match)
 
 
 class GetProviderProfile:
@@ -158,15 +224,29 @@ class GetProviderProfile:
 
 
 class CreateLeadRequest:
+    """Stores the lead, then matches it inline or hands matching to the worker.
+
+    With a ``dedup`` stage, a near-duplicate of a lead the same user recently
+    posted in the same category and city returns that lead instead, so retries
+    and double taps cost no credits or fan-out. Inside ``uow`` the lead is
+    remembered only once it commits, and the claim is released if it rolls back.
+    """
+
     def __init__(
         self,
         leads: ports.LeadRepository,
-        providers: ports.ProviderRepository,
         analytics: ports.AnalyticsClient,
+        jobs: ports.JobQueue,
+        match_inline: bool = False,
+        dedup: Optional[ports.LeadDeduplicator] = None,
+        uow: Optional[ports.UnitOfWork] = None,
     ):
         self.leads = leads
-        self.providers = providers
         self.analytics = analytics
+        self.jobs = jobs
+        self.match_inline = match_inline
+        self.dedup = dedup
+        self.uow = uow
 
     async def execute(
         self,
@@ -186,29 +266,102 @@ class CreateLeadRequest:
             description=description,
             preferred_time=preferred_time,
         )
+        if self.dedup is None:
+            return await self._create(lead)
+        duplicate_id = await self.dedup.claim(lead)
+        if duplicate_id is not None:
+            # The index can briefly name a lead whose transaction never committed.
+            existing = await self.leads.get(duplicate_id)
+            if existing is not None:
+                await self.analytics.track(
+                    "lead_deduplicated",
+                    {"lead_id": existing.id, "city_id": city_id, "category_id": category_id},
+                )
+                return existing
+        try:
+            lead = await self._create(lead)
+        except BaseException:
+            await self.dedup.release(lead)
+            raise
+        if self.uow is None:
+            await self.dedup.remember(lead)
+        else:
+            await self.uow.after_rollback(lambda: self.dedup.release(lead))
+            await self.uow.after_commit(lambda: self.dedup.remember(lead))
+        return lead
+
+    async def _create(self, lead: LeadRequest) -> LeadRequest:
         lead = await self.leads.create(lead)
         await self.analytics.track(
             "lead_created",
-            {"lead_id": lead.id, "city_id": city_id, "category_id": category_id},
+            {"lead_id": lead.id, "city_id": lead.city_id, "category_id": lead.category_id},
         )
+        if self.match_inline:
+            await MatchLead(self.leads, self.analytics, self.jobs).execute(lead)
+        else:
+            await self.jobs.publish(MatchLeadJob(lead.id))
         return lead
 
 
+class MatchLead:
+    def __init__(self, leads: ports.LeadRepository, analytics: ports.AnalyticsClient, jobs: ports.JobQueue):
+        self.leads = leads
+        self.analytics = analytics
+        self.jobs = jobs
+
+    async def execute(self, lead: LeadRequest) -> List[LeadDelivery]:
+        deliveries = await self.leads.match_and_deliver(lead)
+        for delivery in deliveries:
+            await self.analytics.track("lead_delivered", {"lead_id": lead.id, "provider_id": delivery.provider_id})
+        await self.analytics.track("lead_matched", {"lead_id": lead.id, "count": len(deliveries)})
+        await self.jobs.publish_many(
+            [
+                NotifyProviderJob(d.provider_id, "lead_delivered", {"lead_id": lead.id, "delivery_id": d.id})
+                for d in deliveries
+            ]
+        )
+        return deliveries
+
+
+class OutOfCredits(Exception):
+    def __init__(self, provider_id: int):
+        super().__init__(f"Provider {provider_id} has no credits left")
+        self.provider_id = provider_id
+
+
+class AlreadyDelivered(Exception):
+    def __init__(self, lead_id: int, provider_id: int):
+        super().__init__(f"Lead {lead_id} was already delivered to provider {provider_id}")
+        self.lead_id = lead_id
+        self.provider_id = provider_id
+
+
+class NotProviderOwner(Exception):
+    """The signed-in user acted for a provider they do not own."""
+
+
 class DeliverLead:
     def __init__(
         self,
         leads: ports.LeadRepository,
         analytics: ports.AnalyticsClient,
         subscriptions: ports.SubscriptionRepository,
+        jobs: ports.JobQueue,
     ):
         self.leads = leads
         self.analytics = analytics
         self.subscriptions = subscriptions
+        self.jobs = jobs
 
     async def execute(self, lead_id: int, provider_id: int) -> LeadDelivery:
-        subscription = await self.subscriptions.get_active(provider_id)
-        if subscription and subscription.credits > 0:
-            await self.subscriptions.decrement_credit(subscription.id)
+        # Holding the lead, nothing else can deliver it to this provider until
+        # the reservation and the delivery row below commit together.
+        if await self.leads.lock_for_delivery(lead_id) is None:
+            raise ValueError("Lead not found")
+        if await self.leads.delivered_provider_ids(lead_id, [provider_id]):
+            raise AlreadyDelivered(lead_id, provider_id)
+        if await self.subscriptions.reserve_credit(provider_id, lead_id) is None:
+            raise OutOfCredits(provider_id)
         delivery = LeadDelivery(
             id=None, lead_id=lead_id, provider_id=provider_id, status="delivered"
         )
@@ -217,17 +370,179 @@ class DeliverLead:
             "lead_delivered",
             {"lead_id": lead_id, "provider_id": provider_id},
         )
+        await self.jobs.publish(
+            NotifyProviderJob(provider_id, "lead_delivered", {"lead_id": lead_id, "delivery_id": delivery.id})
+        )
         return delivery
 
 
+class DeliverLeadBulk:
+    """Delivers one lead to many providers in a constant number of statements."""
+
+    DELIVERED = "delivered"
+    ALREADY_DELIVERED = "already_delivered"
+    NO_CREDITS = "no_credits"
+    NOT_FOUND = "not_found"
+
+    def __init__(
+        self,
+        leads: ports.LeadRepository,
+        providers: ports.ProviderRepository,
+        analytics: ports.AnalyticsClient,
+        jobs: ports.JobQueue,
+    ):
+        self.leads = leads
+        self.providers = providers
+        self.analytics = analytics
+        self.jobs = jobs
+
+    async def execute(self, lead_id: int, provider_ids: List[int]) -> List[DeliveryOutcome]:
+        if await self.leads.lock_for_delivery(lead_id) is None:
+            raise ValueError("Lead not found")
+        provider_ids = list(dict.fromkeys(provider_ids))
+        deliveries = await self.leads.deliver_to_providers(lead_id, provider_ids)
+        delivered = {d.provider_id: d for d in deliveries}
+        leftover = [p for p in provider_ids if p not in delivered]
+        already = await self.leads.delivered_provider_ids(lead_id, leftover) if leftover else set()
+        existing = await self.providers.existing_ids(leftover) if leftover else set()
+        for delivery in deliveries:
+            await self.analytics.track("lead_delivered", {"lead_id": lead_id, "provider_id": delivery.provider_id})
+        await self.jobs.publish_many(
+            [
+                NotifyProviderJob(d.provider_id, "lead_delivered", {"lead_id": lead_id, "delivery_id": d.id})
+                for d in deliveries
+            ]
+        )
+        outcomes = []
+        for provider_id in provider_ids:
+            if provider_id in delivered:
+                outcomes.append(DeliveryOutcome(provider_id, self.DELIVERED, delivered[provider_id].id))
+            elif provider_id in already:
+                outcomes.append(DeliveryOutcome(provider_id, self.ALREADY_DELIVERED))
+            elif provider_id not in existing:
+                outcomes.append(DeliveryOutcome(provider_id, self.NOT_FOUND))
+            else:
+                outcomes.append(DeliveryOutcome(provider_id, self.NO_CREDITS))
+        return outcomes
+
+
+class ListProviderInbox:
+    def __init__(self, leads: ports.LeadRepository):
+        self.leads = leads
+
+    async def execute(
+        self,
+        provider_id: int,
+        status: Optional[LeadStatus] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[InboxItem]:
+        limit = page_size(limit)
+        scope = ["inbox", provider_id, status.value if status else None]
+        after = decode_timestamp_cursor(cursor, scope) if cursor else None
+        items = await self.leads.inbox(provider_id, status, limit=limit + 1, after=after)
+        return paginate(items, limit, scope, inbox_keyset)
+
+
+class ListProviderReviews:
+    """A provider's rating summary with a page of reviews, newest first.
+
+    The summary, including the newest ``latest`` reviews, is cached per
+    provider, so a profile's first screen of reviews needs no database read.
+    """
+
+    def __init__(
+        self,
+        reviews: ports.ReviewRepository,
+        providers: ports.ProviderRepository,
+        summaries: Optional[ports.ReviewSummaryCache] = None,
+        latest: int = 5,
+    ):
+        self.reviews = reviews
+        self.providers = providers
+        self.summaries = summaries
+        self.latest = latest
+
+    async def summary(self, provider_id: int) -> Optional[ReviewSummary]:
+        if self.summaries is not None:
+            cached = await self.summaries.get(provider_id)
+            if cached is not None:
+                return cached
+        provider = await self.providers.get(provider_id)
+        if provider is None:
+            return None
+        summary = ReviewSummary(
+            provider_id=provider_id,
+            rating=provider.rating,
+            rating_count=provider.rating_count,
+            rating_histogram=provider.rating_histogram,
+            latest=await self.reviews.list_for_provider(provider_id, limit=self.latest),
+        )
+        if self.summaries is not None:
+            await self.summaries.set(summary)
+        return summary
+
+    async def execute(
+        self, provider_id: int, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Optional[Tuple[ReviewSummary, Page[Review]]]:
+        limit = page_size(limit)
+        scope = ["reviews", provider_id]
+        after = decode_timestamp_cursor(cursor, scope) if cursor else None
+        summary = await self.summary(provider_id)
+        if summary is None:
+            return None
+        if after is None and (limit < self.latest or len(summary.latest) < self.latest):
+            # The cached newest reviews already answer the first page.
+            return summary, paginate(summary.latest, limit, scope, review_keyset)
+        items = await self.reviews.list_for_provider(provider_id, limit=limit + 1, after=after)
+        return summary, paginate(items, limit, scope, review_keyset)
+
+
+class RecordDeliveryStatuses:
+    """Applies a burst of status events, keeping only the furthest status per delivery.
+
+    Every delivery must have gone to a provider ``user_id`` owns; one that did
+    not rejects the whole batch. Unknown delivery ids are skipped.
+    """
+
+    def __init__(self, leads: ports.LeadRepository, analytics: ports.AnalyticsClient):
+        self.leads = leads
+        self.analytics = analytics
+
+    async def execute(self, transitions: Iterable[Tuple[int, LeadStatus]], user_id: int) -> List[LeadDelivery]:
+        furthest: Dict[int, LeadStatus] = {}
+        for delivery_id, status in transitions:
+            current = furthest.get(delivery_id)
+            if current is None or status.rank > current.rank:
+                furthest[delivery_id] = status
+        if not furthest:
+            return []
+        owners = await self.leads.delivery_owners(list(furthest))
+        for delivery_id, owner_id in owners.items():
+            if owner_id != user_id:
+                raise NotProviderOwner(f"Delivery {delivery_id} went to another user's provider")
+        furthest = {delivery_id: status for delivery_id, status in furthest.items() if delivery_id in owners}
+        if not furthest:
+            return []
+        changed = await self.leads.advance_delivery_statuses(furthest)
+        for delivery in changed:
+            await self.analytics.track(
+                f"lead_{LeadStatus(delivery.status).value}",
+                {"lead_id": delivery.lead_id, "provider_id": delivery.provider_id, "delivery_id": delivery.id},
+            )
+        return changed
+
+
 class CreateContactToken:
     def __init__(
         self,
         contacts: ports.ContactRepository,
         analytics: ports.AnalyticsClient,
+        jobs: ports.JobQueue,
     ):
         self.contacts = contacts
         self.analytics = analytics
+        self.jobs = jobs
 
     async def execute(self, provider_id: int, user_id: int, lead_id: Optional[int]) -> str:
         import secrets
@@ -246,41 +561,62 @@ class CreateContactToken:
             "provider_contact_clicked",
             {"provider_id": provider_id, "user_id": user_id, "lead_id": lead_id},
         )
+        await self.jobs.publish(
+            NotifyProviderJob(provider_id, "contact_requested", {"user_id": user_id, "lead_id": lead_id})
+        )
         return token
 
 
 class CreateReview:
+    """Stores the review and folds it into the provider's rating in the same transaction.
+
+    The cached review summary is dropped once ``uow`` commits, so a concurrent
+    read cannot cache the summary again from before the review.
+    """
+
     def __init__(
         self,
         leads: ports.LeadRepository,
         reviews: ports.ReviewRepository,
         providers: ports.ProviderRepository,
         analytics: ports.AnalyticsClient,
+        jobs: ports.JobQueue,
+        summaries: Optional[ports.ReviewSummaryCache] = None,
+        uow: Optional[ports.UnitOfWork] = None,
     ):
         self.leads = leads
         self.reviews = reviews
         self.providers = providers
         self.analytics = analytics
+        self.jobs = jobs
+        self.summaries = summaries
+        self.uow = uow
 
     async def execute(
         self, lead_id: int, provider_id: int, user_id: int, rating: int, comment: Optional[str]
     ) -> Review:
+        if not 1 <= rating <= RATING_STARS:
+            raise ValueError(f"Rating must be between 1 and {RATING_STARS}")
         if not await self.leads.has_contact(lead_id, provider_id, user_id):
             raise ValueError("No valid contact")
+        delivery = await self.leads.find_delivery(lead_id, provider_id)
         review = Review(
             id=None,
-            lead_delivery_id=lead_id,
+            lead_delivery_id=delivery.id if delivery else None,
             rating=rating,
             comment=comment,
+            provider_id=provider_id,
         )
         review = await self.reviews.create(review)
+        await self.providers.add_rating(provider_id, rating)
+        if self.summaries is not None:
+            if self.uow is None:
+                await self.summaries.invalidate(provider_id)
+            else:
+                await self.uow.after_commit(lambda: self.summaries.invalidate(provider_id))
         await self.analytics.track(
             "review_created",
             {"provider_id": provider_id, "lead_id": lead_id, "rating": rating},
         )
-        provider = await self.providers.get(provider_id)
-        if provider:
-            total = provider.rating * provider.rating_count + rating
-            count = provider.rating_count + 1
-            await self.providers.update_rating(provider_id, total / count, count)
+        await self.jobs.publish(NotifyProviderJob(provider_id, "review_created", {"review_id": review.id}))
         return review
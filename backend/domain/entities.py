@@ -8,6 +8,8 @@ from typing import Dict, List, Optional
 
 LocaleMap = Dict[str, str]
 
+RATING_STARS = 5
+
 
 class PlanType(str, Enum):
     PAY_PER_LEAD = "pay_per_lead"
@@ -20,6 +22,20 @@ class LeadStatus(str, Enum):
     OPENED = "opened"
     RESPONDED = "responded"
 
+    @property
+    def rank(self) -> int:
+        """Position in the delivery lifecycle; statuses only ever move to a higher rank."""
+        return _LEAD_STATUS_ORDER.index(self)
+
+
+_LEAD_STATUS_ORDER = list(LeadStatus)
+
+
+class CreditReason(str, Enum):
+    OPENING_BALANCE = "opening_balance"
+    LEAD_DELIVERY = "lead_delivery"
+    OVERDRAFT_WRITE_OFF = "overdraft_write_off"
+
 
 @dataclass
 class User:
@@ -68,6 +84,49 @@ class Provider:
     phone: Optional[str]
     rating: float = 0.0
     rating_count: int = 0
+    rank_score: float = 0.0
+    # rating_histogram[i] counts the (i + 1)-star reviews.
+    rating_histogram: List[int] = field(default_factory=lambda: [0] * RATING_STARS)
+
+
+@dataclass
+class ProviderCard:
+    """The subset of a provider that listing screens render."""
+
+    id: int
+    name: str
+    avatar_url: Optional[str]
+    verified: bool
+    categories: List[int]
+    city_id: int
+    rating: float = 0.0
+    rating_count: int = 0
+    rank_score: float = 0.0
+
+    @classmethod
+    def from_provider(cls, provider: Provider) -> ProviderCard:
+        return cls(
+            id=provider.id,
+            name=provider.name,
+            avatar_url=provider.avatar_url,
+            verified=provider.verified,
+            categories=provider.categories,
+            city_id=provider.city_id,
+            rating=provider.rating,
+            rating_count=provider.rating_count,
+            rank_score=provider.rank_score,
+        )
+
+
+@dataclass
+class ProviderFacets:
+    """Matching provider counts per filter value, keyed by category, city, area, language and verified."""
+
+    category: Dict[int, int] = field(default_factory=dict)
+    city: Dict[int, int] = field(default_factory=dict)
+    area: Dict[int, int] = field(default_factory=dict)
+    language: Dict[str, int] = field(default_factory=dict)
+    verified: Dict[bool, int] = field(default_factory=dict)
 
 
 @dataclass
@@ -91,13 +150,47 @@ class LeadDelivery:
     created_at: datetime = field(default_factory=datetime.utcnow)
 
 
+@dataclass
+class InboxItem:
+    """A delivery as a provider's inbox lists it, with a summary of its lead."""
+
+    delivery_id: int
+    lead_id: int
+    status: LeadStatus
+    delivered_at: datetime
+    category_id: int
+    city_id: int
+    area_ids: List[int]
+    preferred_time: Optional[str]
+    excerpt: str
+
+
+@dataclass
+class DeliveryOutcome:
+    provider_id: int
+    status: str
+    delivery_id: Optional[int] = None
+
+
 @dataclass
 class Review:
     id: Optional[int]
-    lead_delivery_id: int
+    lead_delivery_id: Optional[int]
     rating: int
     comment: Optional[str]
     created_at: datetime = field(default_factory=datetime.utcnow)
+    provider_id: Optional[int] = None
+
+
+@dataclass
+class ReviewSummary:
+    """What a profile page shows above its reviews: the rating aggregate and the newest reviews."""
+
+    provider_id: int
+    rating: float
+    rating_count: int
+    rating_histogram: List[int]
+    latest: List[Review] = field(default_factory=list)
 
 
 @dataclass
@@ -0,0 +1,57 @@
+"""64-bit SimHash fingerprints of free text, for near-duplicate detection.
+
+Text is folded the way ``menna_normalize`` folds it in Postgres, then cut into
+overlapping character shingles, so retyped, re-punctuated or slightly edited
+descriptions land a few bits apart while unrelated ones differ in about half.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from typing import FrozenSet
+
+FINGERPRINT_BITS = 64
+SHINGLE_CHARS = 4
+
+_DROPPED = re.compile("[\u0591-\u05c7\u0610-\u061a\u0640\u064b-\u065f\u0670]")
+_FOLDED = str.maketrans(
+    "\u0623\u0625\u0622\u0671\u0649\u0629\u05da\u05dd\u05df\u05e3\u05e5",
+    "\u0627\u0627\u0627\u0627\u064a\u0647\u05db\u05de\u05e0\u05e4\u05e6",
+)
+_SEPARATORS = re.compile(r"[\W_]+")
+# _BIT_TABLES[k] maps every byte to its k-th bit, so counting set bits across a
+# column of hash bytes is one ``translate`` and one ``count`` in C.
+_BIT_TABLES = [bytes((value >> k) & 1 for value in range(256)) for k in range(8)]
+
+
+def normalize(text: str) -> str:
+    folded = _DROPPED.sub("", unicodedata.normalize("NFKC", text).lower()).translate(_FOLDED)
+    return " ".join(_SEPARATORS.sub(" ", folded).split())
+
+
+def shingles(text: str, size: int = SHINGLE_CHARS) -> FrozenSet[str]:
+    normalized = normalize(text)
+    if len(normalized) <= size:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i : i + size] for i in range(len(normalized) - size + 1))
+
+
+def simhash(text: str) -> int:
+    """Bit ``b`` is set when most shingle hashes have bit ``b`` set; empty text hashes to 0."""
+    grams = shingles(text)
+    if not grams:
+        return 0
+    digests = b"".join(hashlib.blake2b(gram.encode(), digest_size=8).digest() for gram in grams)
+    fingerprint = 0
+    for position in range(8):
+        column = digests[position::8]
+        for k in range(8):
+            if column.translate(_BIT_TABLES[k]).count(1) * 2 > len(grams):
+                fingerprint |= 1 << (position * 8 + k)
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RankingParams:
+    prior_mean: float = 4.0
+    prior_weight: float = 5.0
+    verified_boost: float = 0.3
+    volume_weight: float = 0.1
+
+
+DEFAULT_RANKING = RankingParams()
+
+
+def rank_score(rating: float, rating_count: int, verified: bool, params: RankingParams = DEFAULT_RANKING) -> float:
+    """Bayesian-smoothed rating plus a verified boost and a log-scaled review volume bonus.
+
+    ``SqlAlchemyProviderRepository`` evaluates the same formula in SQL; keep both in step.
+    """
+    smoothed = (params.prior_weight * params.prior_mean + rating * rating_count) / (
+        params.prior_weight + rating_count
+    )
+    return smoothed + (params.verified_boost if verified else 0.0) + params.volume_weight * math.log1p(rating_count)
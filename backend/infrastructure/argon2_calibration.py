@@ -0,0 +1,116 @@
+"""Propose Argon2 parameters for this host.
+
+Run ``python -m backend.infrastructure.argon2_calibration --target-ms 250 --concurrency 2``
+on a machine of the fleet's type. It hashes ``concurrency`` passwords at a time,
+as the API's hasher pool does under a login burst, and raises ``time_cost``
+while the median latency stays within the target. Memory per hash is the
+budget split across concurrent hashes, halved while even ``time_cost=1`` is too
+slow. Paste the printed settings into the environment; ``Login`` rehashes
+existing passwords on their next successful login.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# OWASP's floor for Argon2id; below it a cheaper hash buys little latency.
+MIN_MEMORY_KIB = 19 * 1024
+MAX_TIME_COST = 10
+
+
+@dataclass(frozen=True)
+class Argon2Params:
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+
+@dataclass(frozen=True)
+class Calibration:
+    params: Argon2Params
+    concurrency: int
+    latency_seconds: float
+    meets_target: bool
+
+    @property
+    def logins_per_second(self) -> float:
+        return self.concurrency / self.latency_seconds
+
+
+Measure = Callable[[Argon2Params, int], float]
+
+
+def measure(params: Argon2Params, concurrency: int, rounds: int = 3) -> float:
+    """Median wall time for ``concurrency`` hashes started together."""
+    from passlib.hash import argon2
+
+    handler = argon2.using(
+        time_cost=params.time_cost, memory_cost=params.memory_cost, parallelism=params.parallelism
+    )
+    samples = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            list(pool.map(lambda i: handler.hash(f"calibration-{i}"), range(concurrency)))
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def calibrate(
+    target_seconds: float,
+    concurrency: int,
+    memory_budget_kib: int,
+    cores: int,
+    measure: Measure = measure,
+) -> Calibration:
+    """Strongest parameters whose hashes finish within ``target_seconds`` under ``concurrency``.
+
+    Falls back to the cheapest parameters tried, with ``meets_target=False``,
+    when the host cannot reach the target at all.
+    """
+    parallelism = max(1, cores // concurrency)
+    memory = max(MIN_MEMORY_KIB, memory_budget_kib // concurrency // 1024 * 1024)
+    cheapest: Optional[Calibration] = None
+    while True:
+        best: Optional[Calibration] = None
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            params = Argon2Params(time_cost, memory, parallelism)
+            latency = measure(params, concurrency)
+            if latency > target_seconds:
+                if time_cost == 1:
+                    cheapest = Calibration(params, concurrency, latency, meets_target=False)
+                break
+            best = Calibration(params, concurrency, latency, meets_target=True)
+        if best is not None:
+            return best
+        if memory // 2 < MIN_MEMORY_KIB:
+            return cheapest
+        memory //= 2
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250, help="per-hash latency budget under load")
+    parser.add_argument("--concurrency", type=int, default=2, help="hashes running at once per API process")
+    parser.add_argument("--memory-mib", type=int, default=256, help="memory for all concurrent hashes together")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    result = calibrate(args.target_ms / 1000, args.concurrency, args.memory_mib * 1024, args.cores)
+    print(f"ARGON2_TIME_COST={result.params.time_cost}")
+    print(f"ARGON2_MEMORY_COST={result.params.memory_cost}")
+    print(f"ARGON2_PARALLELISM={result.params.parallelism}")
+    print(f"PASSWORD_HASHER_WORKERS={result.concurrency}")
+    print(
+        f"# median {result.latency_seconds * 1000:.0f} ms per hash with {result.concurrency} concurrent, "
+        f"~{result.logins_per_second:.1f} logins/s per API process"
+    )
+    if not result.meets_target:
+        print(f"# target of {args.target_ms:.0f} ms is unreachable on this host; these are the cheapest settings tried")
+
+
+if __name__ == "__main__":
+    main()
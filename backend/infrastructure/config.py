@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,9 +12,37 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 14
+    token_cache_size: int = 10000
+    token_cache_ttl_seconds: int = 300
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 30
     argon2_time_cost: int = 2
     argon2_memory_cost: int = 102400
     argon2_parallelism: int = 8
+    password_hasher_workers: int = 2
+    password_hasher_max_queue: int = 32
+    analytics_batch_size: int = 500
+    analytics_flush_interval_seconds: float = 1.0
+    analytics_buffer_size: int = 10000
+    analytics_spool_dir: Optional[str] = None
+    analytics_spool_segment_bytes: int = 8 * 1024 * 1024
+    analytics_spool_segment_seconds: float = 5.0
+    analytics_spool_max_bytes: int = 512 * 1024 * 1024
+    analytics_spool_batch_size: int = 5000
+    provider_index_enabled: bool = False
+    provider_index_rebuild_seconds: int = 300
+    provider_cache_ttl_seconds: int = 600
+    reference_data_reload_seconds: int = 300
+    review_summary_ttl_seconds: int = 300
+    review_summary_latest: int = 5
+    lead_matching_inline: bool = False
+    lead_dedup_ttl_seconds: int = 600
+    lead_dedup_max_distance: int = 6
+    outbox_batch_size: int = 500
+    outbox_poll_seconds: float = 0.5
+    outbox_max_attempts: int = 10
+    outbox_retry_base_seconds: float = 1.0
+    outbox_retry_max_seconds: float = 300.0
     app_env: str = "development"
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
@@ -0,0 +1,148 @@
+"""RQ-backed job queue.
+
+Run ``python -m backend.infrastructure.jobs <JobType>`` to enqueue a job that
+takes no arguments, e.g. ``RecomputeRankScoresJob`` from a cron schedule.
+
+Jobs are published as ``run_job(<job type>, <fields>)`` on a queue named after
+the job's priority. Workers listen on ``QUEUES`` in order, so ``high`` jobs are
+always picked up first. Failed jobs are retried with backoff and, once retries
+are exhausted, copied to the ``dead`` queue, which no worker consumes.
+"""
+import asyncio
+import logging
+import sys
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Sequence, Type
+
+import redis
+from rq import Queue, Retry
+
+from backend.application import ports
+from backend.application.jobs import (
+    JOB_TYPES,
+    Job,
+    MatchLeadJob,
+    NotifyProviderJob,
+    RecomputeProviderRatingsJob,
+    RecomputeRankScoresJob,
+)
+from backend.application.use_cases import MatchLead
+from backend.infrastructure.config import get_settings
+from backend.infrastructure.db import AsyncSessionLocal, engine
+from backend.infrastructure.outbox import SqlAlchemyOutbox
+from backend.infrastructure.repositories import (
+    SqlAlchemyLeadRepository,
+    SqlAlchemyProviderRepository,
+    SqlAlchemyUnitOfWork,
+)
+from backend.infrastructure.services import (
+    LogNotifier,
+    providers_rewritten,
+    redis_client,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUES = ("high", "default", "low")
+# Job types no longer published whose queued instances are dropped, not run.
+# UpdateProviderRatingJob: CreateReview folds the rating in itself, so
+# applying a job left over from before would count the review twice.
+RETIRED_JOBS = frozenset({"UpdateProviderRatingJob"})
+DEAD_LETTER_QUEUE = "dead"
+RETRY_INTERVALS = [10, 60, 300]
+
+
+class RQJobQueue(ports.JobQueue):
+    def __init__(self, connection: redis.Redis):
+        self.queues = {name: Queue(name, connection=connection) for name in QUEUES}
+
+    async def publish(self, job: Job) -> None:
+        await asyncio.to_thread(self._enqueue, job)
+
+    async def publish_many(self, jobs: Sequence[Job]) -> None:
+        if jobs:
+            await asyncio.to_thread(self._enqueue_many, jobs)
+
+    def _enqueue(self, job: Job) -> None:
+        self.queues[job.priority].enqueue(run_job, type(job).__name__, asdict(job), **self._options())
+
+    def _enqueue_many(self, jobs: Sequence[Job]) -> None:
+        # One pipelined round trip per queue instead of one per job.
+        by_queue: Dict[str, list] = {}
+        for job in jobs:
+            data = Queue.prepare_data(run_job, (type(job).__name__, asdict(job)), **self._options())
+            by_queue.setdefault(job.priority, []).append(data)
+        for name, batch in by_queue.items():
+            self.queues[name].enqueue_many(batch)
+
+    @staticmethod
+    def _options() -> dict:
+        return {"retry": Retry(max=len(RETRY_INTERVALS), interval=RETRY_INTERVALS), "on_failure": move_to_dead_letter}
+
+
+@lru_cache()
+def job_queue() -> RQJobQueue:
+    return RQJobQueue(redis.from_url(get_settings().redis_url))
+
+
+def move_to_dead_letter(job, connection, exc_type, exc_value, traceback):
+    if job.retries_left:
+        return
+    Queue(DEAD_LETTER_QUEUE, connection=connection).enqueue(
+        job.func_name,
+        *job.args,
+        meta={"origin": job.origin, "job_id": job.id, "error": repr(exc_value)},
+    )
+
+
+async def _recompute_rank_scores(job: RecomputeRankScoresJob, session) -> None:
+    if await SqlAlchemyProviderRepository(session).recompute_rank_scores():
+        await providers_rewritten(redis_client())
+
+
+async def _recompute_provider_ratings(job: RecomputeProviderRatingsJob, session) -> None:
+    if await SqlAlchemyProviderRepository(session).recompute_ratings():
+        await providers_rewritten(redis_client())
+
+
+async def _match_lead(job: MatchLeadJob, session) -> None:
+    leads = SqlAlchemyLeadRepository(session)
+    outbox = SqlAlchemyOutbox(session)
+    async with SqlAlchemyUnitOfWork(session):
+        lead = await leads.get(job.lead_id)
+        if lead is not None:
+            await MatchLead(leads, outbox, outbox).execute(lead)
+
+
+async def _notify_provider(job: NotifyProviderJob, session) -> None:
+    await LogNotifier().notify_provider(job.provider_id, job.kind, job.data)
+
+
+HANDLERS: Dict[Type[Job], Callable[..., Awaitable[None]]] = {
+    RecomputeRankScoresJob: _recompute_rank_scores,
+    RecomputeProviderRatingsJob: _recompute_provider_ratings,
+    MatchLeadJob: _match_lead,
+    NotifyProviderJob: _notify_provider,
+}
+
+
+async def _run(job: Job) -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            await HANDLERS[type(job)](job, session)
+    finally:
+        # Every RQ job runs in a fresh event loop; pooled asyncpg connections
+        # cannot be carried over to the next one.
+        await engine.dispose()
+
+
+def run_job(name: str, data: dict) -> None:
+    if name in RETIRED_JOBS:
+        logger.warning("dropping retired job %s %s", name, data)
+        return
+    asyncio.run(_run(JOB_TYPES[name](**data)))
+
+
+if __name__ == "__main__":
+    asyncio.run(job_queue().publish(JOB_TYPES[sys.argv[1]]()))
@@ -1,12 +1,16 @@
 from backend.domain.entities import (
+    RATING_STARS,
     Area,
     Category,
     City,
     ContactEvent,
+    InboxItem,
     LeadDelivery,
     LeadRequest,
     Plan,
     Provider,
+    ProviderCard,
+    ProviderFacets,
     Review,
     Subscription,
     User,
@@ -43,9 +47,35 @@ def provider_from_model(model: models.ProviderModel) -> Provider:
         phone=model.phone,
         rating=model.rating or 0.0,
         rating_count=model.rating_count or 0,
+        rank_score=model.rank_score or 0.0,
+        rating_histogram=list(model.rating_histogram or [0] * RATING_STARS),
     )
 
 
+def provider_card_from_row(row) -> ProviderCard:
+    return ProviderCard(
+        id=row.id,
+        name=row.name,
+        avatar_url=row.avatar_url,
+        verified=bool(row.verified),
+        categories=row.category_ids or [],
+        city_id=row.city_id,
+        rating=row.rating or 0.0,
+        rating_count=row.rating_count or 0,
+        rank_score=row.rank_score or 0.0,
+    )
+
+
+FACET_VALUE_TYPES = {"category": int, "city": int, "area": int, "verified": lambda v: v == "true", "language": str}
+
+
+def provider_facets_from_rows(rows) -> ProviderFacets:
+    facets = ProviderFacets()
+    for row in rows:
+        getattr(facets, row.facet)[FACET_VALUE_TYPES[row.facet](row.value)] = row.count
+    return facets
+
+
 def category_from_model(model: models.CategoryModel) -> Category:
     return Category(id=model.id, name_i18n=model.name_i18n)
 
@@ -58,6 +88,20 @@ def area_from_model(model: models.AreaModel) -> Area:
     return Area(id=model.id, city_id=model.city_id, name_i18n=model.name_i18n)
 
 
+def inbox_item_from_row(row) -> InboxItem:
+    return InboxItem(
+        delivery_id=row.delivery_id,
+        lead_id=row.lead_id,
+        status=row.status,
+        delivered_at=row.delivered_at,
+        category_id=row.category_id,
+        city_id=row.city_id,
+        area_ids=row.area_ids or [],
+        preferred_time=row.preferred_time,
+        excerpt=row.excerpt or "",
+    )
+
+
 def lead_from_model(model: models.LeadRequestModel) -> LeadRequest:
     return LeadRequest(
         id=model.id,
@@ -88,6 +132,7 @@ def review_from_model(model: models.ReviewModel) -> Review:
         rating=model.rating,
         comment=model.comment,
         created_at=model.created_at,
+        provider_id=model.provider_id,
     )
 
 
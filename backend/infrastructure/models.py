@@ -1,5 +1,7 @@
 from datetime import datetime
 from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
     Column,
     Integer,
     String,
@@ -9,12 +11,15 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     Enum,
-    ARRAY,
+    Index,
+    and_,
+    text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
-from backend.domain.entities import LeadStatus, PlanType
+from backend.domain.entities import RATING_STARS, LeadStatus, PlanType
+from backend.domain.ranking import rank_score
 from backend.infrastructure.db import Base
 
 
@@ -52,6 +57,12 @@ class AreaModel(Base):
     city = relationship("CityModel")
 
 
+def initial_rank_score(context) -> float:
+    """Score a new provider from the values being inserted, so it does not start at the bottom."""
+    values = context.get_current_parameters()
+    return rank_score(values.get("rating") or 0.0, values.get("rating_count") or 0, bool(values.get("verified")))
+
+
 class ProviderModel(Base):
     __tablename__ = "providers"
     id = Column(Integer, primary_key=True)
@@ -68,12 +79,37 @@ class ProviderModel(Base):
     availability = Column(String)
     whatsapp = Column(String)
     phone = Column(String)
-    rating = Column(Float, default=0.0)
-    rating_count = Column(Integer, default=0)
+    rating = Column(Float, default=0.0, nullable=False, server_default="0")
+    rating_count = Column(Integer, default=0, nullable=False, server_default="0")
+    # rating is rating_sum / rating_count; all three and the 1-5 star histogram
+    # are updated together by SqlAlchemyProviderRepository.add_rating.
+    rating_sum = Column(BigInteger, default=0, nullable=False, server_default="0")
+    rating_histogram = Column(
+        ARRAY(Integer), default=lambda: [0] * RATING_STARS, nullable=False, server_default="{0,0,0,0,0}"
+    )
+    # Reviews from before reviews.provider_id that could not be attributed to a
+    # provider; counted in rating_sum and rating_count but not in the histogram.
+    unattributed_rating_sum = Column(BigInteger, default=0, nullable=False, server_default="0")
+    unattributed_rating_count = Column(Integer, default=0, nullable=False, server_default="0")
+    rank_score = Column(Float, default=initial_rank_score, nullable=False, server_default="0")
+    # Maintained by the providers_search_document trigger from name and every bio_i18n locale.
+    search_document = deferred(Column(TSVECTOR))
 
     user = relationship("UserModel", back_populates="provider")
     city = relationship("CityModel")
 
+    __table_args__ = (
+        Index("ix_providers_category_ids", category_ids, postgresql_using="gin"),
+        Index("ix_providers_area_ids", area_ids, postgresql_using="gin"),
+        Index("ix_providers_languages", languages, postgresql_using="gin"),
+        Index("ix_providers_city_verified_rating", city_id, verified, rating.desc(), id),
+        Index("ix_providers_rating", rating.desc(), id),
+        Index("ix_providers_rank_score", rank_score.desc(), id),
+        Index("ix_providers_city_rank_score", city_id, rank_score.desc(), id),
+        Index("ix_providers_search_document", "search_document", postgresql_using="gin"),
+        # ix_providers_name_trgm (gin on menna_normalize(name)) is created by migration 0005.
+    )
+
 
 class LeadRequestModel(Base):
     __tablename__ = "leads"
@@ -95,15 +131,41 @@ class LeadDeliveryModel(Base):
     status = Column(Enum(LeadStatus), default=LeadStatus.DELIVERED)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ux_lead_deliveries_lead_provider", lead_id, provider_id, unique=True),
+        # Inbox pages: newest first per provider, optionally per status, read from the index alone.
+        Index(
+            "ix_lead_deliveries_provider_inbox",
+            provider_id,
+            created_at.desc(),
+            id.desc(),
+            postgresql_include=["lead_id", "status"],
+        ),
+        Index(
+            "ix_lead_deliveries_provider_status_inbox",
+            provider_id,
+            status,
+            created_at.desc(),
+            id.desc(),
+            postgresql_include=["lead_id"],
+        ),
+    )
+
 
 class ReviewModel(Base):
     __tablename__ = "reviews"
     id = Column(Integer, primary_key=True)
     lead_delivery_id = Column(Integer, ForeignKey("lead_deliveries.id"))
+    provider_id = Column(Integer, ForeignKey("providers.id"))
     rating = Column(Integer)
     comment = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        CheckConstraint("rating BETWEEN 1 AND 5", name="ck_reviews_rating"),
+        Index("ix_reviews_provider_created", provider_id, created_at.desc(), id.desc()),
+    )
+
 
 class PlanModel(Base):
     __tablename__ = "plans"
@@ -120,10 +182,31 @@ class SubscriptionModel(Base):
     id = Column(Integer, primary_key=True)
     provider_id = Column(Integer, ForeignKey("providers.id"))
     plan_id = Column(Integer, ForeignKey("plans.id"))
-    credits = Column(Integer)
+    credits = Column(Integer, nullable=False, default=0, server_default="0")
     active = Column(Boolean, default=True)
     expires_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index("ix_subscriptions_provider_chargeable", provider_id, postgresql_where=and_(active, credits > 0)),
+        CheckConstraint("credits >= 0", name="ck_subscriptions_credits_non_negative"),
+    )
+
+
+class CreditLedgerModel(Base):
+    """Append-only record of every credit movement; a trigger rejects UPDATE and DELETE."""
+
+    __tablename__ = "credit_ledger"
+    id = Column(BigInteger, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
+    provider_id = Column(Integer, ForeignKey("providers.id"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    balance_after = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+
+    __table_args__ = (Index("ix_credit_ledger_subscription", subscription_id, id),)
+
 
 class ContactEventModel(Base):
     __tablename__ = "contact_events"
@@ -133,3 +216,18 @@ class ContactEventModel(Base):
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
     token = Column(String, unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OutboxModel(Base):
+    """Events staged in the same transaction as the write that caused them; drained by the relay."""
+
+    __tablename__ = "outbox"
+    id = Column(BigInteger, primary_key=True)
+    topic = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+    # When the relay may claim the row again; pushed back exponentially on each failure.
+    next_attempt_at = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
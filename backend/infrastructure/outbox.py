@@ -0,0 +1,155 @@
+"""Transactional outbox.
+
+Use cases running inside a ``SqlAlchemyUnitOfWork`` get a ``SqlAlchemyOutbox`` as
+their analytics client and job queue, so their events and follow-up jobs become
+rows committed together with the write that caused them. ``OutboxRelay`` (run by
+``python -m backend.infrastructure.worker relay``) claims pending rows in batches
+with ``FOR UPDATE SKIP LOCKED``, ships analytics rows to ClickHouse and jobs to
+RQ, and deletes what was dispatched. Delivery is at-least-once: a relay that
+dies between dispatching and committing re-sends that batch.
+
+A row that fails is retried after an exponential backoff kept in
+``next_attempt_at``. After ``max_attempts`` failures the row is parked: it stays
+in the table with its ``last_error``, is logged at ERROR, and is never claimed
+again until someone resets ``attempts``.
+"""
+import asyncio
+import logging
+from dataclasses import asdict
+from typing import Any, Dict, List, Sequence
+
+import httpx
+from redis.exceptions import RedisError
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.application import ports
+from backend.application.jobs import JOB_TYPES, Job
+from backend.infrastructure import models
+from backend.infrastructure.services import ClickHouseWriter, event_row
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_TOPIC = "analytics"
+JOB_TOPIC = "job"
+
+
+class SqlAlchemyOutbox(ports.AnalyticsClient, ports.JobQueue):
+    """Stages rows on the session; they are written by the unit of work's commit."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def track(self, event: str, payload: Dict[str, Any]) -> None:
+        self.session.add(models.OutboxModel(topic=ANALYTICS_TOPIC, name=event, payload=payload))
+
+    async def publish(self, job: Job) -> None:
+        await self.publish_many([job])
+
+    async def publish_many(self, jobs: Sequence[Job]) -> None:
+        self.session.add_all(
+            [models.OutboxModel(topic=JOB_TOPIC, name=type(job).__name__, payload=asdict(job)) for job in jobs]
+        )
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        sessions,
+        writer: ClickHouseWriter,
+        jobs: ports.JobQueue,
+        batch_size: int = 500,
+        poll_seconds: float = 0.5,
+        max_attempts: int = 10,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 300.0,
+    ):
+        self.sessions = sessions
+        self.writer = writer
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+
+    async def run(self) -> None:
+        while True:
+            try:
+                dispatched = await self.dispatch_batch()
+            except Exception:
+                logger.exception("outbox relay batch failed")
+                dispatched = 0
+            # Only a full batch that went out is a reason to go again at once;
+            # anything less means the backlog is drained or a sink is failing.
+            if dispatched < self.batch_size:
+                await asyncio.sleep(self.poll_seconds)
+
+    def _retry_at(self, attempts):
+        """``now + min(base * 2 ** attempts, max)``, with ``attempts`` counted before this failure."""
+        delay = func.least(self.retry_base_seconds * func.power(2, attempts), self.retry_max_seconds)
+        return func.timezone("utc", func.now()) + delay * literal_column("interval '1 second'")
+
+    async def dispatch_batch(self) -> int:
+        """Dispatch one batch of due rows; returns how many were dispatched."""
+        outbox = models.OutboxModel
+        async with self.sessions() as session:
+            result = await session.execute(
+                select(outbox)
+                .where(
+                    outbox.attempts < self.max_attempts,
+                    outbox.next_attempt_at <= func.timezone("utc", func.now()),
+                )
+                .order_by(outbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                return 0
+            dispatched: List[int] = []
+            failed: Dict[str, List[int]] = {}
+            analytics = [row for row in rows if row.topic == ANALYTICS_TOPIC]
+            if analytics:
+                try:
+                    await self.writer.insert([event_row(row.name, row.payload, row.created_at) for row in analytics])
+                    dispatched += [row.id for row in analytics]
+                except httpx.HTTPError as exc:
+                    failed.setdefault(repr(exc), []).extend(row.id for row in analytics)
+            jobs = [row for row in rows if row.topic == JOB_TOPIC]
+            if jobs:
+                try:
+                    await self.jobs.publish_many([JOB_TYPES[row.name](**row.payload) for row in jobs])
+                    dispatched += [row.id for row in jobs]
+                except (RedisError, KeyError, TypeError) as exc:
+                    failed.setdefault(repr(exc), []).extend(row.id for row in jobs)
+            if dispatched:
+                await session.execute(delete(outbox).where(outbox.id.in_(dispatched)))
+            for error, ids in failed.items():
+                await session.execute(
+                    update(outbox)
+                    .where(outbox.id.in_(ids))
+                    .values(
+                        attempts=outbox.attempts + 1,
+                        last_error=error,
+                        next_attempt_at=self._retry_at(outbox.attempts),
+                    )
+                )
+            await session.commit()
+            if failed:
+                logger.warning("outbox relay could not dispatch %d of %d rows", len(rows) - len(dispatched), len(rows))
+                self._report_parked(rows, failed)
+            return len(dispatched)
+
+    def _report_parked(self, rows, failed: Dict[str, List[int]]) -> None:
+        attempts = {row.id: row.attempts for row in rows}
+        for error, ids in failed.items():
+            parked = [row_id for row_id in ids if attempts[row_id] + 1 >= self.max_attempts]
+            if parked:
+                logger.error(
+                    "outbox relay parked %d rows after %d attempts, ids %s: %s",
+                    len(parked),
+                    self.max_attempts,
+                    parked,
+                    error,
+                )
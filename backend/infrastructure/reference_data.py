@@ -0,0 +1,125 @@
+"""Immutable, pre-serialized snapshot of cities, areas, categories and plans.
+
+Every response body is rendered once per locale when the snapshot is built, so
+serving a request is a dictionary lookup and a byte copy. Reloads build a new
+snapshot and swap the reference; readers never see a half-built one.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from backend.application import ports
+from backend.domain.entities import Area, Category, City, LocaleMap, Plan
+
+LOCALES = ("ar", "he", "en")
+DEFAULT_LOCALE = "ar"
+
+BodyKey = Tuple[str, str]
+
+
+def pick_locale(accept_language: Optional[str]) -> str:
+    """Best supported locale for an ``Accept-Language`` header, honouring q-values."""
+    best, best_q = DEFAULT_LOCALE, 0.0
+    for part in (accept_language or "").split(","):
+        tag, _, params = part.strip().partition(";")
+        language = tag.strip().lower().split("-")[0]
+        if language not in LOCALES:
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if q > best_q:
+            best, best_q = language, q
+    return best
+
+
+def localized(names: LocaleMap, locale: str) -> str:
+    for candidate in (locale, DEFAULT_LOCALE, "en"):
+        if names.get(candidate):
+            return names[candidate]
+    return next(iter(names.values()), "")
+
+
+def _dump(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    version: str
+    bodies: Mapping[BodyKey, bytes]
+
+    def body(self, resource: str, locale: str) -> Optional[bytes]:
+        return self.bodies.get((resource, locale))
+
+
+def build_snapshot(
+    cities: Sequence[City], areas: Sequence[Area], categories: Sequence[Category], plans: Sequence[Plan]
+) -> ReferenceSnapshot:
+    cities = sorted(cities, key=lambda c: c.id)
+    areas = sorted(areas, key=lambda a: (a.city_id, a.id))
+    categories = sorted(categories, key=lambda c: c.id)
+    plans = sorted(plans, key=lambda p: p.id)
+    plan_rows = [
+        {
+            "id": p.id,
+            "name": p.name,
+            "plan_type": getattr(p.plan_type, "value", p.plan_type),
+            "monthly_credits": p.monthly_credits,
+            "price": float(p.price),
+            "features": list(p.features),
+        }
+        for p in plans
+    ]
+    raw = _dump(
+        {
+            "cities": [[c.id, c.name_i18n] for c in cities],
+            "areas": [[a.id, a.city_id, a.name_i18n] for a in areas],
+            "categories": [[c.id, c.name_i18n] for c in categories],
+            "plans": plan_rows,
+        }
+    )
+    bodies: Dict[BodyKey, bytes] = {}
+    for locale in LOCALES:
+        bodies[("cities", locale)] = _dump([{"id": c.id, "name": localized(c.name_i18n, locale)} for c in cities])
+        bodies[("categories", locale)] = _dump(
+            [{"id": c.id, "name": localized(c.name_i18n, locale)} for c in categories]
+        )
+        bodies[("plans", locale)] = _dump(plan_rows)
+        by_city: Dict[int, List[dict]] = {c.id: [] for c in cities}
+        for a in areas:
+            by_city.setdefault(a.city_id, []).append(
+                {"id": a.id, "city_id": a.city_id, "name": localized(a.name_i18n, locale)}
+            )
+        for city_id, rows in by_city.items():
+            bodies[(f"areas:{city_id}", locale)] = _dump(rows)
+    return ReferenceSnapshot(version=hashlib.sha1(raw).hexdigest()[:16], bodies=MappingProxyType(bodies))
+
+
+class ReferenceDataStore:
+    def __init__(self):
+        self.snapshot: Optional[ReferenceSnapshot] = None
+
+    async def load(self, geography: ports.GeographyRepository, plans: ports.PlanRepository) -> bool:
+        """Rebuild from the repositories; returns whether the content changed."""
+        snapshot = build_snapshot(
+            await geography.list_cities(),
+            await geography.list_all_areas(),
+            await geography.list_categories(),
+            await plans.list(),
+        )
+        if self.snapshot is not None and self.snapshot.version == snapshot.version:
+            return False
+        self.snapshot = snapshot
+        return True
+
+
+@lru_cache()
+def reference_data() -> ReferenceDataStore:
+    return ReferenceDataStore()
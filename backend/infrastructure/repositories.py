@@ -1,12 +1,117 @@
-from typing import List, Optional
-from sqlalchemy import select, update
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    and_,
+    case,
+    cast,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from backend.application import ports
-from backend.domain.entities import ContactEvent, LeadDelivery, LeadRequest, Provider, Review, Subscription, User
+from backend.domain.entities import (
+    RATING_STARS,
+    ContactEvent,
+    CreditReason,
+    InboxItem,
+    LeadDelivery,
+    LeadRequest,
+    LeadStatus,
+    Provider,
+    ProviderCard,
+    ProviderFacets,
+    Review,
+    Subscription,
+    User,
+)
+from backend.domain.ranking import DEFAULT_RANKING, RankingParams
 from backend.infrastructure import models, mappers
 
 
+logger = logging.getLogger(__name__)
+
+UNIT_OF_WORK = "unit_of_work"
+AFTER_COMMIT = "after_commit"
+AFTER_ROLLBACK = "after_rollback"
+
+Callback = Callable[[], Awaitable[None]]
+
+
+async def _commit(session: AsyncSession) -> None:
+    """Commit a repository write, or only flush it while a unit of work owns the transaction."""
+    if session.info.get(UNIT_OF_WORK):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def _after_commit(session: AsyncSession, callback: Callback) -> None:
+    """Run ``callback`` when the unit of work on ``session`` commits; a lone write has committed already."""
+    if session.info.get(UNIT_OF_WORK):
+        session.info[AFTER_COMMIT].append(callback)
+    else:
+        await callback()
+
+
+async def _run_callbacks(callbacks: List[Callback]) -> None:
+    # The transaction's outcome is settled; a failing side effect must not mask it.
+    for callback in callbacks:
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Unit of work callback failed")
+
+
+class SqlAlchemyUnitOfWork(ports.UnitOfWork):
+    """Groups every repository write and staged outbox row on ``session`` into one commit."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __aenter__(self) -> "SqlAlchemyUnitOfWork":
+        self.session.info[UNIT_OF_WORK] = True
+        self.session.info[AFTER_COMMIT] = []
+        self.session.info[AFTER_ROLLBACK] = []
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.session.info.pop(UNIT_OF_WORK, None)
+        committed = self.session.info.pop(AFTER_COMMIT, [])
+        rolled_back = self.session.info.pop(AFTER_ROLLBACK, [])
+        if exc_type is not None:
+            await self.session.rollback()
+            await _run_callbacks(rolled_back)
+            return
+        try:
+            await self.session.commit()
+        except BaseException:
+            await _run_callbacks(rolled_back)
+            raise
+        await _run_callbacks(committed)
+
+    async def after_commit(self, callback: Callback) -> None:
+        await _after_commit(self.session, callback)
+
+    async def after_rollback(self, callback: Callback) -> None:
+        if self.session.info.get(UNIT_OF_WORK):
+            self.session.info[AFTER_ROLLBACK].append(callback)
+
+
 class SqlAlchemyUserRepository(ports.UserRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -33,7 +138,7 @@ class SqlAlchemyUserRepository(ports.UserRepository):
                 phone_verified=user.phone_verified,
             )
             self.session.add(model)
-        await self.session.commit()
+        await _commit(self.session)
         await self.session.refresh(model)
         return mappers.user_from_model(model)
 
@@ -48,9 +153,200 @@ class SqlAlchemyUserRepository(ports.UserRepository):
         return mappers.user_from_model(model) if model else None
 
 
+def provider_filters(
+    category_id: Optional[int] = None,
+    city_id: Optional[int] = None,
+    area_ids: Optional[List[int]] = None,
+    verified: Optional[bool] = None,
+    language: Optional[str] = None,
+    area_match: str = "all",
+) -> list:
+    """WHERE clauses for a provider listing.
+
+    Array filters use ``@>``/``&&`` rather than ``= ANY()`` so the planner can
+    answer them from the GIN indexes on the array columns.
+    """
+    provider = models.ProviderModel
+    clauses = []
+    if category_id:
+        clauses.append(provider.category_ids.contains([category_id]))
+    if city_id:
+        clauses.append(provider.city_id == city_id)
+    if area_ids:
+        if area_match == "any":
+            clauses.append(provider.area_ids.overlap(area_ids))
+        else:
+            clauses.append(provider.area_ids.contains(area_ids))
+    if verified is not None:
+        clauses.append(provider.verified == verified)
+    if language:
+        clauses.append(provider.languages.contains([language]))
+    return clauses
+
+
+def rank_score_sql(rating, rating_count, verified, params: RankingParams = DEFAULT_RANKING):
+    """SQL twin of ``backend.domain.ranking.rank_score``."""
+    return (
+        (params.prior_weight * params.prior_mean + rating * rating_count) / (params.prior_weight + rating_count)
+        + case((verified, params.verified_boost), else_=0.0)
+        + params.volume_weight * func.ln(1 + rating_count)
+    )
+
+
+def rating_average(rating_sum, rating_count):
+    return func.coalesce(cast(rating_sum, Float) / func.nullif(rating_count, 0), 0.0)
+
+
+def rating_recompute_statement():
+    """Rebuild every provider's rating aggregate from ``reviews`` in one set-wise UPDATE.
+
+    A provider's unattributed baseline is added back in, so reviews that
+    predate ``reviews.provider_id`` are not dropped from its rating.
+    """
+    provider, review = models.ProviderModel, models.ReviewModel
+    totals = (
+        select(
+            provider.id.label("provider_id"),
+            func.coalesce(func.sum(review.rating), 0).label("rating_sum"),
+            func.count(review.id).label("rating_count"),
+            array(
+                [func.count(review.id).filter(review.rating == star) for star in range(1, RATING_STARS + 1)]
+            ).label("rating_histogram"),
+        )
+        .select_from(provider)
+        .outerjoin(review, review.provider_id == provider.id)
+        .group_by(provider.id)
+        .subquery()
+    )
+    rating_sum = totals.c.rating_sum + provider.unattributed_rating_sum
+    rating_count = totals.c.rating_count + provider.unattributed_rating_count
+    rating = rating_average(rating_sum, rating_count)
+    return (
+        update(provider)
+        .where(
+            provider.id == totals.c.provider_id,
+            or_(
+                provider.rating_sum.is_distinct_from(rating_sum),
+                provider.rating_count.is_distinct_from(rating_count),
+                provider.rating_histogram.is_distinct_from(cast(totals.c.rating_histogram, ARRAY(Integer))),
+            ),
+        )
+        .values(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating_histogram=totals.c.rating_histogram,
+            rating=rating,
+            rank_score=rank_score_sql(rating, rating_count, provider.verified),
+        )
+    )
+
+
+SORT_COLUMNS = {"rating": models.ProviderModel.rating, "relevance": models.ProviderModel.rank_score}
+
+
+# Columns read for view="card": no JSONB bio, contact details or search document.
+PROVIDER_CARD_COLUMNS = (
+    models.ProviderModel.id,
+    models.ProviderModel.name,
+    models.ProviderModel.avatar_url,
+    models.ProviderModel.verified,
+    models.ProviderModel.category_ids,
+    models.ProviderModel.city_id,
+    models.ProviderModel.rating,
+    models.ProviderModel.rating_count,
+    models.ProviderModel.rank_score,
+)
+
+
+def _provider_columns(view: str) -> tuple:
+    return PROVIDER_CARD_COLUMNS if view == "card" else (models.ProviderModel,)
+
+
+def provider_list_query(
+    filters: list, sort: Optional[str], limit: Optional[int], after: Optional[List[Any]], view: str = "full"
+):
+    provider = models.ProviderModel
+    query = select(*_provider_columns(view)).where(*filters)
+    column = SORT_COLUMNS.get(sort)
+    if column is not None:
+        if after:
+            value, provider_id = after
+            query = query.where(or_(column < value, and_(column == value, provider.id > provider_id)))
+        query = query.order_by(column.desc(), provider.id)
+    else:
+        if after:
+            query = query.where(provider.id > after[0])
+        query = query.order_by(provider.id)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def provider_search_query(
+    q: str, filters: list, limit: Optional[int], after: Optional[List[Any]], view: str = "full"
+):
+    """Rank by tsvector match over name and every bio locale plus trigram similarity on the name.
+
+    Both sides go through ``menna_normalize`` so the query hits the GIN indexes
+    on ``search_document`` and ``menna_normalize(name)``.
+    """
+    provider = models.ProviderModel
+    term = func.menna_normalize(q)
+    tsquery = func.websearch_to_tsquery("simple", term)
+    name = func.menna_normalize(provider.name)
+    score = cast(func.ts_rank_cd(provider.search_document, tsquery) + func.similarity(name, term), Float)
+    query = (
+        select(*_provider_columns(view), score.label("score"))
+        .where(*filters)
+        .where(or_(provider.search_document.op("@@")(tsquery), name.op("%")(term)))
+    )
+    if after:
+        value, provider_id = after
+        query = query.where(or_(score < value, and_(score == value, provider.id > provider_id)))
+    query = query.order_by(score.desc(), provider.id)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def provider_facets_query(
+    category_id: Optional[int] = None,
+    city_id: Optional[int] = None,
+    area_ids: Optional[List[int]] = None,
+    verified: Optional[bool] = None,
+    language: Optional[str] = None,
+    area_match: str = "all",
+):
+    """``(facet, value, count)`` rows for every facet in a single round trip.
+
+    Each branch drops its own facet's filter; array facets are unnested so the
+    counts come from one GROUP BY per facet rather than one query per value.
+    """
+    provider = models.ProviderModel
+    selected = dict(category_id=category_id, city_id=city_id, area_ids=area_ids, verified=verified, language=language)
+
+    def counts(facet: str, value, own_filter: str):
+        filters = provider_filters(**{**selected, own_filter: None}, area_match=area_match)
+        return (
+            select(literal(facet).label("facet"), cast(value, String).label("value"), func.count().label("count"))
+            .select_from(provider)
+            .where(*filters)
+            .group_by(value)
+        )
+
+    return union_all(
+        counts("category", func.unnest(provider.category_ids).column_valued("value"), "category_id"),
+        counts("city", provider.city_id, "city_id"),
+        counts("area", func.unnest(provider.area_ids).column_valued("value"), "area_ids"),
+        counts("verified", provider.verified, "verified"),
+        counts("language", func.unnest(provider.languages).column_valued("value"), "language"),
+    )
+
+
 class SqlAlchemyProviderRepository(ports.ProviderRepository):
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, listeners: Sequence[ports.ProviderChangeListener] = ()):
         self.session = session
+        self.listeners = listeners
 
     async def list(
         self,
@@ -60,36 +356,120 @@ class SqlAlchemyProviderRepository(ports.ProviderRepository):
         verified: Optional[bool] = None,
         language: Optional[str] = None,
         sort: Optional[str] = None,
-    ) -> List[Provider]:
-        query = select(models.ProviderModel)
-        if category_id:
-            query = query.where(models.ProviderModel.category_ids.any(category_id))
-        if city_id:
-            query = query.where(models.ProviderModel.city_id == city_id)
-        if area_ids:
-            for area in area_ids:
-                query = query.where(models.ProviderModel.area_ids.any(area))
-        if verified is not None:
-            query = query.where(models.ProviderModel.verified == verified)
-        if language:
-            query = query.where(models.ProviderModel.languages.any(language))
-        if sort == "rating":
-            query = query.order_by(models.ProviderModel.rating.desc())
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+        view: str = "full",
+    ) -> List[Union[Provider, ProviderCard]]:
+        query = provider_list_query(
+            provider_filters(category_id, city_id, area_ids, verified, language, area_match), sort, limit, after, view
+        )
         result = await self.session.execute(query)
+        if view == "card":
+            return [mappers.provider_card_from_row(row) for row in result.all()]
         return [mappers.provider_from_model(row) for row in result.scalars().all()]
 
+    async def search(
+        self,
+        q: str,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+        view: str = "full",
+    ) -> List[Tuple[Union[Provider, ProviderCard], float]]:
+        query = provider_search_query(
+            q, provider_filters(category_id, city_id, area_ids, verified, language, area_match), limit, after, view
+        )
+        result = await self.session.execute(query)
+        if view == "card":
+            return [(mappers.provider_card_from_row(row), row.score) for row in result.all()]
+        return [(mappers.provider_from_model(model), score) for model, score in result.all()]
+
+    async def facets(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        area_match: str = "all",
+    ) -> ProviderFacets:
+        query = provider_facets_query(category_id, city_id, area_ids, verified, language, area_match)
+        result = await self.session.execute(query)
+        return mappers.provider_facets_from_rows(result.all())
+
     async def get(self, provider_id: int) -> Optional[Provider]:
         result = await self.session.execute(select(models.ProviderModel).where(models.ProviderModel.id == provider_id))
         model = result.scalar_one_or_none()
         return mappers.provider_from_model(model) if model else None
 
-    async def update_rating(self, provider_id: int, rating: float, count: int) -> None:
-        await self.session.execute(
-            update(models.ProviderModel)
-            .where(models.ProviderModel.id == provider_id)
-            .values(rating=rating, rating_count=count)
+    async def existing_ids(self, provider_ids: List[int]) -> Set[int]:
+        result = await self.session.execute(
+            select(models.ProviderModel.id).where(models.ProviderModel.id.in_(provider_ids))
         )
-        await self.session.commit()
+        return set(result.scalars().all())
+
+    async def owners(self, provider_ids: List[int]) -> Dict[int, int]:
+        provider = models.ProviderModel
+        result = await self.session.execute(select(provider.id, provider.user_id).where(provider.id.in_(provider_ids)))
+        return dict(result.tuples().all())
+
+    async def add_rating(self, provider_id: int, rating: int) -> None:
+        provider = models.ProviderModel
+        rating_sum = provider.rating_sum + rating
+        rating_count = provider.rating_count + 1
+        average = rating_average(rating_sum, rating_count)
+        # The SET expressions read the row version the UPDATE locked, so
+        # concurrent reviews serialize on the row instead of overwriting each other.
+        result = await self.session.execute(
+            update(provider)
+            .where(provider.id == provider_id)
+            .values(
+                {
+                    provider.rating_sum: rating_sum,
+                    provider.rating_count: rating_count,
+                    provider.rating_histogram[rating]: provider.rating_histogram[rating] + 1,
+                    provider.rating: average,
+                    provider.rank_score: rank_score_sql(average, rating_count, provider.verified),
+                }
+            )
+            .returning(provider)
+        )
+        model = result.scalar_one_or_none()
+        await _commit(self.session)
+        if model:
+            await self._changed(mappers.provider_from_model(model))
+
+    async def recompute_ratings(self) -> int:
+        # SHARE mode waits for in-flight review inserts and holds off new ones, so
+        # the recompute cannot overwrite a review committed while it runs.
+        await self.session.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+        result = await self.session.execute(rating_recompute_statement())
+        await _commit(self.session)
+        return result.rowcount
+
+    async def recompute_rank_scores(self) -> int:
+        provider = models.ProviderModel
+        score = rank_score_sql(provider.rating, provider.rating_count, provider.verified)
+        result = await self.session.execute(
+            update(provider).where(provider.rank_score.is_distinct_from(score)).values(rank_score=score)
+        )
+        await _commit(self.session)
+        return result.rowcount
+
+    async def _changed(self, provider: Provider, previous: Optional[Provider] = None) -> None:
+        """Tell the listeners once the change is committed, so no cache or index sees one that rolls back."""
+
+        async def notify() -> None:
+            for listener in self.listeners:
+                await listener.provider_changed(provider, previous)
+
+        await _after_commit(self.session, notify)
 
 
 class SqlAlchemyGeographyRepository(ports.GeographyRepository):
@@ -104,11 +484,193 @@ class SqlAlchemyGeographyRepository(ports.GeographyRepository):
         res = await self.session.execute(select(models.AreaModel).where(models.AreaModel.city_id == city_id))
         return [mappers.area_from_model(m) for m in res.scalars().all()]
 
+    async def list_all_areas(self):
+        res = await self.session.execute(select(models.AreaModel))
+        return [mappers.area_from_model(m) for m in res.scalars().all()]
+
     async def list_categories(self):
         res = await self.session.execute(select(models.CategoryModel))
         return [mappers.category_from_model(m) for m in res.scalars().all()]
 
 
+def lead_matching_statement(lead: LeadRequest):
+    return delivery_statement(
+        lead.id, provider_filters(lead.category_id, lead.city_id, lead.area_ids, area_match="any")
+    )
+
+
+def chargeable_subscription(subscription) -> list:
+    return [
+        subscription.active.is_(True),
+        subscription.credits > 0,
+        or_(subscription.expires_at.is_(None), subscription.expires_at > func.now()),
+    ]
+
+
+def ledger_debit(charged, reason: CreditReason, lead_id: Optional[int] = None):
+    """INSERT recording a one-credit debit for every row of ``charged``."""
+    ledger = models.CreditLedgerModel
+    rows = select(
+        charged.c.subscription_id,
+        charged.c.provider_id,
+        literal(-1),
+        charged.c.credits,
+        literal(reason.value),
+        literal(lead_id, Integer),
+    )
+    return insert(ledger).from_select(
+        ["subscription_id", "provider_id", "delta", "balance_after", "reason", "lead_id"], rows
+    )
+
+
+def delivery_statement(lead_id: int, provider_clauses: list):
+    """One statement that picks chargeable providers, charges their credits and inserts the deliveries.
+
+    ``eligible`` narrows providers by ``provider_clauses`` and joins the partial
+    chargeable-subscription index, one subscription per provider. ``charged``
+    re-checks ``credits > 0`` under the row lock, so concurrent charges never
+    drive a balance negative, and only charged providers get a delivery row
+    and a ledger debit. Callers hold the lead's row lock (``lock_for_delivery``),
+    so ``ON CONFLICT DO NOTHING`` on ``(lead_id, provider_id)`` is a backstop
+    that never drops a charged row.
+    """
+    provider = models.ProviderModel
+    subscription = models.SubscriptionModel
+    delivery = models.LeadDeliveryModel
+    already_delivered = exists().where(delivery.lead_id == lead_id, delivery.provider_id == provider.id)
+    eligible = (
+        select(subscription.id.label("subscription_id"), provider.id.label("provider_id"))
+        .distinct(provider.id)
+        .join(subscription, subscription.provider_id == provider.id)
+        .where(*provider_clauses, *chargeable_subscription(subscription), ~already_delivered)
+        .order_by(provider.id, subscription.credits.desc())
+        .cte("eligible")
+    )
+    charged = (
+        update(subscription)
+        .where(subscription.id == eligible.c.subscription_id, subscription.credits > 0)
+        .values(credits=subscription.credits - 1)
+        .returning(subscription.id.label("subscription_id"), eligible.c.provider_id, subscription.credits)
+        .cte("charged")
+    )
+    debits = ledger_debit(charged, CreditReason.LEAD_DELIVERY, lead_id).returning(models.CreditLedgerModel.id)
+    rows = select(
+        literal(lead_id),
+        charged.c.provider_id,
+        literal(LeadStatus.DELIVERED, delivery.status.type),
+        func.timezone("utc", func.now()),
+    )
+    return (
+        pg_insert(delivery)
+        .from_select(["lead_id", "provider_id", "status", "created_at"], rows)
+        .on_conflict_do_nothing(index_elements=[delivery.lead_id, delivery.provider_id])
+        .add_cte(debits.cte("debits"))
+        .returning(delivery.id, delivery.lead_id, delivery.provider_id, delivery.status, delivery.created_at)
+    )
+
+
+def credit_reservation_statement(provider_id: int, reason: CreditReason, lead_id: Optional[int] = None):
+    """Take one credit from the provider's chargeable subscription and log it, or match no rows.
+
+    The ``credits > 0`` guard is evaluated again after the row lock is granted,
+    so parallel reservations serialize on the row and the loser sees zero rows
+    instead of a negative balance.
+    """
+    subscription = models.SubscriptionModel
+    candidate = aliased(subscription)
+    target = (
+        select(candidate.id)
+        .where(candidate.provider_id == provider_id, *chargeable_subscription(candidate))
+        .order_by(candidate.credits.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    charged = (
+        update(subscription)
+        .where(subscription.id == target, subscription.credits > 0)
+        .values(credits=subscription.credits - 1)
+        .returning(subscription.id.label("subscription_id"), subscription.provider_id, subscription.credits)
+        .cte("charged")
+    )
+    return ledger_debit(charged, reason, lead_id).returning(models.CreditLedgerModel.balance_after)
+
+
+STATUS_BATCH_CHUNK = 5000
+INBOX_EXCERPT_CHARS = 160
+
+
+def inbox_query(
+    provider_id: int, status: Optional[LeadStatus], limit: Optional[int], after: Optional[List[Any]]
+):
+    """A provider's deliveries newest first, each joined to its lead by primary key.
+
+    The row comparison on ``(created_at, id)`` walks ``ix_lead_deliveries_provider_inbox``
+    (or its per-status twin) from the cursor, so a page costs ``limit`` index
+    entries and ``limit`` lead lookups however long the history is.
+    """
+    delivery = models.LeadDeliveryModel
+    lead = models.LeadRequestModel
+    query = (
+        select(
+            delivery.id.label("delivery_id"),
+            delivery.lead_id,
+            delivery.status,
+            delivery.created_at.label("delivered_at"),
+            lead.category_id,
+            lead.city_id,
+            lead.area_ids,
+            lead.preferred_time,
+            func.left(lead.description, INBOX_EXCERPT_CHARS).label("excerpt"),
+        )
+        .join(lead, lead.id == delivery.lead_id)
+        .where(delivery.provider_id == provider_id)
+    )
+    if status is not None:
+        query = query.where(delivery.status == status)
+    if after:
+        query = query.where(tuple_(delivery.created_at, delivery.id) < tuple_(*after))
+    query = query.order_by(delivery.created_at.desc(), delivery.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def provider_reviews_query(provider_id: int, limit: Optional[int], after: Optional[List[Any]]):
+    """A provider's reviews newest first, walking ``ix_reviews_provider_created`` from the cursor."""
+    review = models.ReviewModel
+    query = select(review).where(review.provider_id == provider_id)
+    if after:
+        query = query.where(tuple_(review.created_at, review.id) < tuple_(*after))
+    query = query.order_by(review.created_at.desc(), review.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def delivery_status_statement(transitions: List[Tuple[int, LeadStatus]]):
+    """Set-based forward-only status update from two parallel arrays.
+
+    The ``leadstatus`` enum orders its labels by lifecycle, so ``<`` is the
+    forward-only guard and a late "opened" never overwrites "responded".
+    """
+    delivery = models.LeadDeliveryModel
+    incoming = (
+        func.unnest(
+            literal([delivery_id for delivery_id, _ in transitions], ARRAY(Integer)),
+            literal([status.name for _, status in transitions], ARRAY(String)),
+        )
+        .table_valued("id", "status")
+        .render_derived(name="incoming")
+    )
+    status = cast(incoming.c.status, delivery.status.type)
+    return (
+        update(delivery)
+        .where(delivery.id == incoming.c.id, or_(delivery.status.is_(None), delivery.status < status))
+        .values(status=status)
+        .returning(delivery.id, delivery.lead_id, delivery.provider_id, delivery.status, delivery.created_at)
+    )
+
+
 class SqlAlchemyLeadRepository(ports.LeadRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -123,16 +685,49 @@ class SqlAlchemyLeadRepository(ports.LeadRepository):
             preferred_time=lead.preferred_time,
         )
         self.session.add(model)
-        await self.session.commit()
+        await _commit(self.session)
         await self.session.refresh(model)
         return mappers.lead_from_model(model)
 
+    async def get(self, lead_id: int) -> Optional[LeadRequest]:
+        model = await self.session.get(models.LeadRequestModel, lead_id)
+        return mappers.lead_from_model(model) if model else None
+
+    async def lock_for_delivery(self, lead_id: int) -> Optional[LeadRequest]:
+        # Deliveries of one lead serialize on its row, so a delivery statement
+        # always sees the deliveries committed before it and never charges a
+        # credit for a row ON CONFLICT then drops.
+        result = await self.session.execute(
+            select(models.LeadRequestModel).where(models.LeadRequestModel.id == lead_id).with_for_update()
+        )
+        model = result.scalar_one_or_none()
+        return mappers.lead_from_model(model) if model else None
+
+    async def match_and_deliver(self, lead: LeadRequest) -> List[LeadDelivery]:
+        await self.lock_for_delivery(lead.id)
+        result = await self.session.execute(lead_matching_statement(lead))
+        await _commit(self.session)
+        return [mappers.delivery_from_model(row) for row in result.all()]
+
+    async def deliver_to_providers(self, lead_id: int, provider_ids: List[int]) -> List[LeadDelivery]:
+        statement = delivery_statement(lead_id, [models.ProviderModel.id.in_(provider_ids)])
+        result = await self.session.execute(statement)
+        await _commit(self.session)
+        return [mappers.delivery_from_model(row) for row in result.all()]
+
+    async def delivered_provider_ids(self, lead_id: int, provider_ids: List[int]) -> Set[int]:
+        delivery = models.LeadDeliveryModel
+        result = await self.session.execute(
+            select(delivery.provider_id).where(delivery.lead_id == lead_id, delivery.provider_id.in_(provider_ids))
+        )
+        return set(result.scalars().all())
+
     async def add_delivery(self, delivery: LeadDelivery) -> LeadDelivery:
         model = models.LeadDeliveryModel(
             lead_id=delivery.lead_id, provider_id=delivery.provider_id, status=delivery.status
         )
         self.session.add(model)
-        await self.session.commit()
+        await _commit(self.session)
         await self.session.refresh(model)
         return mappers.delivery_from_model(model)
 
@@ -140,7 +735,47 @@ class SqlAlchemyLeadRepository(ports.LeadRepository):
         await self.session.execute(
             update(models.LeadDeliveryModel).where(models.LeadDeliveryModel.id == delivery_id).values(status=status)
         )
-        await self.session.commit()
+        await _commit(self.session)
+
+    async def advance_delivery_statuses(self, statuses: Dict[int, LeadStatus]) -> List[LeadDelivery]:
+        changed = []
+        items = sorted(statuses.items())
+        for start in range(0, len(items), STATUS_BATCH_CHUNK):
+            chunk = items[start : start + STATUS_BATCH_CHUNK]
+            result = await self.session.execute(delivery_status_statement(chunk))
+            changed += [mappers.delivery_from_model(row) for row in result.all()]
+        await _commit(self.session)
+        return changed
+
+    async def find_delivery(self, lead_id: int, provider_id: int) -> Optional[LeadDelivery]:
+        delivery = models.LeadDeliveryModel
+        result = await self.session.execute(
+            select(delivery).where(delivery.lead_id == lead_id, delivery.provider_id == provider_id)
+        )
+        model = result.scalar_one_or_none()
+        return mappers.delivery_from_model(model) if model else None
+
+    async def delivery_owners(self, delivery_ids: List[int]) -> Dict[int, int]:
+        delivery, provider = models.LeadDeliveryModel, models.ProviderModel
+        owners: Dict[int, int] = {}
+        for start in range(0, len(delivery_ids), STATUS_BATCH_CHUNK):
+            result = await self.session.execute(
+                select(delivery.id, provider.user_id)
+                .join(provider, provider.id == delivery.provider_id)
+                .where(delivery.id.in_(delivery_ids[start : start + STATUS_BATCH_CHUNK]))
+            )
+            owners.update(result.tuples().all())
+        return owners
+
+    async def inbox(
+        self,
+        provider_id: int,
+        status: Optional[LeadStatus] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+    ) -> List[InboxItem]:
+        result = await self.session.execute(inbox_query(provider_id, status, limit, after))
+        return [mappers.inbox_item_from_row(row) for row in result.all()]
 
     async def has_contact(self, lead_id: int, provider_id: int, user_id: int) -> bool:
         q = select(models.ContactEventModel).where(
@@ -158,13 +793,22 @@ class SqlAlchemyReviewRepository(ports.ReviewRepository):
 
     async def create(self, review: Review) -> Review:
         model = models.ReviewModel(
-            lead_delivery_id=review.lead_delivery_id, rating=review.rating, comment=review.comment
+            lead_delivery_id=review.lead_delivery_id,
+            provider_id=review.provider_id,
+            rating=review.rating,
+            comment=review.comment,
         )
         self.session.add(model)
-        await self.session.commit()
+        await _commit(self.session)
         await self.session.refresh(model)
         return mappers.review_from_model(model)
 
+    async def list_for_provider(
+        self, provider_id: int, limit: Optional[int] = None, after: Optional[List[Any]] = None
+    ) -> List[Review]:
+        result = await self.session.execute(provider_reviews_query(provider_id, limit, after))
+        return [mappers.review_from_model(model) for model in result.scalars().all()]
+
 
 class SqlAlchemySubscriptionRepository(ports.SubscriptionRepository):
     def __init__(self, session: AsyncSession):
@@ -179,13 +823,13 @@ class SqlAlchemySubscriptionRepository(ports.SubscriptionRepository):
         model = res.scalar_one_or_none()
         return mappers.subscription_from_model(model) if model else None
 
-    async def decrement_credit(self, subscription_id: int) -> None:
-        await self.session.execute(
-            update(models.SubscriptionModel)
-            .where(models.SubscriptionModel.id == subscription_id)
-            .values(credits=models.SubscriptionModel.credits - 1)
+    async def reserve_credit(self, provider_id: int, lead_id: Optional[int] = None) -> Optional[int]:
+        result = await self.session.execute(
+            credit_reservation_statement(provider_id, CreditReason.LEAD_DELIVERY, lead_id)
         )
-        await self.session.commit()
+        balance = result.scalar_one_or_none()
+        await _commit(self.session)
+        return balance
 
 
 class SqlAlchemyPlanRepository(ports.PlanRepository):
@@ -209,6 +853,6 @@ class SqlAlchemyContactRepository(ports.ContactRepository):
             token=event.token,
         )
         self.session.add(model)
-        await self.session.commit()
+        await _commit(self.session)
         await self.session.refresh(model)
         return mappers.contact_from_model(model)
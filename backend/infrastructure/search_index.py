@@ -0,0 +1,300 @@
+"""In-process inverted index over provider filter attributes.
+
+Every indexed provider gets a slot number; each posting list is a Python int
+used as a bitmap of slots, so a filter combination is a handful of big-int ANDs.
+Each sort order also keeps every slot presorted, so a page of a broad search
+bisects to its cursor and stops after ``limit`` matches.
+"""
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from backend.application import ports
+from backend.domain.entities import Provider, ProviderCard, ProviderFacets
+
+PostingKey = Tuple[str, object]
+
+FACETS = ("category", "city", "area", "verified", "language")
+
+
+def _posting_keys(provider: Provider) -> List[PostingKey]:
+    keys: List[PostingKey] = [("city", provider.city_id), ("verified", bool(provider.verified))]
+    keys += [("category", c) for c in provider.categories]
+    keys += [("area", a) for a in provider.area_ids]
+    keys += [("language", lang) for lang in provider.languages]
+    return keys
+
+
+def _rating_order(provider: Provider) -> Tuple[float, int]:
+    return (-provider.rating, provider.id)
+
+
+def _relevance_order(provider: Provider) -> Tuple[float, int]:
+    return (-provider.rank_score, provider.id)
+
+
+def _id_order(provider: Provider) -> Tuple[int]:
+    return (provider.id,)
+
+
+SORT_ORDERS = {"rating": _rating_order, "relevance": _relevance_order}
+ORDERS = {**SORT_ORDERS, "id": _id_order}
+
+# The set bit positions of every byte value.
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def _bitmap_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def _set_slots(bits: int) -> List[int]:
+    """Slot numbers set in ``bits``, in linear time; ``bits & -bits`` copies the whole int per bit."""
+    slots = []
+    for offset, byte in enumerate(_bitmap_bytes(bits)):
+        if byte:
+            base = offset * 8
+            slots += [base + bit for bit in _BYTE_BITS[byte]]
+    return slots
+
+
+class ProviderSearchIndex(ports.ProviderChangeListener):
+    def __init__(self):
+        self.ready = False
+        self._clear()
+
+    def _clear(self) -> None:
+        self._slots: Dict[int, int] = {}
+        self._providers: List[Optional[Provider]] = []
+        self._free: List[int] = []
+        self._postings: Dict[PostingKey, int] = {}
+        self._all = 0
+        # Per sort order, (order key, slot) for every indexed provider, ascending.
+        self._sorted: Dict[str, List[Tuple[tuple, int]]] = {name: [] for name in ORDERS}
+
+    def rebuild(self, providers: Iterable[Provider]) -> None:
+        self._clear()
+        for provider in providers:
+            self._add(provider, presorted=False)
+        for entries in self._sorted.values():
+            entries.sort()
+        self.ready = True
+
+    def upsert(self, provider: Provider) -> None:
+        self.remove(provider.id)
+        self._add(provider)
+
+    def remove(self, provider_id: int) -> None:
+        slot = self._slots.pop(provider_id, None)
+        if slot is None:
+            return
+        provider = self._providers[slot]
+        for name, order in ORDERS.items():
+            entries = self._sorted[name]
+            del entries[bisect_left(entries, (order(provider), slot))]
+        mask = ~(1 << slot)
+        for key in _posting_keys(provider):
+            self._postings[key] &= mask
+            if not self._postings[key]:
+                del self._postings[key]
+        self._all &= mask
+        self._providers[slot] = None
+        self._free.append(slot)
+
+    async def provider_changed(self, provider: Provider, previous: Optional[Provider] = None) -> None:
+        self.upsert(provider)
+
+    def get(self, provider_id: int) -> Optional[Provider]:
+        slot = self._slots.get(provider_id)
+        return self._providers[slot] if slot is not None else None
+
+    def search(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+    ) -> List[Provider]:
+        bits = self._all
+        for mask in self._filter_masks(category_id, city_id, area_ids, verified, language, area_match).values():
+            bits &= mask
+        name = sort if sort in SORT_ORDERS else "id"
+        order = ORDERS[name]
+        start = None
+        if after:
+            start = (-after[0], after[1]) if name in SORT_ORDERS else (after[0],)
+        matches, size = bits.bit_count(), len(self._slots)
+        # Walking the presorted slots finds ``limit`` hits after about
+        # limit * size / matches entries; reading the bitmap out costs a pass
+        # over its size / 8 bytes plus sorting every match.
+        if limit and matches and limit * size <= matches * (size // 8 + matches):
+            return self._walk_presorted(name, bits, start, limit)
+        providers = [self._providers[slot] for slot in _set_slots(bits)]
+        if start is not None:
+            providers = [p for p in providers if order(p) > start]
+        if limit:
+            return heapq.nsmallest(limit, providers, key=order)
+        return sorted(providers, key=order)
+
+    def _walk_presorted(self, name: str, bits: int, start: Optional[tuple], limit: int) -> List[Provider]:
+        entries = self._sorted[name]
+        # (start, inf) sorts after every entry whose key equals the cursor's.
+        position = bisect_right(entries, (start, float("inf"))) if start is not None else 0
+        bitmap = _bitmap_bytes(bits)
+        providers: List[Provider] = []
+        for index in range(position, len(entries)):
+            slot = entries[index][1]
+            if slot >> 3 < len(bitmap) and bitmap[slot >> 3] >> (slot & 7) & 1:
+                providers.append(self._providers[slot])
+                if len(providers) == limit:
+                    break
+        return providers
+
+    def facets(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        area_match: str = "all",
+    ) -> ProviderFacets:
+        masks = self._filter_masks(category_id, city_id, area_ids, verified, language, area_match)
+        facet_bits = {}
+        for facet in FACETS:
+            bits = self._all
+            for name, mask in masks.items():
+                if name != facet:
+                    bits &= mask
+            facet_bits[facet] = bits
+        facets = ProviderFacets()
+        for (facet, value), posting in self._postings.items():
+            count = (posting & facet_bits[facet]).bit_count()
+            if count:
+                getattr(facets, facet)[value] = count
+        return facets
+
+    def _filter_masks(
+        self,
+        category_id: Optional[int],
+        city_id: Optional[int],
+        area_ids: Optional[List[int]],
+        verified: Optional[bool],
+        language: Optional[str],
+        area_match: str,
+    ) -> Dict[str, int]:
+        """One bitmap per active filter, keyed by the facet it restricts."""
+        masks: Dict[str, int] = {}
+        if category_id:
+            masks["category"] = self._postings.get(("category", category_id), 0)
+        if city_id:
+            masks["city"] = self._postings.get(("city", city_id), 0)
+        if area_ids and area_match == "any":
+            any_area = 0
+            for area in area_ids:
+                any_area |= self._postings.get(("area", area), 0)
+            masks["area"] = any_area
+        elif area_ids:
+            all_areas = self._all
+            for area in area_ids:
+                all_areas &= self._postings.get(("area", area), 0)
+            masks["area"] = all_areas
+        if verified is not None:
+            masks["verified"] = self._postings.get(("verified", verified), 0)
+        if language:
+            masks["language"] = self._postings.get(("language", language), 0)
+        return masks
+
+    def _add(self, provider: Provider, presorted: bool = True) -> None:
+        if self._free:
+            slot = self._free.pop()
+            self._providers[slot] = provider
+        else:
+            slot = len(self._providers)
+            self._providers.append(provider)
+        self._slots[provider.id] = slot
+        bit = 1 << slot
+        for key in _posting_keys(provider):
+            self._postings[key] = self._postings.get(key, 0) | bit
+        self._all |= bit
+        for name, order in ORDERS.items():
+            if presorted:
+                insort(self._sorted[name], (order(provider), slot))
+            else:
+                self._sorted[name].append((order(provider), slot))
+
+
+@lru_cache()
+def provider_index() -> ProviderSearchIndex:
+    return ProviderSearchIndex()
+
+
+class IndexedProviderRepository(ports.ProviderRepository):
+    """Serves reads from the index once it is built; writes go to ``delegate``."""
+
+    def __init__(self, index: ProviderSearchIndex, delegate: ports.ProviderRepository):
+        self.index = index
+        self.delegate = delegate
+
+    async def list(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[List[Any]] = None,
+        area_match: str = "all",
+        view: str = "full",
+    ) -> List[Union[Provider, ProviderCard]]:
+        args = (category_id, city_id, area_ids, verified, language, sort, limit, after, area_match)
+        if not self.index.ready:
+            return await self.delegate.list(*args, view=view)
+        providers = self.index.search(*args)
+        if view == "card":
+            return [ProviderCard.from_provider(p) for p in providers]
+        return providers
+
+    async def search(self, q: str, *args, **kwargs) -> List[Tuple[Union[Provider, ProviderCard], float]]:
+        return await self.delegate.search(q, *args, **kwargs)
+
+    async def facets(
+        self,
+        category_id: Optional[int] = None,
+        city_id: Optional[int] = None,
+        area_ids: Optional[List[int]] = None,
+        verified: Optional[bool] = None,
+        language: Optional[str] = None,
+        area_match: str = "all",
+    ) -> ProviderFacets:
+        args = (category_id, city_id, area_ids, verified, language, area_match)
+        if not self.index.ready:
+            return await self.delegate.facets(*args)
+        return self.index.facets(*args)
+
+    async def get(self, provider_id: int) -> Optional[Provider]:
+        provider = self.index.get(provider_id) if self.index.ready else None
+        return provider or await self.delegate.get(provider_id)
+
+    async def existing_ids(self, provider_ids: List[int]) -> Set[int]:
+        return await self.delegate.existing_ids(provider_ids)
+
+    async def owners(self, provider_ids: List[int]) -> Dict[int, int]:
+        return await self.delegate.owners(provider_ids)
+
+    async def add_rating(self, provider_id: int, rating: int) -> None:
+        await self.delegate.add_rating(provider_id, rating)
+
+    async def recompute_ratings(self) -> int:
+        return await self.delegate.recompute_ratings()
+
+    async def recompute_rank_scores(self) -> int:
+        return await self.delegate.recompute_rank_scores()
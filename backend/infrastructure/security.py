@@ -1,34 +1,210 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime, timedelta
-from jose import jwt
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from jose import JWTError, jwt
 from passlib.hash import argon2
+from prometheus_client import Counter, Gauge, Histogram
 
 from backend.application import ports
+from backend.domain.entities import User
 from backend.infrastructure.config import get_settings
+from backend.infrastructure.ttl_cache import TTLCache
 
 settings = get_settings()
 
+T = TypeVar("T")
+
+HASHER_QUEUE_WAIT = Histogram(
+    "password_hasher_queue_wait_seconds",
+    "Time a hash or verify waited for a hasher thread",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+HASHER_DURATION = Histogram("password_hasher_duration_seconds", "Argon2 time per operation", ["operation"])
+HASHER_IN_FLIGHT = Gauge("password_hasher_in_flight", "Hashes and verifies running or queued")
+HASHER_REJECTED = Counter("password_hasher_rejected_total", "Operations refused by a full hasher", ["operation"])
+AUTH_CACHE_REQUESTS = Counter("auth_cache_requests_total", "Verified-token and user cache lookups", ["cache", "result"])
+AUTH_CACHE_ENTRIES = Gauge("auth_cache_entries", "Entries held by the verified-token and user caches", ["cache"])
+
 
 class JWTTokenService(ports.TokenService):
+    """Signed JWTs whose ``typ`` claim keeps refresh tokens out of bearer auth and vice versa."""
+
     def create_access_token(self, user_id: int) -> str:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-        return jwt.encode({"sub": str(user_id), "exp": expire}, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+        return self._encode(user_id, ports.ACCESS_TOKEN, expire)
 
     def create_refresh_token(self, user_id: int) -> str:
         expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
-        return jwt.encode({"sub": str(user_id), "exp": expire}, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+        return self._encode(user_id, ports.REFRESH_TOKEN, expire)
+
+    def verify_token(self, token: str, kind: str) -> int:
+        return int(self.claims(token, kind)["sub"])
+
+    def claims(self, token: str, kind: str) -> Dict[str, Any]:
+        try:
+            data = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+            int(data["sub"])
+        except (JWTError, KeyError, TypeError, ValueError) as exc:
+            raise ports.InvalidToken(str(exc)) from exc
+        if data.get("typ") != kind:
+            raise ports.InvalidToken(f"Wrong token type, expected {kind}")
+        return data
+
+    @staticmethod
+    def _encode(user_id: int, kind: str, expire: datetime) -> str:
+        claims = {"sub": str(user_id), "typ": kind, "exp": expire}
+        return jwt.encode(claims, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+
+class CachingTokenService(ports.TokenService):
+    """Remembers verified tokens, keyed by kind and SHA-256, until they expire or age out.
+
+    A token's signature and expiry are checked once; repeat requests with the
+    same bearer token cost a hash and a dictionary lookup. The kind is part of
+    the key, so a refresh token verified at ``/auth/refresh`` is never served
+    from the cache as an access token.
+    """
+
+    def __init__(self, delegate: JWTTokenService, cache: TTLCache[Tuple[str, bytes], int]):
+        self.delegate = delegate
+        self.cache = cache
+
+    def create_access_token(self, user_id: int) -> str:
+        return self.delegate.create_access_token(user_id)
+
+    def create_refresh_token(self, user_id: int) -> str:
+        return self.delegate.create_refresh_token(user_id)
+
+    def verify_token(self, token: str, kind: str) -> int:
+        key = (kind, hashlib.sha256(token.encode()).digest())
+        user_id = self.cache.get(key)
+        if user_id is not None:
+            AUTH_CACHE_REQUESTS.labels("token", "hit").inc()
+            return user_id
+        AUTH_CACHE_REQUESTS.labels("token", "miss").inc()
+        claims = self.delegate.claims(token, kind)
+        user_id = int(claims["sub"])
+        self.cache.set(key, user_id, float(claims["exp"]) - time.time())
+        return user_id
+
+
+class CachedUserRepository(ports.UserRepository):
+    """Serves ``get`` from a short-lived in-process cache; writes go through and evict the entry.
+
+    Other processes see a change once their entry expires, so keep the TTL short.
+    """
 
-    def verify_token(self, token: str) -> int:
-        data = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        return int(data["sub"])
+    def __init__(self, delegate: ports.UserRepository, cache: TTLCache[int, User]):
+        self.delegate = delegate
+        self.cache = cache
+
+    async def create(self, user: User) -> User:
+        if user.id:
+            self.cache.pop(user.id)
+        return await self.delegate.create(user)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.delegate.get_by_email(email)
+
+    async def get(self, user_id: int) -> Optional[User]:
+        user = self.cache.get(user_id)
+        if user is not None:
+            AUTH_CACHE_REQUESTS.labels("user", "hit").inc()
+            return replace(user)
+        AUTH_CACHE_REQUESTS.labels("user", "miss").inc()
+        user = await self.delegate.get(user_id)
+        if user is not None:
+            self.cache.set(user_id, replace(user))
+        return user
+
+
+@lru_cache()
+def token_service() -> CachingTokenService:
+    cache: TTLCache[Tuple[str, bytes], int] = TTLCache(settings.token_cache_size, settings.token_cache_ttl_seconds)
+    AUTH_CACHE_ENTRIES.labels("token").set_function(lambda: len(cache))
+    return CachingTokenService(JWTTokenService(), cache)
+
+
+@lru_cache()
+def user_cache() -> TTLCache[int, User]:
+    cache: TTLCache[int, User] = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+    AUTH_CACHE_ENTRIES.labels("user").set_function(lambda: len(cache))
+    return cache
 
 
 class Argon2PasswordHasher(ports.PasswordHasher):
-    def hash(self, password: str) -> str:
-        return argon2.using(
-            time_cost=settings.argon2_time_cost,
-            memory_cost=settings.argon2_memory_cost,
-            parallelism=settings.argon2_parallelism,
-        ).hash(password)
-
-    def verify(self, plain_password: str, hashed_password: str) -> bool:
-        return argon2.verify(plain_password, hashed_password)
+    """Argon2 on a small dedicated thread pool, off the event loop.
+
+    argon2-cffi releases the GIL while hashing, so threads give real
+    parallelism without pickling to a process pool. ``workers`` caps how many
+    ~``memory_cost`` KiB hashes run at once; beyond ``max_queue`` waiting
+    operations, callers get ``HasherSaturated`` immediately instead of queueing
+    behind a login storm.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 32,
+        time_cost: Optional[int] = None,
+        memory_cost: Optional[int] = None,
+        parallelism: Optional[int] = None,
+    ):
+        self.handler = argon2.using(
+            time_cost=time_cost or settings.argon2_time_cost,
+            memory_cost=memory_cost or settings.argon2_memory_cost,
+            parallelism=parallelism or settings.argon2_parallelism,
+        )
+        # passlib picks its argon2 backend lazily and not thread-safely; pick it
+        # here, before the first hashes race for it on the pool.
+        self.handler.get_backend()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self.capacity = workers + max_queue
+        self.pending = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.handler.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", argon2.verify, plain_password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        return self.handler.needs_update(hashed_password)
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args) -> T:
+        # Only the event loop thread touches ``pending``, so no lock is needed.
+        if self.pending >= self.capacity:
+            HASHER_REJECTED.labels(operation).inc()
+            raise ports.HasherSaturated(f"Password hasher is saturated ({self.pending} pending)")
+        queued_at = time.perf_counter()
+
+        def timed() -> T:
+            started = time.perf_counter()
+            HASHER_QUEUE_WAIT.labels(operation).observe(started - queued_at)
+            try:
+                return fn(*args)
+            finally:
+                HASHER_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+        self.pending += 1
+        HASHER_IN_FLIGHT.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.pending -= 1
+            HASHER_IN_FLIGHT.dec()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache()
+def password_hasher() -> Argon2PasswordHasher:
+    return Argon2PasswordHasher(settings.password_hasher_workers, settings.password_hasher_max_queue)
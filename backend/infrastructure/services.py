@@ -1,22 +1,55 @@
+import asyncio
+import hashlib
 import json
+import logging
 import secrets
+import time
+from collections import deque
+from dataclasses import asdict
 from datetime import datetime
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
 
 import httpx
+from prometheus_client import Counter, Histogram
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from backend.application import ports
+from backend.domain.entities import LeadRequest, Provider, Review, ReviewSummary
+from backend.domain.fingerprint import hamming, simhash
 from backend.infrastructure.config import get_settings
 
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ANALYTICS_FLUSH_LATENCY = Histogram("analytics_flush_duration_seconds", "ClickHouse batch insert latency")
+ANALYTICS_BATCH_SIZE = Histogram(
+    "analytics_flush_batch_size",
+    "Events per ClickHouse batch insert",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+ANALYTICS_DROPPED = Counter("analytics_events_dropped_total", "Analytics events dropped", ["reason"])
+LISTING_CACHE_REQUESTS = Counter(
+    "provider_listing_cache_requests_total", "Provider listing cache lookups", ["result"]
+)
+REVIEW_SUMMARY_CACHE_REQUESTS = Counter(
+    "review_summary_cache_requests_total", "Provider review summary cache lookups", ["result"]
+)
+LEAD_DEDUP_REQUESTS = Counter("lead_dedup_requests_total", "Lead near-duplicate checks", ["result"])
 
 
 def redis_client() -> Redis:
     return Redis.from_url(settings.redis_url, decode_responses=True)
 
 
+@lru_cache()
+def shared_redis() -> Redis:
+    """Process-wide client for the API event loop; worker jobs use their own ``redis_client()``."""
+    return redis_client()
+
+
 class RedisOTPService(ports.OTPService):
     def __init__(self, redis: Redis):
         self.redis = redis
@@ -42,31 +75,428 @@ class RedisRateLimiter(ports.RateLimiter):
         return current <= limit
 
 
-class ClickHouseAnalytics(ports.AnalyticsClient):
-    def __init__(self, base_url: str):
+# KEYS: entries, lock. ARGV: lead id ("" to only release), fingerprint entry,
+# ttl ms, lock token, cutoff ms. Drops entries older than the cutoff and frees
+# the lock only if this claim still owns it.
+REMEMBER_LEAD_SCRIPT = """
+if ARGV[1] ~= '' then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    if tonumber(string.match(entries[i + 1], ':(%d+)$')) < tonumber(ARGV[5]) then
+        redis.call('HDEL', KEYS[1], entries[i])
+    end
+end
+if redis.call('GET', KEYS[2]) == ARGV[4] then
+    redis.call('DEL', KEYS[2])
+end
+"""
+
+
+class RedisLeadDeduplicator(ports.LeadDeduplicator):
+    """SimHash fingerprints of recent leads, one Redis hash per user, category and city.
+
+    A scope only ever holds the handful of leads one user posted in one place
+    within the TTL, so the lookup is a single ``HGETALL`` and a Hamming scan.
+    ``claim`` takes a short per-scope lock in the same round trip, so double
+    taps arriving together are checked one after the other. Redis failures
+    never block lead creation; the lead is simply not deduplicated.
+    """
+
+    lock_ms = 2000
+    poll_seconds = 0.01
+
+    def __init__(self, redis: Redis, ttl: int = 600, max_distance: int = 6):
+        self.redis = redis
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._remember = redis.register_script(REMEMBER_LEAD_SCRIPT)
+        self._claims: Dict[str, Tuple[str, int]] = {}
+
+    @staticmethod
+    def _scope(lead: LeadRequest) -> str:
+        return f"leads:dedup:{lead.user_id}:{lead.category_id}:{lead.city_id}"
+
+    async def claim(self, lead: LeadRequest) -> Optional[int]:
+        scope = self._scope(lead)
+        fingerprint = simhash(lead.description)
+        token = secrets.token_hex(8)
+        deadline = time.monotonic() + self.lock_ms / 1000
+        try:
+            while True:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.set(f"{scope}:lock", token, nx=True, px=self.lock_ms)
+                    pipe.hgetall(scope)
+                    locked, entries = await pipe.execute()
+                if locked or time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(self.poll_seconds)
+        except RedisError:
+            logger.warning("lead dedup lookup failed", exc_info=True)
+            LEAD_DEDUP_REQUESTS.labels("error").inc()
+            return None
+        self._claims[scope] = (token if locked else "", fingerprint)
+        cutoff = int(time.time() * 1000) - self.ttl * 1000
+        for lead_id, entry in entries.items():
+            stored, _, at = entry.partition(":")
+            if int(at) >= cutoff and hamming(int(stored, 16), fingerprint) <= self.max_distance:
+                await self.release(lead)
+                LEAD_DEDUP_REQUESTS.labels("duplicate").inc()
+                return int(lead_id)
+        LEAD_DEDUP_REQUESTS.labels("unique" if locked else "contended").inc()
+        return None
+
+    async def remember(self, lead: LeadRequest) -> None:
+        await self._finish(lead, str(lead.id))
+
+    async def release(self, lead: LeadRequest) -> None:
+        await self._finish(lead, "")
+
+    async def _finish(self, lead: LeadRequest, lead_id: str) -> None:
+        scope = self._scope(lead)
+        token, fingerprint = self._claims.pop(scope, ("", None))
+        if fingerprint is None:
+            fingerprint = simhash(lead.description)
+        now = int(time.time() * 1000)
+        try:
+            await self._remember(
+                keys=[scope, f"{scope}:lock"],
+                args=[lead_id, f"{fingerprint:x}:{now}", self.ttl * 1000, token, now - self.ttl * 1000],
+            )
+        except RedisError:
+            logger.warning("lead dedup update failed", exc_info=True)
+
+
+PROVIDER_CHANGES_CHANNEL = "providers:changed"
+
+
+class RedisProviderChangePublisher(ports.ProviderChangeListener):
+    """Broadcasts provider writes so every process can refresh its in-memory views."""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def provider_changed(self, provider: Provider, previous: Optional[Provider] = None) -> None:
+        await self.redis.publish(PROVIDER_CHANGES_CHANNEL, json.dumps(asdict(provider)))
+
+
+class RedisProviderListingCache(ports.ProviderChangeListener):
+    """Pre-serialized provider listing bodies, versioned per city and category.
+
+    Each provider also has a version of its own, which the profile ETag is
+    derived from, so a conditional profile request needs no provider read.
+
+    Each entry stores the versions of the scopes its filters touch. A provider
+    write bumps the version of the global scope and of the city and
+    categories the provider had both before and after the write, so affected
+    entries read as stale without having to be located, including the ones a
+    moved provider left; bulk rewrites bump the epoch that every version string
+    starts with. The epoch is seeded randomly, so version strings (and the ETags
+    derived from them) never repeat after Redis loses its counters.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 600):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(filters: Dict[str, Any]) -> str:
+        raw = json.dumps(filters, sort_keys=True, separators=(",", ":"))
+        return "providers:list:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _scopes(city_id: Optional[int], category_id: Optional[int]) -> List[str]:
+        scopes = []
+        if city_id:
+            scopes.append(f"city:{city_id}")
+        if category_id:
+            scopes.append(f"category:{category_id}")
+        return scopes or ["all"]
+
+    async def version(self, city_id: Optional[int], category_id: Optional[int]) -> str:
+        return await self._version(self._scopes(city_id, category_id))
+
+    async def _version(self, scopes: List[str]) -> str:
+        scopes = ["epoch"] + scopes
+        values = await self.redis.mget([f"providers:version:{scope}" for scope in scopes])
+        if values[0] is None:
+            await self.redis.set("providers:version:epoch", secrets.randbelow(2**31), nx=True)
+            values[0] = await self.redis.get("providers:version:epoch")
+        return ",".join(f"{scope}={value or 0}" for scope, value in zip(scopes, values))
+
+    async def provider_version(self, provider_id: int) -> str:
+        return await self._version([f"provider:{provider_id}"])
+
+    async def get(self, key: str, version: str) -> Optional[Tuple[str, int]]:
+        stored_version, body, count = await self.redis.hmget(key, "version", "body", "count")
+        if body is None:
+            LISTING_CACHE_REQUESTS.labels("miss").inc()
+            return None
+        if stored_version != version:
+            LISTING_CACHE_REQUESTS.labels("stale").inc()
+            return None
+        LISTING_CACHE_REQUESTS.labels("hit").inc()
+        return body, int(count)
+
+    async def set(self, key: str, version: str, body: str, count: int) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(key, mapping={"version": version, "body": body, "count": count})
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def invalidate_all(self) -> None:
+        await self.redis.incr("providers:version:epoch")
+
+    async def provider_changed(self, provider: Provider, previous: Optional[Provider] = None) -> None:
+        scopes = {"all", f"provider:{provider.id}"}
+        for state in filter(None, (provider, previous)):
+            scopes.add(f"city:{state.city_id}")
+            scopes.update(f"category:{c}" for c in state.categories)
+        pipe = self.redis.pipeline(transaction=False)
+        for scope in sorted(scopes):
+            pipe.incr(f"providers:version:{scope}")
+        await pipe.execute()
+
+
+class RedisReviewSummaryCache(ports.ReviewSummaryCache):
+    """One JSON document per provider; ``CreateReview`` deletes it and the next read rebuilds it.
+
+    Redis being unavailable reads as a miss, so reviews are served from Postgres.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 300):
+        self.redis = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def key(provider_id: int) -> str:
+        return f"providers:reviews:summary:{provider_id}"
+
+    async def get(self, provider_id: int) -> Optional[ReviewSummary]:
+        try:
+            raw = await self.redis.get(self.key(provider_id))
+        except RedisError:
+            logger.warning("review summary lookup failed", exc_info=True)
+            REVIEW_SUMMARY_CACHE_REQUESTS.labels("error").inc()
+            return None
+        if raw is None:
+            REVIEW_SUMMARY_CACHE_REQUESTS.labels("miss").inc()
+            return None
+        REVIEW_SUMMARY_CACHE_REQUESTS.labels("hit").inc()
+        data = json.loads(raw)
+        latest = [Review(**{**r, "created_at": datetime.fromisoformat(r["created_at"])}) for r in data.pop("latest")]
+        return ReviewSummary(**data, latest=latest)
+
+    async def set(self, summary: ReviewSummary) -> None:
+        try:
+            await self.redis.set(self.key(summary.provider_id), json.dumps(asdict(summary), default=str), ex=self.ttl)
+        except RedisError:
+            logger.warning("review summary store failed", exc_info=True)
+
+    async def invalidate(self, provider_id: int) -> None:
+        try:
+            await self.redis.delete(self.key(provider_id))
+        except RedisError:
+            # The stale summary lasts until its TTL.
+            logger.warning("review summary invalidation failed", exc_info=True)
+
+
+def provider_change_listeners(redis: Redis) -> Sequence[ports.ProviderChangeListener]:
+    return [RedisProviderListingCache(redis, settings.provider_cache_ttl_seconds), RedisProviderChangePublisher(redis)]
+
+
+async def listen_provider_changes(redis: Redis, listeners: Sequence[ports.ProviderChangeListener]) -> None:
+    """Apply every published provider change to ``listeners``, in order."""
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(PROVIDER_CHANGES_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        provider = Provider(**json.loads(message["data"]))
+                        for listener in listeners:
+                            await listener.provider_changed(provider)
+                    except Exception:
+                        logger.exception("failed to apply provider change %s", message["data"])
+        except RedisError:
+            logger.warning("provider change feed disconnected, resubscribing")
+            await asyncio.sleep(1)
+
+
+REFERENCE_RELOAD_CHANNEL = "reference:reload"
+# Published after a bulk rewrite of providers, which sends no per-provider changes.
+PROVIDER_REBUILD_CHANNEL = "providers:rebuild"
+
+
+async def listen_reloads(redis: Redis, channel: str, reload: Callable[[], Awaitable[Any]]) -> None:
+    """Run ``reload`` for every message on ``channel``."""
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        await reload()
+                    except Exception:
+                        logger.exception("reload on %s failed", channel)
+        except RedisError:
+            logger.warning("%s feed disconnected, resubscribing", channel)
+            await asyncio.sleep(1)
+
+
+async def providers_rewritten(redis: Redis) -> None:
+    """Stale every cached listing and have every API process rebuild its provider index."""
+    await RedisProviderListingCache(redis).invalidate_all()
+    await redis.publish(PROVIDER_REBUILD_CHANNEL, 1)
+
+
+class LogNotifier(ports.Notifier):
+    async def notify_provider(self, provider_id: int, kind: str, data: dict) -> None:
+        # In production integrate push/SMS delivery; here we just log the notification.
+        logger.info("notify provider=%s kind=%s data=%s", provider_id, kind, data)
+
+
+def event_row(event: str, payload: Dict[str, Any], at: Optional[datetime] = None) -> Dict[str, Any]:
+    return {
+        "event": event,
+        "timestamp": (at or datetime.utcnow()).strftime("%Y-%m-%d %H:%M:%S"),
+        "user_id": str(payload.get("user_id") or ""),
+        "provider_id": str(payload.get("provider_id") or ""),
+        "city": str(payload.get("city_id") or ""),
+        "category": str(payload.get("category_id") or ""),
+        "metadata": {k: "" if v is None else str(v) for k, v in payload.items()},
+    }
+
+
+class ClickHouseWriter:
+    """Inserts event rows into ClickHouse as one JSONEachRow body over a pooled client."""
+
+    query = (
+        "INSERT INTO menna.events (event, timestamp, user_id, provider_id, city, category, metadata) "
+        "FORMAT JSONEachRow"
+    )
+
+    def __init__(self, base_url: str, timeout: float = 5.0, max_connections: int = 4):
         self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
 
-    async def track(self, event: str, payload: Dict[str, Any]) -> None:
-        data = {
-            "event": event,
-            "timestamp": datetime.utcnow().isoformat(),
-            "payload": payload,
-        }
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                f"{self.base_url}/?query=INSERT INTO menna.events (event, timestamp, user_id, provider_id, city, category, metadata) VALUES",
-                content=json.dumps(
-                    [
-                        [
-                            data["event"],
-                            data["timestamp"],
-                            str(payload.get("user_id", "")),
-                            str(payload.get("provider_id", "")),
-                            str(payload.get("city_id", "")),
-                            str(payload.get("category_id", "")),
-                            payload,
-                        ]
-                    ]
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
                 ),
-                headers={"Content-Type": "application/json"},
             )
+        return self._client
+
+    async def insert(self, rows: List[Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            response = await self._http().post(
+                "/",
+                params={"query": self.query},
+                content="\n".join(json.dumps(row, ensure_ascii=False) for row in rows).encode(),
+            )
+            response.raise_for_status()
+        finally:
+            ANALYTICS_FLUSH_LATENCY.observe(time.perf_counter() - start)
+            ANALYTICS_BATCH_SIZE.observe(len(rows))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class ClickHouseAnalytics(ports.AnalyticsClient):
+    """Buffers events in-process and flushes them in batches on size or time thresholds.
+
+    ``track`` never touches the network: it appends to a bounded buffer and wakes
+    the background flusher once ``batch_size`` events are waiting. Events that do
+    not fit in the buffer, or whose batch fails to insert, are counted as dropped.
+    """
+
+    def __init__(
+        self,
+        writer: ClickHouseWriter,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_buffer: int = 10000,
+    ):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def track(self, event: str, payload: Dict[str, Any]) -> None:
+        if len(self._buffer) >= self.max_buffer:
+            ANALYTICS_DROPPED.labels("buffer_full").inc()
+            return
+        self._buffer.append(event_row(event, payload))
+        self.start()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the flusher on the running loop, replacing one left behind by a closed loop."""
+        if self._task is None or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await self.writer.insert(batch)
+            except httpx.HTTPError:
+                ANALYTICS_DROPPED.labels("flush_error").inc(len(batch))
+
+    async def close(self) -> None:
+        """Let the flusher finish its current insert and drain the buffer before closing the writer."""
+        task, self._task = self._task, None
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            self._stopping = True
+            self._wakeup.set()
+            await task
+        await self.flush()
+        await self.writer.close()
+
+
+@lru_cache()
+def analytics_client():
+    writer = ClickHouseWriter(settings.clickhouse_url)
+    if settings.analytics_spool_dir:
+        from backend.infrastructure.spool import spooled_analytics
+
+        return spooled_analytics(writer, settings)
+    return ClickHouseAnalytics(
+        writer,
+        batch_size=settings.analytics_batch_size,
+        flush_interval=settings.analytics_flush_interval_seconds,
+        max_buffer=settings.analytics_buffer_size,
+    )
@@ -0,0 +1,235 @@
+"""Durable local spool for analytics events.
+
+Events are appended as JSON lines to segment files under ``analytics_spool_dir``.
+A writer's active segment is named ``<ns>-<instance>.open``, where the instance
+id is random per writer, and is renamed to ``.log`` once sealed (by size, age
+or shutdown). The writer holds an ``flock`` on its open segment, so an ``.open``
+file nobody holds a lock on belonged to a writer that died, whatever PID it had
+in whichever container. A single shipper per directory, also elected with an
+``flock``, seals such orphans, drains sealed segments to ClickHouse in large
+batches and records its position in ``checkpoint.json`` so a restart resumes
+mid-segment.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import httpx
+
+from backend.application import ports
+from backend.infrastructure.services import ANALYTICS_DROPPED, ClickHouseWriter, event_row
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".log"
+# A segment is created under this suffix and only renamed to ``.open`` once its
+# writer holds the lock, so the shipper never mistakes a new segment for an orphan.
+NEW_SUFFIX = ".new"
+
+
+def _count_lines(path: Path) -> int:
+    with open(path, "rb") as fh:
+        return sum(1 for _ in fh)
+
+
+class SpoolWriter:
+    def __init__(self, directory: Path, segment_bytes: int, segment_seconds: float):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.instance = uuid.uuid4().hex
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file: Optional[IO[bytes]] = None
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+
+    def append(self, row: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(row, ensure_ascii=False).encode() + b"\n")
+        if self._file.tell() >= self.segment_bytes:
+            self.seal()
+
+    def seal(self) -> None:
+        if self._file is None:
+            return
+        # Rename while still holding the lock, after the buffer is on disk, so
+        # the shipper never sees a half-written ``.log`` or a lock-free ``.open``.
+        self._file.flush()
+        self._path.rename(self._path.with_suffix(SEALED_SUFFIX))
+        self._file.close()
+        self._file = None
+        self._path = None
+
+    def tick(self) -> None:
+        """Seal the active segment once it is ``segment_seconds`` old, else flush its buffer."""
+        if self._file is None:
+            return
+        if time.monotonic() - self._opened_at >= self.segment_seconds:
+            self.seal()
+        else:
+            self._file.flush()
+
+    def _open(self) -> None:
+        path = self.directory / f"{time.time_ns():020d}-{self.instance}{NEW_SUFFIX}"
+        fh = open(path, "ab", buffering=64 * 1024)
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._path = path.rename(path.with_suffix(OPEN_SUFFIX))
+        self._file = fh
+        self._opened_at = time.monotonic()
+
+
+class SpoolShipper:
+    def __init__(
+        self,
+        directory: Path,
+        writer: ClickHouseWriter,
+        batch_size: int,
+        max_bytes: int,
+        interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.checkpoint_path = directory / "checkpoint.json"
+        self._lock: Optional[IO[str]] = None
+
+    async def run(self, spool: SpoolWriter) -> None:
+        while True:
+            spool.tick()
+            if self.acquire_lock():
+                try:
+                    await self.ship()
+                except httpx.HTTPError:
+                    pass  # keep the checkpoint and retry on the next tick
+            await asyncio.sleep(self.interval)
+
+    def acquire_lock(self) -> bool:
+        if self._lock is None:
+            fh = open(self.directory / "shipper.lock", "a")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                return False
+            self._lock = fh
+        return True
+
+    async def ship(self) -> None:
+        self._seal_orphans()
+        self._enforce_cap()
+        checkpoint = self._load_checkpoint()
+        for segment in sorted(self.directory.glob(f"*{SEALED_SUFFIX}")):
+            offset = checkpoint["offset"] if checkpoint.get("segment") == segment.name else 0
+            while True:
+                rows, next_offset = await asyncio.to_thread(self._read_batch, segment, offset)
+                if not rows:
+                    break
+                await self.writer.insert(rows)
+                offset = next_offset
+                self._save_checkpoint(segment.name, offset)
+            segment.unlink()
+
+    def _read_batch(self, segment: Path, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        rows: List[Dict[str, Any]] = []
+        with open(segment, "rb") as fh:
+            fh.seek(offset)
+            while len(rows) < self.batch_size:
+                line = fh.readline()
+                if not line:
+                    break
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    ANALYTICS_DROPPED.labels("spool_corrupt").inc()
+            return rows, fh.tell()
+
+    def _seal_orphans(self) -> None:
+        for path in self.directory.glob(f"*{OPEN_SUFFIX}"):
+            try:
+                fh = open(path, "ab")
+            except FileNotFoundError:
+                continue  # sealed by its writer meanwhile
+            with fh:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # its writer is alive
+                if path.exists():
+                    path.rename(path.with_suffix(SEALED_SUFFIX))
+
+    def _enforce_cap(self) -> None:
+        segments = sorted(self.directory.glob(f"*{SEALED_SUFFIX}"))
+        total = sum(p.stat().st_size for p in self.directory.glob(f"*{OPEN_SUFFIX}"))
+        total += sum(p.stat().st_size for p in segments)
+        while total > self.max_bytes and segments:
+            oldest = segments.pop(0)
+            total -= oldest.stat().st_size
+            ANALYTICS_DROPPED.labels("spool_full").inc(_count_lines(oldest))
+            oldest.unlink()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.checkpoint_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_checkpoint(self, segment: str, offset: int) -> None:
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"segment": segment, "offset": offset}))
+        os.replace(tmp, self.checkpoint_path)
+
+
+class SpooledAnalytics(ports.AnalyticsClient):
+    """Writes events to the local spool; ClickHouse is only contacted by the shipper."""
+
+    def __init__(self, spool: SpoolWriter, shipper: SpoolShipper):
+        self.spool = spool
+        self.shipper = shipper
+        self._task: Optional[asyncio.Task] = None
+
+    async def track(self, event: str, payload: Dict[str, Any]) -> None:
+        try:
+            self.spool.append(event_row(event, payload))
+        except OSError:
+            ANALYTICS_DROPPED.labels("spool_error").inc()
+        self.start()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.shipper.run(self.spool))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.spool.seal()
+        if self.shipper.acquire_lock():
+            try:
+                await self.shipper.ship()
+            except httpx.HTTPError:
+                pass
+        await self.shipper.writer.close()
+
+
+def spooled_analytics(writer: ClickHouseWriter, settings) -> SpooledAnalytics:
+    directory = Path(settings.analytics_spool_dir)
+    return SpooledAnalytics(
+        SpoolWriter(directory, settings.analytics_spool_segment_bytes, settings.analytics_spool_segment_seconds),
+        SpoolShipper(
+            directory,
+            writer,
+            batch_size=settings.analytics_spool_batch_size,
+            max_bytes=settings.analytics_spool_max_bytes,
+        ),
+    )
@@ -1,9 +1,19 @@
+"""Background processes.
+
+``python -m backend.infrastructure.worker`` runs an RQ worker over ``QUEUES``;
+``python -m backend.infrastructure.worker relay`` runs the outbox relay.
+"""
+import asyncio
 import os
+import sys
+
 import redis
 from rq import Worker, Queue, Connection
 
+from backend.infrastructure.jobs import QUEUES
+
 redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-listen = ["default"]
+listen = list(QUEUES)
 
 
 def main():
@@ -13,5 +23,32 @@ def main():
         worker.work()
 
 
+async def relay():
+    from backend.infrastructure.config import get_settings
+    from backend.infrastructure.db import AsyncSessionLocal
+    from backend.infrastructure.jobs import job_queue
+    from backend.infrastructure.outbox import OutboxRelay
+    from backend.infrastructure.services import ClickHouseWriter
+
+    settings = get_settings()
+    writer = ClickHouseWriter(settings.clickhouse_url)
+    try:
+        await OutboxRelay(
+            AsyncSessionLocal,
+            writer,
+            job_queue(),
+            batch_size=settings.outbox_batch_size,
+            poll_seconds=settings.outbox_poll_seconds,
+            max_attempts=settings.outbox_max_attempts,
+            retry_base_seconds=settings.outbox_retry_base_seconds,
+            retry_max_seconds=settings.outbox_retry_max_seconds,
+        ).run()
+    finally:
+        await writer.close()
+
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:] == ["relay"]:
+        asyncio.run(relay())
+    else:
+        main()
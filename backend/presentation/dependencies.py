@@ -1,9 +1,18 @@
+from typing import Optional
+
 from redis.asyncio import Redis
-from fastapi import Depends
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.application.ports import ACCESS_TOKEN, InvalidToken
+from backend.domain.entities import User
+
 from backend.infrastructure.config import get_settings
 from backend.infrastructure.db import get_session
+from backend.infrastructure.jobs import job_queue
+from backend.infrastructure.outbox import SqlAlchemyOutbox
+from backend.infrastructure.reference_data import reference_data
 from backend.infrastructure.repositories import (
     SqlAlchemyContactRepository,
     SqlAlchemyGeographyRepository,
@@ -12,36 +21,92 @@ from backend.infrastructure.repositories import (
     SqlAlchemyProviderRepository,
     SqlAlchemyReviewRepository,
     SqlAlchemySubscriptionRepository,
+    SqlAlchemyUnitOfWork,
     SqlAlchemyUserRepository,
 )
-from backend.infrastructure.security import Argon2PasswordHasher, JWTTokenService
-from backend.infrastructure.services import ClickHouseAnalytics, RedisOTPService, RedisRateLimiter, redis_client
+from backend.infrastructure.search_index import IndexedProviderRepository, provider_index
+from backend.infrastructure.security import CachedUserRepository, password_hasher, token_service, user_cache
+from backend.infrastructure.services import (
+    RedisLeadDeduplicator,
+    RedisOTPService,
+    RedisProviderListingCache,
+    RedisRateLimiter,
+    RedisReviewSummaryCache,
+    analytics_client,
+    provider_change_listeners,
+    shared_redis,
+)
 
 
 def get_db_session() -> AsyncSession:
     return Depends(get_session)  # type: ignore
 
 
+def provider_repository(session: AsyncSession):
+    listeners = provider_change_listeners(shared_redis())
+    if not get_settings().provider_index_enabled:
+        return SqlAlchemyProviderRepository(session, listeners)
+    index = provider_index()
+    return IndexedProviderRepository(index, SqlAlchemyProviderRepository(session, [index, *listeners]))
+
+
 async def get_repositories(session: AsyncSession = Depends(get_session)):
     return {
-        "users": SqlAlchemyUserRepository(session),
-        "providers": SqlAlchemyProviderRepository(session),
+        "users": CachedUserRepository(SqlAlchemyUserRepository(session), user_cache()),
+        "providers": provider_repository(session),
         "geography": SqlAlchemyGeographyRepository(session),
         "leads": SqlAlchemyLeadRepository(session),
         "reviews": SqlAlchemyReviewRepository(session),
         "plans": SqlAlchemyPlanRepository(session),
         "subscriptions": SqlAlchemySubscriptionRepository(session),
         "contacts": SqlAlchemyContactRepository(session),
+        # Write endpoints run their use case inside "uow" and hand it "outbox" as
+        # analytics client and job queue, so events commit with the change.
+        "uow": SqlAlchemyUnitOfWork(session),
+        "outbox": SqlAlchemyOutbox(session),
     }
 
 
-async def get_services():
+def lead_deduplicator(redis: Redis) -> Optional[RedisLeadDeduplicator]:
     settings = get_settings()
-    redis: Redis = redis_client()
+    if settings.lead_dedup_ttl_seconds <= 0:
+        return None
+    return RedisLeadDeduplicator(redis, settings.lead_dedup_ttl_seconds, settings.lead_dedup_max_distance)
+
+
+async def get_services():
+    redis: Redis = shared_redis()
     return {
         "otp": RedisOTPService(redis),
         "limiter": RedisRateLimiter(redis),
-        "token": JWTTokenService(),
-        "analytics": ClickHouseAnalytics(settings.clickhouse_url),
-        "hasher": Argon2PasswordHasher(),
+        "token": token_service(),
+        "analytics": analytics_client(),
+        "hasher": password_hasher(),
+        "jobs": job_queue(),
+        "listing_cache": RedisProviderListingCache(redis, get_settings().provider_cache_ttl_seconds),
+        "reference": reference_data(),
+        "lead_dedup": lead_deduplicator(redis),
+        "review_summaries": RedisReviewSummaryCache(redis, get_settings().review_summary_ttl_seconds),
     }
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+) -> User:
+    """The user named by the bearer token; a repeat token needs neither a signature check nor a query."""
+    unauthorized = HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if credentials is None:
+        raise unauthorized
+    try:
+        user_id = services["token"].verify_token(credentials.credentials, ACCESS_TOKEN)
+    except InvalidToken:
+        raise unauthorized
+    user = await repos["users"].get(user_id)
+    if user is None:
+        raise unauthorized
+    return user
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Iterable, Optional
+
+from starlette.responses import Response
+
+LISTING_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=60"
+DETAIL_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+REFERENCE_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=3600"
+
+
+def strong_etag(*parts: str) -> str:
+    return '"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def cache_headers(etag: str, cache_control: str, surrogate_keys: Iterable[str]) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control, "Surrogate-Key": " ".join(surrogate_keys)}
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def json_response(body: str, headers: dict) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def listing_surrogate_keys(city_id: Optional[int], category_id: Optional[int]) -> list:
+    keys = ["providers"]
+    if city_id:
+        keys.append(f"providers-city-{city_id}")
+    if category_id:
+        keys.append(f"providers-category-{category_id}")
+    return keys
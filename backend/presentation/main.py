@@ -1,4 +1,7 @@
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import Counter, Histogram, generate_latest
@@ -6,8 +9,29 @@ from starlette.responses import Response
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
 
+from backend.infrastructure.config import get_settings
+from backend.infrastructure.db import AsyncSessionLocal
+from backend.infrastructure.reference_data import ReferenceDataStore, reference_data
+from backend.infrastructure.repositories import (
+    SqlAlchemyGeographyRepository,
+    SqlAlchemyPlanRepository,
+    SqlAlchemyProviderRepository,
+)
+from backend.infrastructure.search_index import ProviderSearchIndex, provider_index
+from backend.infrastructure.security import password_hasher
+from backend.infrastructure.services import (
+    PROVIDER_REBUILD_CHANNEL,
+    REFERENCE_RELOAD_CHANNEL,
+    RedisProviderListingCache,
+    analytics_client,
+    listen_provider_changes,
+    listen_reloads,
+    shared_redis,
+)
 from backend.presentation.routes import router
 
+logger = logging.getLogger(__name__)
+
 REQUEST_COUNT = Counter("http_requests_total", "HTTP Requests", ["method", "path", "status"])
 REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["method", "path"])
 
@@ -22,8 +46,75 @@ class MetricsMiddleware(BaseHTTPMiddleware):
         return response
 
 
+async def rebuild_provider_index(index: ProviderSearchIndex) -> None:
+    async with AsyncSessionLocal() as session:
+        index.rebuild(await SqlAlchemyProviderRepository(session).list())
+
+
+async def reload_provider_index(index: ProviderSearchIndex) -> None:
+    # Listings cached while the old index still served them must not outlive it.
+    await rebuild_provider_index(index)
+    await RedisProviderListingCache(shared_redis()).invalidate_all()
+
+
+async def refresh_provider_index(index: ProviderSearchIndex, interval: int) -> None:
+    # Pub/sub messages are lost while disconnected; a periodic rebuild bounds the drift.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_provider_index(index)
+        except Exception:
+            logger.exception("provider index rebuild failed, retrying in %ss", interval)
+
+
+async def load_reference_data(store: ReferenceDataStore) -> None:
+    async with AsyncSessionLocal() as session:
+        await store.load(SqlAlchemyGeographyRepository(session), SqlAlchemyPlanRepository(session))
+
+
+async def refresh_reference_data(store: ReferenceDataStore, interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await load_reference_data(store)
+        except Exception:
+            logger.exception("reference data reload failed, retrying in %ss", interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    analytics_client().start()
+    store = reference_data()
+    await load_reference_data(store)
+    tasks = [
+        asyncio.create_task(
+            listen_reloads(shared_redis(), REFERENCE_RELOAD_CHANNEL, lambda: load_reference_data(store))
+        ),
+        asyncio.create_task(refresh_reference_data(store, settings.reference_data_reload_seconds)),
+    ]
+    if settings.provider_index_enabled:
+        index = provider_index()
+        await rebuild_provider_index(index)
+        # The writer bumped the listing versions before this process's index caught
+        # up, so listings cached in between are staled again once it has.
+        listing_cache = RedisProviderListingCache(shared_redis(), settings.provider_cache_ttl_seconds)
+        tasks.append(asyncio.create_task(listen_provider_changes(shared_redis(), [index, listing_cache])))
+        tasks.append(
+            asyncio.create_task(
+                listen_reloads(shared_redis(), PROVIDER_REBUILD_CHANNEL, lambda: reload_provider_index(index))
+            )
+        )
+        tasks.append(asyncio.create_task(refresh_provider_index(index, settings.provider_index_rebuild_seconds)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await analytics_client().close()
+    password_hasher().close()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Menna API", default_response_class=Response)
+    app = FastAPI(title="Menna API", default_response_class=Response, lifespan=lifespan)
     app.add_middleware(MetricsMiddleware)
     app.add_middleware(
         CORSMiddleware,
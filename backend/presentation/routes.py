@@ -1,30 +1,76 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException
 
+from backend.application.pagination import InvalidCursor, page_size
+from backend.application.ports import HasherSaturated
 from backend.application.use_cases import (
+    AlreadyDelivered,
     CreateContactToken,
     CreateLeadRequest,
+    CountProviderFacets,
     CreateReview,
     DeliverLead,
+    DeliverLeadBulk,
     GetProviderProfile,
+    ListProviderInbox,
+    ListProviderReviews,
     ListProviders,
     Login,
+    NotProviderOwner,
+    OutOfCredits,
+    RecordDeliveryStatuses,
     RefreshToken,
     RegisterUser,
     RequestOTP,
     ResetPassword,
     VerifyOTP,
 )
+from backend.domain.entities import LeadStatus, User
+from backend.infrastructure.config import get_settings
+from backend.infrastructure.reference_data import pick_locale
 from backend.presentation import schemas
-from backend.presentation.dependencies import get_repositories, get_services
+from backend.presentation.dependencies import get_current_user, get_repositories, get_services
+from backend.presentation.http_cache import (
+    DETAIL_CACHE_CONTROL,
+    LISTING_CACHE_CONTROL,
+    REFERENCE_CACHE_CONTROL,
+    cache_headers,
+    etag_matches,
+    json_response,
+    listing_surrogate_keys,
+    not_modified,
+    strong_etag,
+)
 
 router = APIRouter()
 
 
+def hasher_busy(exc: HasherSaturated) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+
+async def require_provider_owner(provider_id: int, user: User, repos) -> None:
+    provider = await repos["providers"].get(provider_id)
+    if provider is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if provider.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not your provider")
+
+
+async def require_providers_owner(provider_ids: List[int], user: User, repos) -> None:
+    """403 unless ``user`` owns every listed provider that exists; unknown ids cost nothing and pass."""
+    owners = await repos["providers"].owners(provider_ids)
+    if any(owner_id != user.id for owner_id in owners.values()):
+        raise HTTPException(status_code=403, detail="Not your provider")
+
+
 @router.post("/auth/register", response_model=schemas.TokenResponse)
 async def register(payload: schemas.RegisterRequest, repos=Depends(get_repositories), services=Depends(get_services)):
     uc = RegisterUser(repos["users"], services["hasher"])
-    user = await uc.execute(payload.email, payload.password, payload.phone)
+    try:
+        user = await uc.execute(payload.email, payload.password, payload.phone)
+    except HasherSaturated as exc:
+        raise hasher_busy(exc)
     token_service = services["token"]
     return schemas.TokenResponse(
         access_token=token_service.create_access_token(user.id),
@@ -37,6 +83,8 @@ async def login(payload: schemas.LoginRequest, repos=Depends(get_repositories),
     uc = Login(repos["users"], services["hasher"], services["token"], services["limiter"])
     try:
         result = await uc.execute(payload.email, payload.password)
+    except HasherSaturated as exc:
+        raise hasher_busy(exc)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return schemas.TokenResponse(
@@ -77,84 +125,387 @@ async def verify_otp(user_id: int, phone: str, code: str, repos=Depends(get_repo
 @router.post("/auth/reset")
 async def reset_password(email: str, new_password: str, repos=Depends(get_repositories), services=Depends(get_services)):
     uc = ResetPassword(repos["users"], services["hasher"])
-    ok = await uc.execute(email, new_password)
+    try:
+        ok = await uc.execute(email, new_password)
+    except HasherSaturated as exc:
+        raise hasher_busy(exc)
     if not ok:
         raise HTTPException(status_code=404, detail="User not found")
     return {"status": "reset"}
 
 
-@router.get("/providers", response_model=list[schemas.ProviderResponse])
+def reference_response(store, resource: str, accept_language: Optional[str], if_none_match: Optional[str]):
+    snapshot = store.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Reference data not loaded")
+    locale = pick_locale(accept_language)
+    body = snapshot.body(resource, locale)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    headers = cache_headers(f'"{snapshot.version}-{locale}"', REFERENCE_CACHE_CONTROL, ["reference"])
+    headers.update({"Content-Language": locale, "Vary": "Accept-Language"})
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    return json_response(body, headers)
+
+
+@router.get("/cities", response_model=List[schemas.NamedResponse])
+async def list_cities(
+    accept_language: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    services=Depends(get_services),
+):
+    return reference_response(services["reference"], "cities", accept_language, if_none_match)
+
+
+@router.get("/cities/{city_id}/areas", response_model=List[schemas.AreaResponse])
+async def list_areas(
+    city_id: int,
+    accept_language: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    services=Depends(get_services),
+):
+    return reference_response(services["reference"], f"areas:{city_id}", accept_language, if_none_match)
+
+
+@router.get("/categories", response_model=List[schemas.NamedResponse])
+async def list_categories(
+    accept_language: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    services=Depends(get_services),
+):
+    return reference_response(services["reference"], "categories", accept_language, if_none_match)
+
+
+@router.get("/plans", response_model=List[schemas.PlanResponse])
+async def list_plans(
+    accept_language: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    services=Depends(get_services),
+):
+    return reference_response(services["reference"], "plans", accept_language, if_none_match)
+
+
+@router.get("/providers", response_model=Union[schemas.ProviderPage, schemas.ProviderCardPage])
 async def list_providers(
     category_id: Optional[int] = None,
     city_id: Optional[int] = None,
     area_ids: Optional[str] = None,
+    area_match: Literal["any", "all"] = "all",
     verified: Optional[bool] = None,
     language: Optional[str] = None,
     sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    view: Literal["full", "card"] = "full",
+    if_none_match: Optional[str] = Header(None),
     repos=Depends(get_repositories),
     services=Depends(get_services),
 ):
-    area_list = [int(x) for x in area_ids.split(",")] if area_ids else None
-    uc = ListProviders(repos["providers"], services["analytics"])
-    providers = await uc.execute(
-        category_id=category_id,
-        city_id=city_id,
-        area_ids=area_list,
-        verified=verified,
-        language=language,
-        sort=sort,
+    area_list = sorted({int(x) for x in area_ids.split(",")}) if area_ids else None
+    language = language.lower() if language else None
+    q = " ".join(q.split()) if q else None
+    cache = services["listing_cache"]
+    key = cache.key(
+        {
+            "category_id": category_id,
+            "city_id": city_id,
+            "area_ids": area_list,
+            "area_match": area_match,
+            "verified": verified,
+            "language": language,
+            "sort": sort,
+            "limit": page_size(limit),
+            "cursor": cursor,
+            "q": q,
+            "view": view,
+        }
     )
-    return [schemas.ProviderResponse(**p.__dict__) for p in providers]
+    version = await cache.version(city_id, category_id)
+    headers = cache_headers(
+        strong_etag(key, version), LISTING_CACHE_CONTROL, listing_surrogate_keys(city_id, category_id)
+    )
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    uc = ListProviders(repos["providers"], services["analytics"])
+    cached = await cache.get(key, version)
+    if cached is not None:
+        body, count = cached
+        await uc.viewed(category_id, city_id, count)
+        return json_response(body, headers)
+
+    try:
+        page = await uc.execute(
+            category_id=category_id,
+            city_id=city_id,
+            area_ids=area_list,
+            verified=verified,
+            language=language,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+            area_match=area_match,
+            q=q,
+            view=view,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if view == "card":
+        body = schemas.ProviderCardPage(
+            items=[schemas.ProviderCardResponse(**p.__dict__) for p in page.items],
+            next_cursor=page.next_cursor,
+        ).model_dump_json()
+    else:
+        body = schemas.ProviderPage(
+            items=[schemas.ProviderResponse(**p.__dict__) for p in page.items],
+            next_cursor=page.next_cursor,
+        ).model_dump_json()
+    await cache.set(key, version, body, len(page.items))
+    return json_response(body, headers)
+
+
+@router.get("/providers/facets", response_model=schemas.ProviderFacetsResponse)
+async def provider_facets(
+    category_id: Optional[int] = None,
+    city_id: Optional[int] = None,
+    area_ids: Optional[str] = None,
+    area_match: Literal["any", "all"] = "all",
+    verified: Optional[bool] = None,
+    language: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+):
+    area_list = sorted({int(x) for x in area_ids.split(",")}) if area_ids else None
+    language = language.lower() if language else None
+    filters = {
+        "category_id": category_id,
+        "city_id": city_id,
+        "area_ids": area_list,
+        "verified": verified,
+        "language": language,
+        "area_match": area_match,
+    }
+    cache = services["listing_cache"]
+    key = cache.key({"facets": True, **filters})
+    # Counts for the other cities and categories move with any provider write.
+    version = await cache.version(None, None)
+    headers = cache_headers(strong_etag(key, version), LISTING_CACHE_CONTROL, ["providers"])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    cached = await cache.get(key, version)
+    if cached is not None:
+        return json_response(cached[0], headers)
+
+    facets = await CountProviderFacets(repos["providers"]).execute(**filters)
+    body = schemas.ProviderFacetsResponse(**facets.__dict__).model_dump_json()
+    await cache.set(key, version, body, sum(facets.city.values()))
+    return json_response(body, headers)
 
 
 @router.get("/providers/{provider_id}", response_model=schemas.ProviderResponse)
-async def provider_detail(provider_id: int, repos=Depends(get_repositories), services=Depends(get_services)):
+async def provider_detail(
+    provider_id: int,
+    if_none_match: Optional[str] = Header(None),
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+):
+    # Read the version before the provider. It is bumped only after a change
+    # commits, and again by each process once its index has the change, so a
+    # body read after it is never older than the version it is tagged with.
+    version = await services["listing_cache"].provider_version(provider_id)
+    headers = cache_headers(
+        strong_etag("provider", str(provider_id), version), DETAIL_CACHE_CONTROL, [f"provider-{provider_id}"]
+    )
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
     uc = GetProviderProfile(repos["providers"], services["analytics"])
     provider = await uc.execute(provider_id)
     if not provider:
         raise HTTPException(status_code=404, detail="Not found")
-    return schemas.ProviderResponse(**provider.__dict__)
+    return json_response(schemas.ProviderResponse(**provider.__dict__).model_dump_json(), headers)
+
+
+@router.get("/providers/{provider_id}/inbox", response_model=schemas.InboxPage)
+async def provider_inbox(
+    provider_id: int,
+    status: Optional[Literal["delivered", "opened", "responded"]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    repos=Depends(get_repositories),
+    user: User = Depends(get_current_user),
+):
+    await require_provider_owner(provider_id, user, repos)
+    uc = ListProviderInbox(repos["leads"])
+    try:
+        page = await uc.execute(provider_id, LeadStatus(status) if status else None, limit, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return schemas.InboxPage(
+        items=[
+            schemas.InboxItemResponse(**{**item.__dict__, "status": LeadStatus(item.status).value})
+            for item in page.items
+        ],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.get("/providers/{provider_id}/reviews", response_model=schemas.ReviewPage)
+async def provider_reviews(
+    provider_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+):
+    uc = ListProviderReviews(
+        repos["reviews"], repos["providers"], services["review_summaries"], get_settings().review_summary_latest
+    )
+    try:
+        result = await uc.execute(provider_id, limit, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    summary, page = result
+    return schemas.ReviewPage(
+        summary=schemas.ReviewSummaryResponse(
+            rating=summary.rating,
+            rating_count=summary.rating_count,
+            rating_histogram=summary.rating_histogram,
+            latest=[schemas.ProviderReviewResponse(**r.__dict__) for r in summary.latest],
+        ),
+        items=[schemas.ProviderReviewResponse(**r.__dict__) for r in page.items],
+        next_cursor=page.next_cursor,
+    )
 
 
 @router.post("/leads")
-async def create_lead(payload: schemas.LeadRequestPayload, repos=Depends(get_repositories), services=Depends(get_services)):
-    uc = CreateLeadRequest(repos["leads"], repos["providers"], services["analytics"])
-    lead = await uc.execute(
-        user_id=0,
-        category_id=payload.category_id,
-        city_id=payload.city_id,
-        area_ids=payload.area_ids,
-        description=payload.description,
-        preferred_time=payload.preferred_time,
+async def create_lead(
+    payload: schemas.LeadRequestPayload,
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+    user: User = Depends(get_current_user),
+):
+    outbox = repos["outbox"]
+    uc = CreateLeadRequest(
+        repos["leads"],
+        outbox,
+        outbox,
+        match_inline=get_settings().lead_matching_inline,
+        dedup=services["lead_dedup"],
+        uow=repos["uow"],
     )
+    async with repos["uow"]:
+        lead = await uc.execute(
+            user_id=user.id,
+            category_id=payload.category_id,
+            city_id=payload.city_id,
+            area_ids=payload.area_ids,
+            description=payload.description,
+            preferred_time=payload.preferred_time,
+        )
     return {"id": lead.id}
 
 
 @router.post("/leads/{lead_id}/deliver/{provider_id}")
-async def deliver_lead(lead_id: int, provider_id: int, repos=Depends(get_repositories), services=Depends(get_services)):
-    uc = DeliverLead(repos["leads"], services["analytics"], repos["subscriptions"])
-    delivery = await uc.execute(lead_id=lead_id, provider_id=provider_id)
+async def deliver_lead(
+    lead_id: int,
+    provider_id: int,
+    repos=Depends(get_repositories),
+    user: User = Depends(get_current_user),
+):
+    await require_provider_owner(provider_id, user, repos)
+    outbox = repos["outbox"]
+    uc = DeliverLead(repos["leads"], outbox, repos["subscriptions"], outbox)
+    try:
+        async with repos["uow"]:
+            delivery = await uc.execute(lead_id=lead_id, provider_id=provider_id)
+    except OutOfCredits as exc:
+        raise HTTPException(status_code=402, detail=str(exc))
+    except AlreadyDelivered as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
     return {"delivery_id": delivery.id}
 
 
+@router.post("/leads/{lead_id}/deliveries", response_model=schemas.BulkDeliveryResponse)
+async def deliver_lead_bulk(
+    lead_id: int,
+    payload: schemas.BulkDeliveryPayload,
+    repos=Depends(get_repositories),
+    user: User = Depends(get_current_user),
+):
+    await require_providers_owner(payload.provider_ids, user, repos)
+    outbox = repos["outbox"]
+    uc = DeliverLeadBulk(repos["leads"], repos["providers"], outbox, outbox)
+    try:
+        async with repos["uow"]:
+            outcomes = await uc.execute(lead_id, payload.provider_ids)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    return schemas.BulkDeliveryResponse(
+        results=[schemas.DeliveryOutcomeResponse(**outcome.__dict__) for outcome in outcomes]
+    )
+
+
+@router.post("/deliveries/status:batch", response_model=schemas.DeliveryStatusBatchResponse)
+async def record_delivery_statuses(
+    payload: schemas.DeliveryStatusBatchPayload,
+    repos=Depends(get_repositories),
+    user: User = Depends(get_current_user),
+):
+    uc = RecordDeliveryStatuses(repos["leads"], repos["outbox"])
+    try:
+        async with repos["uow"]:
+            changed = await uc.execute(((t.delivery_id, LeadStatus(t.status)) for t in payload.transitions), user.id)
+    except NotProviderOwner as exc:
+        raise HTTPException(status_code=403, detail=str(exc))
+    return schemas.DeliveryStatusBatchResponse(received=len(payload.transitions), applied=len(changed))
+
+
 @router.post("/contact-token")
-async def contact_token(provider_id: int, user_id: int, lead_id: Optional[int] = None, repos=Depends(get_repositories), services=Depends(get_services)):
-    uc = CreateContactToken(repos["contacts"], services["analytics"])
-    token = await uc.execute(provider_id, user_id, lead_id)
+async def contact_token(
+    provider_id: int,
+    lead_id: Optional[int] = None,
+    repos=Depends(get_repositories),
+    user: User = Depends(get_current_user),
+):
+    outbox = repos["outbox"]
+    uc = CreateContactToken(repos["contacts"], outbox, outbox)
+    async with repos["uow"]:
+        token = await uc.execute(provider_id, user.id, lead_id)
     return {"contact_token": token}
 
 
 @router.post("/reviews")
-async def create_review(payload: schemas.ReviewPayload, repos=Depends(get_repositories), services=Depends(get_services)):
-    uc = CreateReview(repos["leads"], repos["reviews"], repos["providers"], services["analytics"])
+async def create_review(
+    payload: schemas.ReviewPayload,
+    repos=Depends(get_repositories),
+    services=Depends(get_services),
+    user: User = Depends(get_current_user),
+):
+    outbox = repos["outbox"]
+    uc = CreateReview(
+        repos["leads"],
+        repos["reviews"],
+        repos["providers"],
+        outbox,
+        outbox,
+        summaries=services["review_summaries"],
+        uow=repos["uow"],
+    )
     try:
-        review = await uc.execute(
-            lead_id=payload.lead_id,
-            provider_id=payload.provider_id,
-            user_id=0,
-            rating=payload.rating,
-            comment=payload.comment,
-        )
+        async with repos["uow"]:
+            review = await uc.execute(
+                lead_id=payload.lead_id,
+                provider_id=payload.provider_id,
+                user_id=user.id,
+                rating=payload.rating,
+                comment=payload.comment,
+            )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     return {"id": review.id}
@@ -1,5 +1,6 @@
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 
 class RegisterRequest(BaseModel):
@@ -35,11 +36,59 @@ class ProviderResponse(BaseModel):
     phone: Optional[str]
     rating: float
     rating_count: int
+    rating_histogram: List[int] = Field(default_factory=lambda: [0] * 5)
 
     class Config:
         orm_mode = True
 
 
+class ProviderPage(BaseModel):
+    items: List[ProviderResponse]
+    next_cursor: Optional[str] = None
+
+
+class ProviderCardResponse(BaseModel):
+    id: int
+    name: str
+    avatar_url: Optional[str]
+    verified: bool
+    categories: List[int]
+    city_id: int
+    rating: float
+    rating_count: int
+
+
+class ProviderCardPage(BaseModel):
+    items: List[ProviderCardResponse]
+    next_cursor: Optional[str] = None
+
+
+class NamedResponse(BaseModel):
+    id: int
+    name: str
+
+
+class AreaResponse(NamedResponse):
+    city_id: int
+
+
+class PlanResponse(BaseModel):
+    id: int
+    name: str
+    plan_type: str
+    monthly_credits: int
+    price: float
+    features: List[str]
+
+
+class ProviderFacetsResponse(BaseModel):
+    category: Dict[int, int]
+    city: Dict[int, int]
+    area: Dict[int, int]
+    verified: Dict[bool, int]
+    language: Dict[str, int]
+
+
 class LeadRequestPayload(BaseModel):
     category_id: int
     city_id: int
@@ -48,8 +97,73 @@ class LeadRequestPayload(BaseModel):
     preferred_time: Optional[str]
 
 
+class BulkDeliveryPayload(BaseModel):
+    provider_ids: List[int] = Field(min_length=1, max_length=500)
+
+
+class DeliveryOutcomeResponse(BaseModel):
+    provider_id: int
+    status: str
+    delivery_id: Optional[int] = None
+
+
+class BulkDeliveryResponse(BaseModel):
+    results: List[DeliveryOutcomeResponse]
+
+
+class DeliveryStatusTransition(BaseModel):
+    delivery_id: int
+    status: Literal["opened", "responded"]
+
+
+class DeliveryStatusBatchPayload(BaseModel):
+    transitions: List[DeliveryStatusTransition] = Field(min_length=1, max_length=10000)
+
+
+class DeliveryStatusBatchResponse(BaseModel):
+    received: int
+    applied: int
+
+
+class InboxItemResponse(BaseModel):
+    delivery_id: int
+    lead_id: int
+    status: str
+    delivered_at: datetime
+    category_id: int
+    city_id: int
+    area_ids: List[int]
+    preferred_time: Optional[str]
+    excerpt: str
+
+
+class InboxPage(BaseModel):
+    items: List[InboxItemResponse]
+    next_cursor: Optional[str] = None
+
+
+class ProviderReviewResponse(BaseModel):
+    id: int
+    rating: int
+    comment: Optional[str]
+    created_at: datetime
+
+
+class ReviewSummaryResponse(BaseModel):
+    rating: float
+    rating_count: int
+    rating_histogram: List[int]
+    latest: List[ProviderReviewResponse]
+
+
+class ReviewPage(BaseModel):
+    summary: ReviewSummaryResponse
+    items: List[ProviderReviewResponse]
+    next_cursor: Optional[str] = None
+
+
 class ReviewPayload(BaseModel):
     lead_id: int
     provider_id: int
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: Optional[str] = None
@@ -0,0 +1,27 @@
+"""Import infrastructure modules in tests that never reach Postgres, Redis or ClickHouse.
+
+``Settings`` is read once, at import, and requires the service URLs. The
+placeholders are set only while importing, so they never leak into the
+environment the Postgres tests check before they run.
+"""
+import importlib
+import os
+
+import pytest
+
+PLACEHOLDERS = {
+    "DATABASE_URL": "postgresql+asyncpg://unused/unused",
+    "SYNC_DATABASE_URL": "postgresql://unused/unused",
+    "REDIS_URL": "redis://unused",
+    "CLICKHOUSE_URL": "http://unused",
+    "JWT_SECRET": "unused",
+}
+
+
+def import_with_placeholders(*modules: str) -> None:
+    with pytest.MonkeyPatch.context() as env:
+        for name, value in PLACEHOLDERS.items():
+            if not os.getenv(name):
+                env.setenv(name, value)
+        for module in modules:
+            importlib.import_module(module)
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("redis")
+pytest.importorskip("pydantic_settings")
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.services")
+
+
+class FakeWriter:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.closed = False
+
+    async def insert(self, rows):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise httpx.ConnectError("clickhouse down")
+        self.batches.append(rows)
+
+    async def close(self):
+        self.closed = True
+
+
+def dropped(reason):
+    from backend.infrastructure.services import ANALYTICS_DROPPED
+
+    return ANALYTICS_DROPPED.labels(reason)._value.get()
+
+
+def test_full_batch_flushes_without_waiting_for_the_interval():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter()
+    analytics = ClickHouseAnalytics(writer, batch_size=3, flush_interval=60)
+
+    async def run():
+        for i in range(3):
+            await analytics.track("provider_viewed", {"provider_id": i})
+        await asyncio.sleep(0.01)
+        flushed = [len(batch) for batch in writer.batches]
+        await analytics.close()
+        return flushed
+
+    assert asyncio.run(run()) == [3]
+    assert writer.closed
+
+
+def test_partial_batch_flushes_on_the_interval():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter()
+    analytics = ClickHouseAnalytics(writer, batch_size=100, flush_interval=0.02)
+
+    async def run():
+        await analytics.track("provider_viewed", {"provider_id": 1})
+        await asyncio.sleep(0.1)
+        flushed = [len(batch) for batch in writer.batches]
+        await analytics.close()
+        return flushed
+
+    assert asyncio.run(run()) == [1]
+
+
+def test_overflow_is_dropped_and_counted():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter()
+    analytics = ClickHouseAnalytics(writer, batch_size=100, flush_interval=60, max_buffer=2)
+    before = dropped("buffer_full")
+
+    async def run():
+        for i in range(5):
+            await analytics.track("provider_viewed", {"provider_id": i})
+        await analytics.close()
+
+    asyncio.run(run())
+    assert dropped("buffer_full") - before == 3
+    assert [len(batch) for batch in writer.batches] == [2]
+
+
+def test_failed_insert_drops_the_batch():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter(fail=True)
+    analytics = ClickHouseAnalytics(writer, batch_size=2, flush_interval=60)
+    before = dropped("flush_error")
+
+    async def run():
+        for i in range(3):
+            await analytics.track("provider_viewed", {"provider_id": i})
+        await analytics.close()
+
+    asyncio.run(run())
+    assert dropped("flush_error") - before == 3
+    assert writer.closed
+
+
+def test_close_waits_for_the_insert_in_flight():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter(delay=0.05)
+    analytics = ClickHouseAnalytics(writer, batch_size=2, flush_interval=60)
+
+    async def run():
+        for i in range(3):
+            await analytics.track("provider_viewed", {"provider_id": i})
+        await asyncio.sleep(0.01)
+        await analytics.close()
+
+    asyncio.run(run())
+    assert sorted(len(batch) for batch in writer.batches) == [1, 2]
+
+
+def test_client_survives_a_new_event_loop():
+    from backend.infrastructure.services import ClickHouseAnalytics
+
+    writer = FakeWriter()
+    analytics = ClickHouseAnalytics(writer, batch_size=1, flush_interval=60)
+
+    async def run(provider_id):
+        await analytics.track("provider_viewed", {"provider_id": provider_id})
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run(1))
+    asyncio.run(run(2))
+    asyncio.run(analytics.close())
+    assert [batch[0]["provider_id"] for batch in writer.batches] == ["1", "2"]
@@ -0,0 +1,38 @@
+from backend.infrastructure.argon2_calibration import MIN_MEMORY_KIB, Argon2Params, calibrate
+
+
+def cost_model(seconds_per_pass_per_gib: float):
+    """Latency grows with time_cost and memory and shrinks with lanes, like Argon2 does."""
+    calls = []
+
+    def measure(params: Argon2Params, concurrency: int) -> float:
+        calls.append(params)
+        gib = params.memory_cost / (1024 * 1024)
+        return seconds_per_pass_per_gib * params.time_cost * gib * concurrency / params.parallelism
+
+    return measure, calls
+
+
+def test_picks_the_largest_time_cost_within_target():
+    measure, _ = cost_model(0.8)
+    result = calibrate(0.25, concurrency=2, memory_budget_kib=256 * 1024, cores=8, measure=measure)
+    assert result.meets_target
+    assert result.params == Argon2Params(time_cost=5, memory_cost=128 * 1024, parallelism=4)
+    assert result.latency_seconds <= 0.25
+    assert result.logins_per_second == 2 / result.latency_seconds
+
+
+def test_halves_memory_when_even_one_pass_is_too_slow():
+    measure, calls = cost_model(1.0)
+    result = calibrate(0.25, concurrency=4, memory_budget_kib=1024 * 1024, cores=4, measure=measure)
+    assert result.meets_target
+    assert result.params == Argon2Params(time_cost=1, memory_cost=64 * 1024, parallelism=1)
+    assert [p.memory_cost for p in calls if p.time_cost == 1][:2] == [256 * 1024, 128 * 1024]
+
+
+def test_reports_unreachable_target_with_cheapest_parameters():
+    measure, _ = cost_model(500.0)
+    result = calibrate(0.05, concurrency=2, memory_budget_kib=256 * 1024, cores=2, measure=measure)
+    assert not result.meets_target
+    assert result.params.time_cost == 1
+    assert MIN_MEMORY_KIB <= result.params.memory_cost < 2 * MIN_MEMORY_KIB
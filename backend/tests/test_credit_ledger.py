@@ -0,0 +1,72 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("needs a migrated Postgres (DATABASE_URL)", allow_module_level=True)
+
+PARALLEL = 300
+CREDITS = 50
+
+
+async def stress_reservations():
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.infrastructure import models
+    from backend.infrastructure.repositories import SqlAlchemySubscriptionRepository
+
+    engine = create_async_engine(os.environ["DATABASE_URL"], pool_size=20, max_overflow=0)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        # Ledger rows cannot be deleted, so every run seeds its own provider.
+        async with Session() as session:
+            user = models.UserModel(email=f"stress-{uuid.uuid4().hex}@example.com", password_hash="x")
+            session.add(user)
+            await session.flush()
+            provider = models.ProviderModel(user_id=user.id, name="Stress", bio_i18n={})
+            session.add(provider)
+            await session.flush()
+            subscription = models.SubscriptionModel(provider_id=provider.id, credits=CREDITS, active=True)
+            session.add(subscription)
+            await session.commit()
+
+        async def reserve():
+            async with Session() as session:
+                balance = await SqlAlchemySubscriptionRepository(session).reserve_credit(provider.id)
+                await session.commit()
+                return balance
+
+        balances = await asyncio.gather(*[reserve() for _ in range(PARALLEL)])
+
+        async with Session() as session:
+            credits = await session.scalar(
+                select(models.SubscriptionModel.credits).where(models.SubscriptionModel.id == subscription.id)
+            )
+            ledger = models.CreditLedgerModel
+            debited = await session.scalar(
+                select(func.sum(ledger.delta)).where(ledger.subscription_id == subscription.id)
+            )
+        return balances, credits, debited
+    finally:
+        await engine.dispose()
+
+
+def test_parallel_reservations_never_overspend():
+    from sqlalchemy.exc import OperationalError
+
+    try:
+        balances, credits, debited = asyncio.run(stress_reservations())
+    except (OperationalError, OSError):
+        pytest.skip("Postgres is not reachable")
+    granted = sorted(b for b in balances if b is not None)
+    assert granted == list(range(CREDITS))
+    assert balances.count(None) == PARALLEL - CREDITS
+    assert credits == 0
+    assert debited == -CREDITS
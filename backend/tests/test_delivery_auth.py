@@ -0,0 +1,64 @@
+import pytest
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "redis", "jose", "passlib", "prometheus_client", "httpx"):
+    pytest.importorskip(module)
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.presentation.routes")
+
+from backend.application import ports
+from backend.domain.entities import User
+
+
+class BearerTokens:
+    """Every bearer token is an access token for the user id it spells."""
+
+    def verify_token(self, token, kind):
+        if kind != ports.ACCESS_TOKEN or not token.isdigit():
+            raise ports.InvalidToken(token)
+        return int(token)
+
+
+class Users:
+    async def get(self, user_id):
+        return User(id=user_id, email=f"{user_id}@example.com", password_hash="x", phone=None)
+
+
+class Providers:
+    """Provider p belongs to user p // 10."""
+
+    async def owners(self, provider_ids):
+        return {p: p // 10 for p in provider_ids}
+
+
+class Untouchable:
+    def __getattr__(self, name):
+        raise AssertionError(f"an unauthorized request reached {name}")
+
+
+def client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.presentation.dependencies import get_repositories, get_services
+    from backend.presentation.routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+    repos = {"users": Users(), "providers": Providers(), "leads": Untouchable(), "uow": Untouchable()}
+    app.dependency_overrides[get_repositories] = lambda: {**repos, "outbox": Untouchable()}
+    app.dependency_overrides[get_services] = lambda: {"token": BearerTokens()}
+    return TestClient(app)
+
+
+def test_bulk_delivery_needs_a_token():
+    response = client().post("/leads/1/deliveries", json={"provider_ids": [10, 11]})
+    assert response.status_code == 401
+
+
+def test_bulk_delivery_refuses_providers_of_other_users():
+    response = client().post(
+        "/leads/1/deliveries", json={"provider_ids": [10, 21]}, headers={"Authorization": "Bearer 1"}
+    )
+    assert response.status_code == 403
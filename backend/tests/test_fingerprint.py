@@ -0,0 +1,24 @@
+from backend.domain.fingerprint import hamming, normalize, shingles, simhash
+
+REQUEST = "أحتاج سباك لإصلاح تسريب المياه في المطبخ، الرجاء الاتصال صباحاً. التسريب تحت المغسلة منذ يومين"
+
+
+def test_normalize_folds_case_marks_and_punctuation():
+    assert normalize("  Fix   the SINK!!  ") == "fix the sink"
+    assert normalize("إصلاحٌ المغسلة") == normalize("اصلاح المغسله")
+    assert normalize("שלום") == normalize("שלומ")
+
+
+def test_shingles_of_short_and_empty_text():
+    assert shingles("ab") == frozenset(["ab"])
+    assert shingles(" .. ") == frozenset()
+    assert simhash("") == 0
+
+
+def test_near_duplicates_are_close_and_unrelated_text_is_far():
+    retyped = REQUEST.replace("أ", "ا").replace("إ", "ا").replace("،", "") + "!!"
+    edited = REQUEST + " شكرا"
+    unrelated = "Looking for an electrician to install three ceiling lights in the living room next week"
+    assert simhash(retyped) == simhash(REQUEST)
+    assert hamming(simhash(edited), simhash(REQUEST)) <= 6
+    assert hamming(simhash(unrelated), simhash(REQUEST)) > 16
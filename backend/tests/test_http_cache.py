@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from backend.presentation.http_cache import (
+    DETAIL_CACHE_CONTROL,
+    cache_headers,
+    etag_matches,
+    listing_surrogate_keys,
+    not_modified,
+    strong_etag,
+)
+
+
+def test_strong_etag_is_stable_and_content_sensitive():
+    etag = strong_etag("provider", "body")
+    assert etag == strong_etag("provider", "body")
+    assert etag != strong_etag("provider", "body2")
+    assert etag.startswith('"') and etag.endswith('"') and not etag.startswith("W/")
+
+
+def test_if_none_match_accepts_lists_weak_tags_and_wildcard():
+    etag = strong_etag("x")
+    assert not etag_matches(None, etag)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_not_modified_keeps_the_cache_headers():
+    headers = cache_headers(strong_etag("x"), DETAIL_CACHE_CONTROL, listing_surrogate_keys(1, 2))
+    response = not_modified(headers)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == headers["ETag"]
+    assert response.headers["Cache-Control"] == "public, max-age=60, stale-while-revalidate=300"
+    assert response.headers["Surrogate-Key"] == "providers providers-city-1 providers-category-2"
+
+
+def test_provider_detail_answers_304_from_the_version_alone():
+    for module in ("fastapi", "sqlalchemy", "asyncpg", "redis", "jose", "passlib", "prometheus_client", "httpx"):
+        pytest.importorskip(module)
+    from backend.tests.placeholder_settings import import_with_placeholders
+
+    import_with_placeholders("backend.presentation.routes")
+    from backend.infrastructure.search_index import IndexedProviderRepository, ProviderSearchIndex
+    from backend.infrastructure.services import RedisProviderListingCache
+    from backend.presentation.routes import provider_detail
+    from backend.tests.test_listing_cache import FakeRedis
+    from backend.tests.test_search_index import make_provider
+    from backend.tests.test_use_cases import RecordingAnalytics
+
+    class CountingProviders(IndexedProviderRepository):
+        reads = 0
+
+        async def get(self, provider_id):
+            self.reads += 1
+            return await super().get(provider_id)
+
+    index = ProviderSearchIndex()
+    index.rebuild([make_provider(7)])
+    providers, analytics = CountingProviders(index, None), RecordingAnalytics()
+    cache = RedisProviderListingCache(FakeRedis())
+    repos = {"providers": providers}
+    services = {"analytics": analytics, "listing_cache": cache}
+
+    async def run():
+        first = await provider_detail(7, None, repos, services)
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == DETAIL_CACHE_CONTROL
+        etag = first.headers["ETag"]
+        assert (await provider_detail(7, etag, repos, services)).status_code == 304
+        assert providers.reads == 1 and len(analytics.events) == 1
+
+        changed = make_provider(7, rating=4.5)
+        for listener in (index, cache):
+            await listener.provider_changed(changed)
+        fresh = await provider_detail(7, etag, repos, services)
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != etag
+        assert b'"rating":4.5' in fresh.body
+
+    asyncio.run(run())
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("redis")
+pytest.importorskip("pydantic_settings")
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.services")
+
+from backend.tests.test_search_index import make_provider
+
+
+class FakeRedis:
+    """The handful of string and hash commands the listing cache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hmget(self, key, *fields):
+        entry = self.data.get(key, {})
+        return [entry.get(field) for field in fields]
+
+    async def expire(self, key, seconds):
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def test_cached_body_is_served_until_a_provider_in_scope_changes():
+    from backend.infrastructure.services import RedisProviderListingCache
+
+    async def run():
+        cache = RedisProviderListingCache(FakeRedis())
+        key = cache.key({"city_id": 1, "category_id": 2})
+        version = await cache.version(1, 2)
+        await cache.set(key, version, '{"items":[]}', 0)
+        assert await cache.get(key, version) == ('{"items":[]}', 0)
+
+        await cache.provider_changed(make_provider(9, city_id=3, categories=[4]))
+        assert await cache.version(1, 2) == version
+        await cache.provider_changed(make_provider(9, city_id=1, categories=[4]))
+        fresh = await cache.version(1, 2)
+        assert fresh != version
+        assert await cache.get(key, fresh) is None
+
+    asyncio.run(run())
+
+
+def test_moved_provider_bumps_the_scopes_it_left():
+    from backend.infrastructure.services import RedisProviderListingCache
+
+    async def run():
+        cache = RedisProviderListingCache(FakeRedis())
+        before = make_provider(9, city_id=1, categories=[2])
+        after = make_provider(9, city_id=3, categories=[4])
+        versions = [await cache.version(c, None) for c in (1, 3)] + [await cache.version(None, c) for c in (2, 4)]
+        await cache.provider_changed(after, before)
+        bumped = [await cache.version(c, None) for c in (1, 3)] + [await cache.version(None, c) for c in (2, 4)]
+        assert all(old != new for old, new in zip(versions, bumped))
+
+    asyncio.run(run())
+
+
+def test_invalidate_all_changes_every_version():
+    from backend.infrastructure.services import RedisProviderListingCache
+
+    async def run():
+        cache = RedisProviderListingCache(FakeRedis())
+        listing, facets = await cache.version(1, None), await cache.version(None, None)
+        await cache.invalidate_all()
+        assert await cache.version(1, None) != listing
+        assert await cache.version(None, None) != facets
+
+    asyncio.run(run())
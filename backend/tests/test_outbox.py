@@ -0,0 +1,147 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("needs a migrated Postgres (DATABASE_URL)", allow_module_level=True)
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.rows = []
+
+    async def insert(self, rows):
+        self.rows += rows
+
+
+class FailingWriter:
+    def __init__(self):
+        self.calls = 0
+
+    async def insert(self, rows):
+        import httpx
+
+        self.calls += 1
+        raise httpx.ConnectError("clickhouse down")
+
+
+class RecordingJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    async def publish_many(self, jobs):
+        self.jobs += jobs
+
+
+async def stage_and_relay():
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.application.jobs import NotifyProviderJob
+    from backend.infrastructure import models
+    from backend.infrastructure.outbox import OutboxRelay, SqlAlchemyOutbox
+    from backend.infrastructure.repositories import SqlAlchemyUnitOfWork
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    marker = uuid.uuid4().hex
+    try:
+        async with Session() as session:
+            outbox = SqlAlchemyOutbox(session)
+            with pytest.raises(RuntimeError):
+                async with SqlAlchemyUnitOfWork(session):
+                    await outbox.track("rolled_back", {"marker": marker})
+                    raise RuntimeError
+            async with SqlAlchemyUnitOfWork(session):
+                await outbox.track("lead_created", {"marker": marker})
+                await outbox.publish(NotifyProviderJob(1, "lead_delivered", {"marker": marker}))
+
+        writer, jobs = RecordingWriter(), RecordingJobQueue()
+        relay = OutboxRelay(Session, writer, jobs, batch_size=10_000)
+        while await relay.dispatch_batch():
+            pass
+        async with Session() as session:
+            left = await session.scalar(
+                select(models.OutboxModel.id).where(models.OutboxModel.payload["marker"].astext == marker)
+            )
+        return marker, writer.rows, jobs.jobs, left
+    finally:
+        await engine.dispose()
+
+
+def test_outbox_commits_with_the_unit_of_work_and_relay_drains_it():
+    from sqlalchemy.exc import OperationalError
+
+    try:
+        marker, rows, jobs, left = asyncio.run(stage_and_relay())
+    except (OperationalError, OSError):
+        pytest.skip("Postgres is not reachable")
+    events = [row["event"] for row in rows if row["metadata"].get("marker") == marker]
+    assert events == ["lead_created"]
+    assert [job.kind for job in jobs if job.data.get("marker") == marker] == ["lead_delivered"]
+    assert left is None
+
+
+async def relay_against_failing_clickhouse():
+    from sqlalchemy import select, update
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.infrastructure import models
+    from backend.infrastructure.outbox import OutboxRelay, SqlAlchemyOutbox
+    from backend.infrastructure.repositories import SqlAlchemyUnitOfWork
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    marker = uuid.uuid4().hex
+    outbox = models.OutboxModel
+    mine = outbox.payload["marker"].astext == marker
+    try:
+        async with Session() as session:
+            async with SqlAlchemyUnitOfWork(session):
+                await SqlAlchemyOutbox(session).track("lead_created", {"marker": marker})
+
+        writer = FailingWriter()
+        relay = OutboxRelay(Session, writer, RecordingJobQueue(), batch_size=10_000, max_attempts=2)
+        dispatched = [await relay.dispatch_batch(), await relay.dispatch_batch()]
+        calls_while_backing_off = writer.calls
+        async with Session() as session:
+            await session.execute(update(outbox).where(mine).values(next_attempt_at=outbox.created_at))
+            await session.commit()
+        dispatched.append(await relay.dispatch_batch())
+        async with Session() as session:
+            await session.execute(update(outbox).where(mine).values(next_attempt_at=outbox.created_at))
+            await session.commit()
+        dispatched.append(await relay.dispatch_batch())
+        async with Session() as session:
+            row = (await session.execute(select(outbox.attempts, outbox.last_error).where(mine))).one()
+            await session.execute(outbox.__table__.delete().where(mine))
+            await session.commit()
+        return dispatched, calls_while_backing_off, writer.calls, tuple(row)
+    finally:
+        await engine.dispose()
+
+
+def test_relay_backs_off_then_parks_rows_clickhouse_rejects():
+    from sqlalchemy.exc import OperationalError
+
+    try:
+        dispatched, calls_while_backing_off, calls, (attempts, last_error) = asyncio.run(
+            relay_against_failing_clickhouse()
+        )
+    except (OperationalError, OSError):
+        pytest.skip("Postgres is not reachable")
+    # Nothing was dispatched, so run() sleeps instead of spinning on the same batch.
+    assert dispatched == [0, 0, 0, 0]
+    # The failed row is not claimed again until its backoff has elapsed.
+    assert calls_while_backing_off == 1
+    # The second failure reaches max_attempts and parks the row for good.
+    assert calls == 2
+    assert attempts == 2
+    assert "clickhouse down" in last_error
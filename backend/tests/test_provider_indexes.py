@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+
+if not os.getenv("SYNC_DATABASE_URL"):
+    pytest.skip("needs a migrated Postgres (SYNC_DATABASE_URL)", allow_module_level=True)
+
+
+@pytest.fixture(scope="module")
+def connection():
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine(os.environ["SYNC_DATABASE_URL"])
+    try:
+        conn = engine.connect()
+    except OperationalError:
+        pytest.skip("Postgres is not reachable")
+    # The test tables are tiny; disable seq scans so the plan shows which indexes are usable.
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    yield conn
+    conn.close()
+    engine.dispose()
+
+
+def explain(conn, query) -> str:
+    compiled = query.compile(dialect=conn.dialect)
+    rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), compiled.params).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ({"category_id": 1}, "ix_providers_category_ids"),
+        ({"area_ids": [1, 2]}, "ix_providers_area_ids"),
+        ({"area_ids": [1, 2], "area_match": "any"}, "ix_providers_area_ids"),
+    ],
+)
+def test_array_filters_use_gin_indexes(connection, filters, index):
+    from sqlalchemy import select
+
+    from backend.infrastructure.models import ProviderModel
+    from backend.infrastructure.repositories import provider_filters
+
+    # No ORDER BY id / LIMIT: with those the planner may rightly walk the primary key instead.
+    plan = explain(connection, select(ProviderModel).where(*provider_filters(**filters)))
+    assert index in plan
+
+
+def test_city_rating_listing_uses_composite_index(connection):
+    from backend.infrastructure.repositories import provider_filters, provider_list_query
+
+    query = provider_list_query(provider_filters(city_id=1, verified=True), "rating", 20, [4.5, 10])
+    assert "ix_providers_city_verified_rating" in explain(connection, query)
+
+
+def test_text_search_uses_document_and_trigram_indexes(connection):
+    from backend.infrastructure.repositories import provider_filters, provider_search_query
+
+    plan = explain(connection, provider_search_query("سباك", provider_filters(city_id=1), 20, None))
+    assert "ix_providers_search_document" in plan
+    assert "ix_providers_name_trgm" in plan
+
+
+@pytest.mark.parametrize(
+    "status, index",
+    [(None, "ix_lead_deliveries_provider_inbox"), ("OPENED", "ix_lead_deliveries_provider_status_inbox")],
+)
+def test_inbox_page_walks_the_provider_inbox_index(connection, status, index):
+    from datetime import datetime
+
+    from backend.domain.entities import LeadStatus
+    from backend.infrastructure.repositories import inbox_query
+
+    status = LeadStatus[status] if status else None
+    query = inbox_query(7, status, 21, [datetime(2026, 1, 1), 500])
+    assert index in explain(connection, query)
+
+
+def test_reviews_page_walks_the_provider_reviews_index(connection):
+    from datetime import datetime
+
+    from backend.infrastructure.repositories import provider_reviews_query
+
+    query = provider_reviews_query(7, 21, [datetime(2026, 1, 1), 500])
+    assert "ix_reviews_provider_created" in explain(connection, query)
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("needs a migrated Postgres (DATABASE_URL)", allow_module_level=True)
+
+PARALLEL = 250
+
+
+async def review_storm():
+    from sqlalchemy import select, update
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.domain.entities import Review
+    from backend.infrastructure import models
+    from backend.infrastructure.repositories import (
+        SqlAlchemyProviderRepository,
+        SqlAlchemyReviewRepository,
+        SqlAlchemyUnitOfWork,
+    )
+
+    engine = create_async_engine(os.environ["DATABASE_URL"], pool_size=20, max_overflow=0)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    ratings = [i % 5 + 1 for i in range(PARALLEL)]
+    try:
+        async with Session() as session:
+            user = models.UserModel(email=f"ratings-{uuid.uuid4().hex}@example.com", password_hash="x")
+            session.add(user)
+            await session.flush()
+            provider = models.ProviderModel(user_id=user.id, name="Ratings", bio_i18n={})
+            session.add(provider)
+            await session.commit()
+
+        async def review(rating: int):
+            async with Session() as session:
+                async with SqlAlchemyUnitOfWork(session):
+                    await SqlAlchemyReviewRepository(session).create(
+                        Review(id=None, lead_delivery_id=None, rating=rating, comment=None, provider_id=provider.id)
+                    )
+                    await SqlAlchemyProviderRepository(session).add_rating(provider.id, rating)
+
+        async def recompute():
+            async with Session() as session:
+                return await SqlAlchemyProviderRepository(session).recompute_ratings()
+
+        # Recomputes racing the storm must never drop a review that commits meanwhile.
+        await asyncio.gather(*[review(r) for r in ratings], *[recompute() for _ in range(5)])
+
+        async def aggregate():
+            async with Session() as session:
+                row = (
+                    await session.execute(
+                        select(
+                            models.ProviderModel.rating_sum,
+                            models.ProviderModel.rating_count,
+                            models.ProviderModel.rating_histogram,
+                            models.ProviderModel.rating,
+                        ).where(models.ProviderModel.id == provider.id)
+                    )
+                ).one()
+            return tuple(row)
+
+        after_storm = await aggregate()
+        async with Session() as session:
+            await session.execute(
+                update(models.ProviderModel)
+                .where(models.ProviderModel.id == provider.id)
+                .values(rating_sum=0, rating_count=0, rating_histogram=[0, 0, 0, 0, 0], rating=0)
+            )
+            await session.commit()
+        repaired = await recompute()
+        after_repair = await aggregate()
+
+        # Reviews that predate reviews.provider_id survive a recompute as the baseline.
+        async with Session() as session:
+            await session.execute(
+                update(models.ProviderModel)
+                .where(models.ProviderModel.id == provider.id)
+                .values(unattributed_rating_sum=8, unattributed_rating_count=2)
+            )
+            await session.commit()
+        await recompute()
+        return ratings, after_storm, repaired, after_repair, await aggregate()
+    finally:
+        await engine.dispose()
+
+
+def test_parallel_reviews_keep_exact_aggregates():
+    from sqlalchemy.exc import OperationalError
+
+    try:
+        ratings, after_storm, repaired, after_repair, with_baseline = asyncio.run(review_storm())
+    except (OperationalError, OSError):
+        pytest.skip("Postgres is not reachable")
+    expected = (sum(ratings), len(ratings), [ratings.count(star) for star in range(1, 6)])
+    assert after_storm[:3] == expected
+    assert after_storm[3] == pytest.approx(sum(ratings) / len(ratings))
+    assert repaired >= 1
+    assert after_repair == after_storm
+    assert with_baseline[:3] == (sum(ratings) + 8, len(ratings) + 2, expected[2])
+    assert with_baseline[3] == pytest.approx((sum(ratings) + 8) / (len(ratings) + 2))
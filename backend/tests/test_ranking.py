@@ -0,0 +1,10 @@
+from backend.domain.ranking import rank_score
+
+
+def test_review_volume_outweighs_a_single_perfect_rating():
+    assert rank_score(4.9, 400, False) > rank_score(5.0, 1, False)
+
+
+def test_unrated_provider_starts_at_prior_and_verified_boost_applies():
+    assert rank_score(0.0, 0, False) == 4.0
+    assert rank_score(4.5, 10, True) > rank_score(4.5, 10, False)
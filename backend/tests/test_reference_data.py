@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from backend.application import ports
+from backend.domain.entities import Area, Category, City, Plan, PlanType
+from backend.infrastructure.reference_data import ReferenceDataStore, build_snapshot, pick_locale
+
+
+class StaticGeography(ports.GeographyRepository):
+    def __init__(self, cities, areas, categories):
+        self.cities = cities
+        self.areas = areas
+        self.categories = categories
+
+    async def list_cities(self):
+        return self.cities
+
+    async def list_areas(self, city_id: int):
+        return [a for a in self.areas if a.city_id == city_id]
+
+    async def list_all_areas(self):
+        return self.areas
+
+    async def list_categories(self):
+        return self.categories
+
+
+class StaticPlans(ports.PlanRepository):
+    def __init__(self, plans):
+        self.plans = plans
+
+    async def list(self):
+        return self.plans
+
+
+CITIES = [City(id=1, name_i18n={"ar": "حيفا", "he": "חיפה", "en": "Haifa"})]
+AREAS = [Area(id=10, city_id=1, name_i18n={"en": "Carmel"})]
+CATEGORIES = [Category(id=2, name_i18n={"ar": "سباكة", "en": "Plumbing"})]
+PLANS = [Plan(id=1, name="Basic", plan_type=PlanType.SUBSCRIPTION, monthly_credits=20, price=49.0)]
+
+
+def test_pick_locale_honours_quality_values():
+    assert pick_locale(None) == "ar"
+    assert pick_locale("he-IL,he;q=0.9,en;q=0.8") == "he"
+    assert pick_locale("fr, en;q=0.5, ar;q=0.7") == "ar"
+    assert pick_locale("fr") == "ar"
+
+
+def test_snapshot_serializes_one_name_per_locale():
+    snapshot = build_snapshot(CITIES, AREAS, CATEGORIES, PLANS)
+    assert json.loads(snapshot.body("cities", "he")) == [{"id": 1, "name": "חיפה"}]
+    assert json.loads(snapshot.body("categories", "he")) == [{"id": 2, "name": "سباكة"}]
+    assert json.loads(snapshot.body("areas:1", "ar")) == [{"id": 10, "city_id": 1, "name": "Carmel"}]
+    assert json.loads(snapshot.body("plans", "en"))[0]["plan_type"] == "subscription"
+    assert snapshot.body("areas:2", "ar") is None
+
+
+def test_reload_swaps_snapshot_only_when_content_changes():
+    store = ReferenceDataStore()
+    geography = StaticGeography(CITIES, AREAS, CATEGORIES)
+    assert asyncio.run(store.load(geography, StaticPlans(PLANS)))
+    first = store.snapshot
+    assert not asyncio.run(store.load(geography, StaticPlans(PLANS)))
+    assert store.snapshot is first
+
+    cheaper = [Plan(id=1, name="Basic", plan_type=PlanType.SUBSCRIPTION, monthly_credits=20, price=39.0)]
+    assert asyncio.run(store.load(geography, StaticPlans(cheaper)))
+    assert store.snapshot.version != first.version
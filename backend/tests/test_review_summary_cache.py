@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("redis")
+pytest.importorskip("pydantic_settings")
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.services")
+
+
+class DownRedis:
+    async def get(self, key):
+        raise RedisConnectionError("redis down")
+
+    async def set(self, key, value, ex=None):
+        raise RedisConnectionError("redis down")
+
+    async def delete(self, key):
+        raise RedisConnectionError("redis down")
+
+
+def test_unavailable_redis_reads_as_a_miss():
+    from backend.domain.entities import ReviewSummary
+    from backend.infrastructure.services import RedisReviewSummaryCache
+
+    async def run():
+        cache = RedisReviewSummaryCache(DownRedis())
+        assert await cache.get(7) is None
+        await cache.set(ReviewSummary(provider_id=7, rating=4.0, rating_count=1, rating_histogram=[0, 0, 0, 1, 0]))
+        await cache.invalidate(7)
+
+    asyncio.run(run())
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("passlib")
+pytest.importorskip("argon2")
+pytest.importorskip("jose")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("pydantic_settings")
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.security")
+
+
+def test_hashing_runs_off_the_event_loop():
+    from backend.infrastructure.security import Argon2PasswordHasher
+
+    hasher = Argon2PasswordHasher(workers=2, max_queue=8, time_cost=3, memory_cost=32768, parallelism=1)
+
+    async def run():
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        beat = asyncio.create_task(heartbeat())
+        hashes = await asyncio.gather(*[hasher.hash(f"secret-{i}") for i in range(6)])
+        beat.cancel()
+        assert await hasher.verify("secret-0", hashes[0])
+        assert not await hasher.verify("wrong", hashes[0])
+        return max(b - a for a, b in zip(ticks, ticks[1:]))
+
+    try:
+        assert asyncio.run(run()) < 0.05
+    finally:
+        hasher.close()
+
+
+def test_saturated_hasher_rejects_immediately():
+    from backend.application.ports import HasherSaturated
+    from backend.infrastructure.security import Argon2PasswordHasher
+
+    hasher = Argon2PasswordHasher(workers=1, max_queue=1, time_cost=3, memory_cost=32768, parallelism=1)
+
+    async def run():
+        return await asyncio.gather(*[hasher.hash("secret") for _ in range(4)], return_exceptions=True)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        hasher.close()
+    assert sum(isinstance(r, HasherSaturated) for r in results) == 2
+    assert sum(isinstance(r, str) for r in results) == 2
+
+
+def test_token_cache_skips_repeat_verification_until_expiry():
+    from backend.application.ports import ACCESS_TOKEN, InvalidToken
+    from backend.infrastructure.security import CachingTokenService, JWTTokenService
+    from backend.infrastructure.ttl_cache import TTLCache
+
+    class CountingJWT(JWTTokenService):
+        decoded = 0
+
+        def claims(self, token, kind):
+            self.decoded += 1
+            return super().claims(token, kind)
+
+    jwt_service = CountingJWT()
+    service = CachingTokenService(jwt_service, TTLCache(maxsize=100, ttl=300))
+    token = service.create_access_token(42)
+    assert [service.verify_token(token, ACCESS_TOKEN) for _ in range(3)] == [42, 42, 42]
+    assert jwt_service.decoded == 1
+    with pytest.raises(InvalidToken):
+        service.verify_token(token + "x", ACCESS_TOKEN)
+
+
+def test_access_and_refresh_tokens_are_not_interchangeable():
+    from backend.application.ports import ACCESS_TOKEN, REFRESH_TOKEN, InvalidToken
+    from backend.infrastructure.security import CachingTokenService, JWTTokenService
+    from backend.infrastructure.ttl_cache import TTLCache
+
+    service = CachingTokenService(JWTTokenService(), TTLCache(maxsize=100, ttl=300))
+    access, refresh = service.create_access_token(42), service.create_refresh_token(42)
+    # Verified once as its own kind, each stays refused as the other, cache or not.
+    assert service.verify_token(refresh, REFRESH_TOKEN) == 42
+    assert service.verify_token(access, ACCESS_TOKEN) == 42
+    with pytest.raises(InvalidToken):
+        service.verify_token(refresh, ACCESS_TOKEN)
+    with pytest.raises(InvalidToken):
+        service.verify_token(access, REFRESH_TOKEN)
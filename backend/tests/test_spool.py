@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("redis")
+pytest.importorskip("pydantic_settings")
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.spool")
+
+
+class FlakyWriter:
+    """Fails the inserts whose 1-based numbers are in ``failures``."""
+
+    def __init__(self, failures=()):
+        self.failures = set(failures)
+        self.calls = 0
+        self.rows = []
+
+    async def insert(self, rows):
+        self.calls += 1
+        if self.calls in self.failures:
+            raise httpx.ConnectError("clickhouse down")
+        self.rows += rows
+
+    async def close(self):
+        pass
+
+
+def names(directory, suffix):
+    return sorted(p.name for p in directory.glob(f"*{suffix}"))
+
+
+def test_segment_rotates_by_size(tmp_path):
+    from backend.infrastructure.spool import OPEN_SUFFIX, SEALED_SUFFIX, SpoolWriter
+
+    spool = SpoolWriter(tmp_path, segment_bytes=200, segment_seconds=60)
+    for i in range(10):
+        spool.append({"event": "provider_viewed", "provider_id": str(i)})
+    assert len(names(tmp_path, SEALED_SUFFIX)) >= 2
+    spool.seal()
+    assert names(tmp_path, OPEN_SUFFIX) == []
+    lines = [line for p in sorted(tmp_path.glob(f"*{SEALED_SUFFIX}")) for line in p.read_text().splitlines()]
+    assert [json.loads(line)["provider_id"] for line in lines] == [str(i) for i in range(10)]
+
+
+def test_tick_flushes_young_segments_and_seals_stale_ones(tmp_path):
+    from backend.infrastructure.spool import OPEN_SUFFIX, SEALED_SUFFIX, SpoolWriter
+
+    spool = SpoolWriter(tmp_path, segment_bytes=1 << 20, segment_seconds=60)
+    spool.append({"event": "provider_viewed"})
+    spool.tick()
+    [active] = tmp_path.glob(f"*{OPEN_SUFFIX}")
+    assert active.read_text().count("\n") == 1
+    spool.segment_seconds = 0
+    spool.tick()
+    assert names(tmp_path, OPEN_SUFFIX) == []
+    assert len(names(tmp_path, SEALED_SUFFIX)) == 1
+
+
+def test_orphaned_segment_is_sealed_but_a_live_one_is_not(tmp_path):
+    from backend.infrastructure.spool import SEALED_SUFFIX, SpoolShipper, SpoolWriter
+
+    dead = SpoolWriter(tmp_path, segment_bytes=1 << 20, segment_seconds=60)
+    dead.append({"event": "orphaned"})
+    dead._file.close()  # the process died without sealing; its lock goes with it
+    live = SpoolWriter(tmp_path, segment_bytes=1 << 20, segment_seconds=60)
+    live.append({"event": "live"})
+    live.tick()
+
+    writer = FlakyWriter()
+    shipper = SpoolShipper(tmp_path, writer, batch_size=100, max_bytes=1 << 20)
+    asyncio.run(shipper.ship())
+    assert [row["event"] for row in writer.rows] == ["orphaned"]
+    assert live._path.exists()
+
+    live.seal()
+    asyncio.run(shipper.ship())
+    assert [row["event"] for row in writer.rows] == ["orphaned", "live"]
+    assert names(tmp_path, SEALED_SUFFIX) == []
+
+
+def test_cap_drops_the_oldest_sealed_segments(tmp_path):
+    from backend.infrastructure.spool import SpoolShipper, SpoolWriter
+
+    spool = SpoolWriter(tmp_path, segment_bytes=1, segment_seconds=60)
+    for i in range(5):
+        spool.append({"event": "provider_viewed", "provider_id": str(i), "padding": "x" * 80})
+    segment_size = max(p.stat().st_size for p in tmp_path.glob("*.log"))
+
+    writer = FlakyWriter()
+    shipper = SpoolShipper(tmp_path, writer, batch_size=100, max_bytes=segment_size * 2)
+    asyncio.run(shipper.ship())
+    assert [row["provider_id"] for row in writer.rows] == ["3", "4"]
+
+
+def test_failed_insert_resumes_from_the_checkpoint(tmp_path):
+    from backend.infrastructure.spool import SEALED_SUFFIX, SpoolShipper, SpoolWriter
+
+    spool = SpoolWriter(tmp_path, segment_bytes=1 << 20, segment_seconds=60)
+    for i in range(5):
+        spool.append({"event": "provider_viewed", "provider_id": str(i)})
+    spool.seal()
+
+    writer = FlakyWriter(failures={2})
+    shipper = SpoolShipper(tmp_path, writer, batch_size=2, max_bytes=1 << 20)
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(shipper.ship())
+    assert [row["provider_id"] for row in writer.rows] == ["0", "1"]
+    assert len(names(tmp_path, SEALED_SUFFIX)) == 1
+
+    asyncio.run(shipper.ship())
+    assert [row["provider_id"] for row in writer.rows] == ["0", "1", "2", "3", "4"]
+    assert names(tmp_path, SEALED_SUFFIX) == []
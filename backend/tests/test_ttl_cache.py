@@ -0,0 +1,44 @@
+from backend.infrastructure.ttl_cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_evicts_least_recently_used_beyond_maxsize():
+    cache = TTLCache(maxsize=2, ttl=60, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_entries_expire_at_the_shorter_of_their_ttl_and_the_cache_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("token", 7, ttl=5)
+    cache.set("long", 8, ttl=3600)
+    cache.set("expired", 9, ttl=-1)
+    clock.now = 4.9
+    assert cache.get("token") == 7
+    assert cache.get("expired") is None
+    clock.now = 5
+    assert cache.get("token") is None
+    assert cache.get("long") == 8
+    clock.now = 60
+    assert cache.get("long") is None
+    assert len(cache) == 0
+
+
+def test_pop_evicts_an_entry():
+    cache = TTLCache(maxsize=10, ttl=60, clock=Clock())
+    cache.set(1, "user")
+    cache.pop(1)
+    cache.pop(2)
+    assert cache.get(1) is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+pytest.importorskip("pydantic_settings")
+
+from backend.tests.placeholder_settings import import_with_placeholders
+
+import_with_placeholders("backend.infrastructure.repositories")
+
+
+class FakeSession:
+    def __init__(self, fail_commit=False):
+        self.info = {}
+        self.fail_commit = fail_commit
+        self.commits = self.rollbacks = 0
+
+    async def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("serialization failure")
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def recorder(calls, name):
+    async def callback():
+        calls.append(name)
+
+    return callback
+
+
+def test_callbacks_wait_for_the_commit():
+    from backend.infrastructure.repositories import SqlAlchemyUnitOfWork
+
+    async def run():
+        session, calls = FakeSession(), []
+        uow = SqlAlchemyUnitOfWork(session)
+        async with uow:
+            await uow.after_commit(recorder(calls, "committed"))
+            await uow.after_rollback(recorder(calls, "rolled back"))
+            assert calls == []
+        assert calls == ["committed"]
+        assert session.info == {}
+
+        await uow.after_commit(recorder(calls, "no transaction"))
+        assert calls == ["committed", "no transaction"]
+
+    asyncio.run(run())
+
+
+def test_rollback_and_failed_commit_run_only_the_rollback_callbacks():
+    from backend.infrastructure.repositories import SqlAlchemyUnitOfWork
+
+    async def run():
+        for session, error in ((FakeSession(), ValueError), (FakeSession(fail_commit=True), RuntimeError)):
+            calls = []
+            uow = SqlAlchemyUnitOfWork(session)
+            with pytest.raises(error):
+                async with uow:
+                    await uow.after_commit(recorder(calls, "committed"))
+                    await uow.after_rollback(recorder(calls, "rolled back"))
+                    if error is ValueError:
+                        raise ValueError
+            assert calls == ["rolled back"]
+
+    asyncio.run(run())
+
+
+def test_a_failing_callback_does_not_skip_the_rest():
+    from backend.infrastructure.repositories import SqlAlchemyUnitOfWork
+
+    async def run():
+        calls = []
+
+        async def broken():
+            raise ConnectionError("redis down")
+
+        uow = SqlAlchemyUnitOfWork(FakeSession())
+        async with uow:
+            await uow.after_commit(broken)
+            await uow.after_commit(recorder(calls, "after"))
+        assert calls == ["after"]
+
+    asyncio.run(run())
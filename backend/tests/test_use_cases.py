@@ -1,7 +1,20 @@
 import pytest
-from backend.application.use_cases import Login, RegisterUser
+from backend.application.jobs import MatchLeadJob, NotifyProviderJob
+from backend.application.use_cases import (
+    CreateLeadRequest,
+    CreateReview,
+    DeliverLead,
+    DeliverLeadBulk,
+    Login,
+    NotProviderOwner,
+    OutOfCredits,
+    RecordDeliveryStatuses,
+    RegisterUser,
+)
 from backend.application import ports
-from backend.domain.entities import User
+from backend.domain.entities import DeliveryOutcome, LeadDelivery, LeadRequest, LeadStatus, User
+from backend.domain.fingerprint import hamming, simhash
+from backend.infrastructure.search_index import IndexedProviderRepository, ProviderSearchIndex
 
 
 class InMemoryUserRepo(ports.UserRepository):
@@ -27,13 +40,24 @@ class InMemoryUserRepo(ports.UserRepository):
 
 
 class DummyHasher(ports.PasswordHasher):
-    def hash(self, password: str) -> str:
+    async def hash(self, password: str) -> str:
         return f"hashed-{password}"
 
-    def verify(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
         return hashed_password == f"hashed-{plain_password}"
 
 
+class UpgradingHasher(DummyHasher):
+    async def hash(self, password: str) -> str:
+        return f"v2-hashed-{password}"
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return hashed_password.removeprefix("v2-") == f"hashed-{plain_password}"
+
+    def needs_update(self, hashed_password: str) -> bool:
+        return not hashed_password.startswith("v2-")
+
+
 class DummyToken(ports.TokenService):
     def create_access_token(self, user_id: int) -> str:
         return "access"
@@ -41,7 +65,7 @@ class DummyToken(ports.TokenService):
     def create_refresh_token(self, user_id: int) -> str:
         return "refresh"
 
-    def verify_token(self, token: str) -> int:
+    def verify_token(self, token: str, kind: str) -> int:
         return 1
 
 
@@ -50,6 +74,176 @@ class DummyLimiter(ports.RateLimiter):
         return True
 
 
+class InMemoryReviewRepo(ports.ReviewRepository):
+    def __init__(self):
+        self.reviews = []
+        self.reads = 0
+
+    async def create(self, review):
+        review.id = len(self.reviews) + 1
+        self.reviews.append(review)
+        return review
+
+    async def list_for_provider(self, provider_id, limit=None, after=None):
+        self.reads += 1
+        rows = sorted(
+            (r for r in self.reviews if r.provider_id == provider_id), key=lambda r: (r.created_at, r.id), reverse=True
+        )
+        if after:
+            rows = [r for r in rows if (r.created_at, r.id) < tuple(after)]
+        return rows[:limit] if limit else rows
+
+
+class RatingProviderRepo(IndexedProviderRepository):
+    def __init__(self):
+        super().__init__(ProviderSearchIndex(), None)
+        self.ratings = []
+
+    async def get(self, provider_id):
+        return self.index.get(provider_id)
+
+    async def add_rating(self, provider_id, rating):
+        self.ratings.append((provider_id, rating))
+
+
+class InMemoryReviewSummaryCache(ports.ReviewSummaryCache):
+    def __init__(self):
+        self.summaries = {}
+
+    async def get(self, provider_id):
+        return self.summaries.get(provider_id)
+
+    async def set(self, summary):
+        self.summaries[summary.provider_id] = summary
+
+    async def invalidate(self, provider_id):
+        self.summaries.pop(provider_id, None)
+
+
+class ContactedLeadRepo(ports.LeadRepository):
+    def __init__(self, matching_providers=()):
+        self.matching_providers = list(matching_providers)
+
+    async def create(self, lead):
+        lead.id = 1
+        return lead
+
+    async def get(self, lead_id: int):
+        return LeadRequest(lead_id, 1, 2, 3, [10], "", None)
+
+    async def match_and_deliver(self, lead):
+        return await self.deliver_to_providers(lead.id, self.matching_providers)
+
+    async def deliver_to_providers(self, lead_id, provider_ids):
+        return [
+            LeadDelivery(id=i, lead_id=lead_id, provider_id=p, status=LeadStatus.DELIVERED)
+            for i, p in enumerate(provider_ids, start=1)
+            if p in self.matching_providers
+        ]
+
+    async def delivered_provider_ids(self, lead_id, provider_ids):
+        return {5} & set(provider_ids)
+
+    async def inbox(self, provider_id, status=None, limit=None, after=None):
+        return []
+
+    async def advance_delivery_statuses(self, statuses):
+        # Delivery 2 was already marked responded.
+        return [
+            LeadDelivery(id=d, lead_id=1, provider_id=d * 10, status=s)
+            for d, s in statuses.items()
+            if d != 2 or s.rank > LeadStatus.RESPONDED.rank
+        ]
+
+    async def find_delivery(self, lead_id, provider_id):
+        return LeadDelivery(lead_id * 100 + provider_id, lead_id, provider_id, LeadStatus.DELIVERED)
+
+    async def delivery_owners(self, delivery_ids):
+        # Delivery d went to provider d * 10, owned by user 1 unless d is 9; 4 does not exist.
+        return {d: 2 if d == 9 else 1 for d in delivery_ids if d != 4}
+
+    async def add_delivery(self, delivery):
+        return delivery
+
+    async def update_delivery_status(self, delivery_id: int, status: str) -> None:
+        pass
+
+    async def has_contact(self, lead_id: int, provider_id: int, user_id: int) -> bool:
+        return True
+
+
+class FixedCreditSubscriptions(ports.SubscriptionRepository):
+    def __init__(self, credits: int):
+        self.credits = credits
+
+    async def get_active(self, provider_id: int):
+        return None
+
+    async def reserve_credit(self, provider_id: int, lead_id=None):
+        if self.credits <= 0:
+            return None
+        self.credits -= 1
+        return self.credits
+
+
+class RecordingAnalytics(ports.AnalyticsClient):
+    def __init__(self):
+        self.events = []
+
+    async def track(self, event: str, payload: dict) -> None:
+        self.events.append((event, payload))
+
+
+class RecordingJobQueue(ports.JobQueue):
+    def __init__(self):
+        self.jobs = []
+
+    async def publish(self, job) -> None:
+        self.jobs.append(job)
+
+
+class InMemoryLeadDeduplicator(ports.LeadDeduplicator):
+    def __init__(self):
+        self.recent = []
+
+    async def claim(self, lead):
+        for scope, fingerprint, lead_id in self.recent:
+            if scope == (lead.user_id, lead.category_id, lead.city_id) and hamming(
+                fingerprint, simhash(lead.description)
+            ) <= 6:
+                return lead_id
+        return None
+
+    async def remember(self, lead):
+        self.recent.append(((lead.user_id, lead.category_id, lead.city_id), simhash(lead.description), lead.id))
+
+    async def release(self, lead):
+        pass
+
+
+class ManualUnitOfWork(ports.UnitOfWork):
+    """Holds the callbacks until the test commits or rolls back."""
+
+    def __init__(self):
+        self.committed, self.rolled_back = [], []
+
+    async def after_commit(self, callback):
+        self.committed.append(callback)
+
+    async def after_rollback(self, callback):
+        self.rolled_back.append(callback)
+
+    async def commit(self):
+        for callback in self.committed:
+            await callback()
+        self.committed, self.rolled_back = [], []
+
+    async def rollback(self):
+        for callback in self.rolled_back:
+            await callback()
+        self.committed, self.rolled_back = [], []
+
+
 def test_register_and_login_flow():
     import asyncio
 
@@ -65,3 +259,325 @@ def test_register_and_login_flow():
         assert result.access_token == "access"
 
     asyncio.run(run())
+
+
+def test_login_rehashes_outdated_password_hashes():
+    import asyncio
+
+    async def run():
+        repo = InMemoryUserRepo()
+        user = await RegisterUser(repo, DummyHasher()).execute("a@test.com", "secret", None)
+        assert user.password_hash == "hashed-secret"
+
+        login = Login(repo, UpgradingHasher(), DummyToken(), DummyLimiter())
+        await login.execute("a@test.com", "secret")
+        assert repo.users["a@test.com"].password_hash == "v2-hashed-secret"
+        await login.execute("a@test.com", "secret")
+        assert repo.users["a@test.com"].password_hash == "v2-hashed-secret"
+
+    asyncio.run(run())
+
+
+def test_create_review_folds_rating_in_with_the_review():
+    import asyncio
+
+    async def run():
+        jobs, providers = RecordingJobQueue(), RatingProviderRepo()
+        uc = CreateReview(ContactedLeadRepo(), InMemoryReviewRepo(), providers, RecordingAnalytics(), jobs)
+        review = await uc.execute(lead_id=3, provider_id=7, user_id=1, rating=5, comment=None)
+        assert review.provider_id == 7
+        assert review.lead_delivery_id == 307
+        assert providers.ratings == [(7, 5)]
+        assert jobs.jobs == [NotifyProviderJob(provider_id=7, kind="review_created", data={"review_id": review.id})]
+        with pytest.raises(ValueError):
+            await uc.execute(lead_id=3, provider_id=7, user_id=1, rating=6, comment=None)
+        assert providers.ratings == [(7, 5)]
+
+    asyncio.run(run())
+
+
+def test_provider_reviews_serve_first_page_from_cached_summary():
+    import asyncio
+    from backend.application.use_cases import ListProviderReviews
+    from backend.tests.test_search_index import make_provider
+
+    async def run():
+        reviews, providers, cache = InMemoryReviewRepo(), RatingProviderRepo(), InMemoryReviewSummaryCache()
+        providers.index.rebuild([make_provider(7, rating=4.0)])
+        create = CreateReview(ContactedLeadRepo(), reviews, providers, RecordingAnalytics(), RecordingJobQueue(), cache)
+        for rating in (5, 4, 3, 5, 2, 4, 5):
+            await create.execute(lead_id=3, provider_id=7, user_id=1, rating=rating, comment=None)
+        uc = ListProviderReviews(reviews, providers, cache, latest=5)
+
+        summary, page = await uc.execute(7, limit=3)
+        assert [r.id for r in page.items] == [7, 6, 5]
+        assert [r.id for r in summary.latest] == [7, 6, 5, 4, 3]
+        assert reviews.reads == 1
+        await uc.execute(7, limit=3)
+        assert reviews.reads == 1
+
+        _, page = await uc.execute(7, limit=3, cursor=page.next_cursor)
+        assert [r.id for r in page.items] == [4, 3, 2]
+        _, page = await uc.execute(7, limit=3, cursor=page.next_cursor)
+        assert [r.id for r in page.items] == [1] and page.next_cursor is None
+
+        await create.execute(lead_id=3, provider_id=7, user_id=1, rating=1, comment=None)
+        summary, _ = await uc.execute(7, limit=3)
+        assert summary.latest[0].id == 8
+        assert await uc.execute(99) is None
+
+    asyncio.run(run())
+
+
+def test_review_summary_is_dropped_only_after_the_review_commits():
+    import asyncio
+    from backend.application.use_cases import ListProviderReviews
+    from backend.tests.test_search_index import make_provider
+
+    async def run():
+        reviews, providers, cache = InMemoryReviewRepo(), RatingProviderRepo(), InMemoryReviewSummaryCache()
+        providers.index.rebuild([make_provider(7, rating=4.0)])
+        uow = ManualUnitOfWork()
+        create = CreateReview(
+            ContactedLeadRepo(), reviews, providers, RecordingAnalytics(), RecordingJobQueue(), cache, uow=uow
+        )
+        await create.execute(lead_id=3, provider_id=7, user_id=1, rating=5, comment=None)
+        # A read racing the uncommitted review caches the summary without it.
+        await ListProviderReviews(InMemoryReviewRepo(), providers, cache).summary(7)
+        assert 7 in cache.summaries
+        await uow.commit()
+        assert 7 not in cache.summaries
+
+    asyncio.run(run())
+
+
+def test_create_lead_matches_inline_or_defers_to_job():
+    import asyncio
+
+    async def run():
+        jobs = RecordingJobQueue()
+        uc = CreateLeadRequest(ContactedLeadRepo([4, 9]), RecordingAnalytics(), jobs)
+        await uc.execute(user_id=1, category_id=2, city_id=3, area_ids=[10], description="", preferred_time=None)
+        assert jobs.jobs == [MatchLeadJob(lead_id=1)]
+
+        jobs, analytics = RecordingJobQueue(), RecordingAnalytics()
+        uc = CreateLeadRequest(ContactedLeadRepo([4, 9]), analytics, jobs, match_inline=True)
+        await uc.execute(user_id=1, category_id=2, city_id=3, area_ids=[10], description="", preferred_time=None)
+        assert [job.provider_id for job in jobs.jobs] == [4, 9]
+        assert ("lead_matched", {"lead_id": 1, "count": 2}) in analytics.events
+
+    asyncio.run(run())
+
+
+def test_create_lead_returns_recent_near_duplicate():
+    import asyncio
+
+    async def run():
+        jobs, analytics = RecordingJobQueue(), RecordingAnalytics()
+        uc = CreateLeadRequest(ContactedLeadRepo(), analytics, jobs, dedup=InMemoryLeadDeduplicator())
+        description = "Need a plumber to fix a leaking kitchen sink, any morning this week"
+        first = await uc.execute(1, 2, 3, [10], description, None)
+        again = await uc.execute(1, 2, 3, [10], description.upper() + "!!", None)
+        elsewhere = await uc.execute(1, 2, 4, [10], description, None)
+        assert again.id == first.id
+        assert jobs.jobs == [MatchLeadJob(lead_id=1), MatchLeadJob(lead_id=1)]
+        assert [event for event, _ in analytics.events] == ["lead_created", "lead_deduplicated", "lead_created"]
+        assert elsewhere.city_id == 4
+
+    asyncio.run(run())
+
+
+def test_dedup_only_remembers_a_lead_once_it_commits():
+    import asyncio
+
+    class UncommittedLeadRepo(ContactedLeadRepo):
+        """``get`` finds nothing until the lead's transaction commits."""
+
+        committed = False
+
+        async def get(self, lead_id: int):
+            return await super().get(lead_id) if self.committed else None
+
+    class TrackingDeduplicator(InMemoryLeadDeduplicator):
+        released = 0
+
+        async def release(self, lead):
+            self.released += 1
+
+    async def run():
+        leads, dedup, uow = UncommittedLeadRepo(), TrackingDeduplicator(), ManualUnitOfWork()
+        uc = CreateLeadRequest(leads, RecordingAnalytics(), RecordingJobQueue(), dedup=dedup, uow=uow)
+        description = "Need a plumber to fix a leaking kitchen sink, any morning this week"
+
+        await uc.execute(1, 2, 3, [10], description, None)
+        assert dedup.recent == []
+        await uow.rollback()
+        assert dedup.recent == [] and dedup.released == 1
+
+        first = await uc.execute(1, 2, 3, [10], description, None)
+        leads.committed = True
+        await uow.commit()
+        again = await uc.execute(1, 2, 3, [10], description, None)
+        assert again.id == first.id and dedup.released == 1
+
+    asyncio.run(run())
+
+
+def test_deliver_lead_refuses_when_out_of_credits():
+    import asyncio
+
+    async def run():
+        jobs = RecordingJobQueue()
+        uc = DeliverLead(ContactedLeadRepo(), RecordingAnalytics(), FixedCreditSubscriptions(1), jobs)
+        await uc.execute(lead_id=1, provider_id=4)
+        with pytest.raises(OutOfCredits):
+            await uc.execute(lead_id=2, provider_id=4)
+        assert [job.data["lead_id"] for job in jobs.jobs] == [1]
+
+    asyncio.run(run())
+
+
+def test_deliver_lead_refuses_a_repeat_delivery_without_charging():
+    import asyncio
+    from backend.application.use_cases import AlreadyDelivered
+
+    async def run():
+        subscriptions = FixedCreditSubscriptions(1)
+        uc = DeliverLead(ContactedLeadRepo(), RecordingAnalytics(), subscriptions, RecordingJobQueue())
+        with pytest.raises(AlreadyDelivered):
+            await uc.execute(lead_id=1, provider_id=5)
+        assert subscriptions.credits == 1
+
+    asyncio.run(run())
+
+
+def test_status_batch_coalesces_to_the_furthest_status():
+    import asyncio
+
+    class CapturingLeadRepo(ContactedLeadRepo):
+        async def advance_delivery_statuses(self, statuses):
+            self.applied = dict(statuses)
+            return await super().advance_delivery_statuses(statuses)
+
+    async def run():
+        leads, analytics = CapturingLeadRepo(), RecordingAnalytics()
+        uc = RecordDeliveryStatuses(leads, analytics)
+        opened, responded = LeadStatus.OPENED, LeadStatus.RESPONDED
+        changed = await uc.execute([(1, opened), (1, responded), (1, opened), (2, opened), (3, opened), (4, opened)], 1)
+        assert leads.applied == {1: responded, 2: opened, 3: opened}
+        assert [d.id for d in changed] == [1, 3]
+        assert [event for event, _ in analytics.events] == ["lead_responded", "lead_opened"]
+
+    asyncio.run(run())
+
+
+def test_status_batch_rejects_deliveries_to_another_users_provider():
+    import asyncio
+
+    class CapturingLeadRepo(ContactedLeadRepo):
+        applied = None
+
+        async def advance_delivery_statuses(self, statuses):
+            self.applied = dict(statuses)
+            return await super().advance_delivery_statuses(statuses)
+
+    async def run():
+        leads, analytics = CapturingLeadRepo(), RecordingAnalytics()
+        uc = RecordDeliveryStatuses(leads, analytics)
+        with pytest.raises(NotProviderOwner):
+            await uc.execute([(1, LeadStatus.OPENED), (9, LeadStatus.OPENED)], 1)
+        assert leads.applied is None
+        assert analytics.events == []
+
+    asyncio.run(run())
+
+
+def test_provider_inbox_pages_newest_first_with_cursor():
+    import asyncio
+    from datetime import datetime, timedelta
+    from backend.application.pagination import InvalidCursor
+    from backend.application.use_cases import ListProviderInbox
+    from backend.domain.entities import InboxItem
+
+    start = datetime(2026, 1, 1)
+    items = [
+        InboxItem(i, 100 + i, LeadStatus.DELIVERED, start + timedelta(minutes=i // 2), 1, 1, [], None, "")
+        for i in range(1, 8)
+    ]
+
+    class InboxLeadRepo(ContactedLeadRepo):
+        async def inbox(self, provider_id, status=None, limit=None, after=None):
+            rows = sorted(items, key=lambda i: (i.delivered_at, i.delivery_id), reverse=True)
+            if after:
+                rows = [i for i in rows if (i.delivered_at, i.delivery_id) < tuple(after)]
+            return rows[:limit]
+
+    async def run():
+        uc = ListProviderInbox(InboxLeadRepo())
+        seen, cursor = [], None
+        while True:
+            page = await uc.execute(7, limit=3, cursor=cursor)
+            seen += [i.delivery_id for i in page.items]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        assert seen == [7, 6, 5, 4, 3, 2, 1]
+        with pytest.raises(InvalidCursor):
+            await uc.execute(8, cursor=(await uc.execute(7, limit=3)).next_cursor)
+
+    asyncio.run(run())
+
+
+def test_bulk_delivery_reports_an_outcome_per_provider():
+    import asyncio
+    from backend.tests.test_search_index import make_provider
+
+    async def run():
+        class KnownProviders(IndexedProviderRepository):
+            async def existing_ids(self, provider_ids):
+                return {p for p in provider_ids if self.index.get(p)}
+
+        index = ProviderSearchIndex()
+        index.rebuild([make_provider(p) for p in (4, 5, 6)])
+        jobs = RecordingJobQueue()
+        uc = DeliverLeadBulk(ContactedLeadRepo([4, 9]), KnownProviders(index, None), RecordingAnalytics(), jobs)
+        outcomes = await uc.execute(1, [4, 5, 6, 4, 7])
+        assert outcomes == [
+            DeliveryOutcome(4, "delivered", 1),
+            DeliveryOutcome(5, "already_delivered"),
+            DeliveryOutcome(6, "no_credits"),
+            DeliveryOutcome(7, "not_found"),
+        ]
+        assert [job.provider_id for job in jobs.jobs] == [4]
+
+    asyncio.run(run())
+
+
+def test_list_providers_pages_with_cursor():
+    import asyncio
+    from backend.application.pagination import InvalidCursor, encode_cursor
+    from backend.application.use_cases import ListProviders
+    from backend.tests.test_search_index import make_provider
+
+    async def run():
+        index = ProviderSearchIndex()
+        index.rebuild([make_provider(i, rating=float(i % 3)) for i in range(1, 8)])
+        uc = ListProviders(IndexedProviderRepository(index, None), RecordingAnalytics())
+
+        seen = []
+        cursor = None
+        while True:
+            page = await uc.execute(sort="rating", limit=3, cursor=cursor)
+            seen += [p.id for p in page.items]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        assert seen == [2, 5, 1, 4, 7, 3, 6]
+
+        with pytest.raises(InvalidCursor):
+            await uc.execute(sort=None, cursor=(await uc.execute(sort="rating", limit=1)).next_cursor)
+        for key in ([], [1.5, 2, 3], ["4.0", 2], [4.0, None], [True, 2]):
+            with pytest.raises(InvalidCursor):
+                await uc.execute(sort="rating", cursor=encode_cursor("rating", key))
+
+    asyncio.run(run())
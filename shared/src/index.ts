@@ -17,9 +17,74 @@ export const ProviderSchema = z.object({
   whatsapp: z.string().optional(),
   phone: z.string().optional(),
   rating: z.number().default(0),
+  rating_count: z.number().default(0),
+  rating_histogram: z.array(z.number()).default([0, 0, 0, 0, 0])
+});
+
+export const ProviderPageSchema = z.object({
+  items: z.array(ProviderSchema),
+  next_cursor: z.string().nullable().optional()
+});
+
+export const ProviderCardSchema = z.object({
+  id: z.number(),
+  name: z.string(),
+  avatar_url: z.string().nullable().optional(),
+  verified: z.boolean().default(false),
+  categories: z.array(z.number()),
+  city_id: z.number(),
+  rating: z.number().default(0),
   rating_count: z.number().default(0)
 });
 
+export const ProviderCardPageSchema = z.object({
+  items: z.array(ProviderCardSchema),
+  next_cursor: z.string().nullable().optional()
+});
+
+export const ProviderFacetsSchema = z.object({
+  category: z.record(z.number()),
+  city: z.record(z.number()),
+  area: z.record(z.number()),
+  verified: z.record(z.number()),
+  language: z.record(z.number())
+});
+
+export const NamedSchema = z.object({
+  id: z.number(),
+  name: z.string()
+});
+
+export const AreaSchema = NamedSchema.extend({
+  city_id: z.number()
+});
+
+export const PlanSchema = z.object({
+  id: z.number(),
+  name: z.string(),
+  plan_type: z.string(),
+  monthly_credits: z.number(),
+  price: z.number(),
+  features: z.array(z.string())
+});
+
+export const InboxItemSchema = z.object({
+  delivery_id: z.number(),
+  lead_id: z.number(),
+  status: z.enum(["delivered", "opened", "responded"]),
+  delivered_at: z.string(),
+  category_id: z.number(),
+  city_id: z.number(),
+  area_ids: z.array(z.number()),
+  preferred_time: z.string().nullable(),
+  excerpt: z.string()
+});
+
+export const InboxPageSchema = z.object({
+  items: z.array(InboxItemSchema),
+  next_cursor: z.string().nullable().optional()
+});
+
 export const LeadRequestSchema = z.object({
   category_id: z.number(),
   city_id: z.number(),
@@ -35,9 +100,41 @@ export const ReviewSchema = z.object({
   comment: z.string().optional()
 });
 
+export const ProviderReviewSchema = z.object({
+  id: z.number(),
+  rating: z.number(),
+  comment: z.string().nullable(),
+  created_at: z.string()
+});
+
+export const ReviewSummarySchema = z.object({
+  rating: z.number(),
+  rating_count: z.number(),
+  rating_histogram: z.array(z.number()),
+  latest: z.array(ProviderReviewSchema)
+});
+
+export const ReviewPageSchema = z.object({
+  summary: ReviewSummarySchema,
+  items: z.array(ProviderReviewSchema),
+  next_cursor: z.string().nullable().optional()
+});
+
 export type ProviderDTO = z.infer<typeof ProviderSchema>;
+export type ProviderPageDTO = z.infer<typeof ProviderPageSchema>;
+export type ProviderCardDTO = z.infer<typeof ProviderCardSchema>;
+export type ProviderCardPageDTO = z.infer<typeof ProviderCardPageSchema>;
+export type ProviderFacetsDTO = z.infer<typeof ProviderFacetsSchema>;
+export type NamedDTO = z.infer<typeof NamedSchema>;
+export type AreaDTO = z.infer<typeof AreaSchema>;
+export type PlanDTO = z.infer<typeof PlanSchema>;
+export type InboxItemDTO = z.infer<typeof InboxItemSchema>;
+export type InboxPageDTO = z.infer<typeof InboxPageSchema>;
 export type LeadRequestDTO = z.infer<typeof LeadRequestSchema>;
 export type ReviewDTO = z.infer<typeof ReviewSchema>;
+export type ProviderReviewDTO = z.infer<typeof ProviderReviewSchema>;
+export type ReviewSummaryDTO = z.infer<typeof ReviewSummarySchema>;
+export type ReviewPageDTO = z.infer<typeof ReviewPageSchema>;
 
 export type Locale = "ar" | "he" | "en";
 
@@ -53,14 +150,62 @@ export class ApiClient {
     return headers;
   }
 
-  async listProviders(params: Record<string, string | number | boolean | undefined> = {}): Promise<ProviderDTO[]> {
+  async listProvidersPage(params: Record<string, string | number | boolean | undefined> = {}): Promise<ProviderPageDTO> {
     const url = new URL("/providers", this.baseUrl);
     Object.entries(params).forEach(([key, value]) => {
       if (value !== undefined) url.searchParams.append(key, String(value));
     });
     const res = await fetch(url, { headers: this.headers() });
     if (!res.ok) throw new Error("Failed to fetch providers");
-    return ProviderSchema.array().parse(await res.json());
+    return ProviderPageSchema.parse(await res.json());
+  }
+
+  async listProviders(params: Record<string, string | number | boolean | undefined> = {}): Promise<ProviderDTO[]> {
+    return (await this.listProvidersPage(params)).items;
+  }
+
+  async listProviderCards(params: Record<string, string | number | boolean | undefined> = {}): Promise<ProviderCardPageDTO> {
+    const url = new URL("/providers", this.baseUrl);
+    Object.entries({ ...params, view: "card" }).forEach(([key, value]) => {
+      if (value !== undefined) url.searchParams.append(key, String(value));
+    });
+    const res = await fetch(url, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch providers");
+    return ProviderCardPageSchema.parse(await res.json());
+  }
+
+  async providerFacets(params: Record<string, string | number | boolean | undefined> = {}): Promise<ProviderFacetsDTO> {
+    const url = new URL("/providers/facets", this.baseUrl);
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) url.searchParams.append(key, String(value));
+    });
+    const res = await fetch(url, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch provider facets");
+    return ProviderFacetsSchema.parse(await res.json());
+  }
+
+  async listCities(): Promise<NamedDTO[]> {
+    const res = await fetch(`${this.baseUrl}/cities`, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch cities");
+    return z.array(NamedSchema).parse(await res.json());
+  }
+
+  async listAreas(cityId: number): Promise<AreaDTO[]> {
+    const res = await fetch(`${this.baseUrl}/cities/${cityId}/areas`, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch areas");
+    return z.array(AreaSchema).parse(await res.json());
+  }
+
+  async listCategories(): Promise<NamedDTO[]> {
+    const res = await fetch(`${this.baseUrl}/categories`, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch categories");
+    return z.array(NamedSchema).parse(await res.json());
+  }
+
+  async listPlans(): Promise<PlanDTO[]> {
+    const res = await fetch(`${this.baseUrl}/plans`, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch plans");
+    return z.array(PlanSchema).parse(await res.json());
   }
 
   async getProvider(id: number): Promise<ProviderDTO> {
@@ -69,6 +214,32 @@ export class ApiClient {
     return ProviderSchema.parse(await res.json());
   }
 
+  async providerInbox(
+    providerId: number,
+    params: { status?: InboxItemDTO["status"]; limit?: number; cursor?: string } = {}
+  ): Promise<InboxPageDTO> {
+    const url = new URL(`/providers/${providerId}/inbox`, this.baseUrl);
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) url.searchParams.append(key, String(value));
+    });
+    const res = await fetch(url, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch inbox");
+    return InboxPageSchema.parse(await res.json());
+  }
+
+  async providerReviews(
+    providerId: number,
+    params: { limit?: number; cursor?: string } = {}
+  ): Promise<ReviewPageDTO> {
+    const url = new URL(`/providers/${providerId}/reviews`, this.baseUrl);
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) url.searchParams.append(key, String(value));
+    });
+    const res = await fetch(url, { headers: this.headers() });
+    if (!res.ok) throw new Error("Failed to fetch reviews");
+    return ReviewPageSchema.parse(await res.json());
+  }
+
   async createLead(payload: LeadRequestDTO): Promise<{ id: number }> {
     const res = await fetch(`${this.baseUrl}/leads`, {
       method: "POST",